@@ -1,17 +1,93 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import secrets
+import warnings
 from datetime import datetime
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
 from models.requests import (
     FenxingAnalysisRequest, StrokeAnalysisRequest, 
     CenterAnalysisRequest, DivergenceAnalysisRequest,
     CompleteAnalysisRequest, APIResponse
 )
-from models.analysis import KlineData
+from models.analysis import KlineData, FenxingPoint, FenxingType
 from services.chan_theory_engine import chan_theory_engine
+from services.kline_simulator import KlineSimulator
+from core.executor import get_analysis_executor
+from utils.serialization import (
+    api_response, encode_api_response, parse_datetime, prebuild_api_response,
+    prebuilt_response, serialize_kline_rows, stream_encoded_response
+)
 
 router = APIRouter()
 
 
+# K线数值列的结构化dtype
+_KLINE_DTYPE = np.dtype([
+    ("open", "f8"), ("high", "f8"), ("low", "f8"), ("close", "f8"), ("volume", "i8")
+])
+
+
+@lru_cache(maxsize=4)
+def _fenxing_type(value: str) -> FenxingType:
+    """
+    转换分型类型，输入通常只有top/bottom两种取值
+    
+    Args:
+        value: 分型类型字符串
+        
+    Returns:
+        分型类型枚举
+    """
+    return FenxingType(value)
+
+
+def _parse_timestamps(raw: List[str]) -> List[datetime]:
+    """
+    解析ISO8601时间戳字符串列表
+    
+    通常由pandas单次整列解析；各行时区偏移不同时（如跨越夏令时切换）
+    无法得到统一时区的DatetimeIndex，此时逐行解析，保留每行自身的偏移。
+    
+    Args:
+        raw: 时间戳字符串列表
+        
+    Returns:
+        datetime列表
+    """
+    with warnings.catch_warnings():
+        # 混合偏移在当前pandas版本给出FutureWarning，后续版本直接报错，两者都转为逐行解析
+        warnings.simplefilter("error", FutureWarning)
+        try:
+            timestamps = pd.to_datetime(raw, format="ISO8601")
+        except (FutureWarning, ValueError):
+            timestamps = None
+    if isinstance(timestamps, pd.DatetimeIndex):
+        return timestamps.to_pydatetime().tolist()
+    return [parse_datetime(value) for value in raw]
+
+
+def convert_kline_data_np(kline_list: List[Dict[str, Any]]) -> Tuple[List[datetime], np.ndarray]:
+    """
+    将字典格式的K线数据一次性转换为列式数组
+    
+    Args:
+        kline_list: K线数据字典列表
+        
+    Returns:
+        (时间戳列表, OHLCV结构化数组)
+    """
+    values = np.array(
+        [(d["open"], d["high"], d["low"], d["close"], d["volume"]) for d in kline_list],
+        dtype=_KLINE_DTYPE
+    )
+    # ISO8601格式原生支持末尾的"Z"
+    timestamps = _parse_timestamps([d["timestamp"] for d in kline_list])
+    return timestamps, values
+
+
 def convert_kline_data(kline_list: List[Dict[str, Any]]) -> List[KlineData]:
     """
     转换字典格式的K线数据为KlineData对象
@@ -22,18 +98,51 @@ def convert_kline_data(kline_list: List[Dict[str, Any]]) -> List[KlineData]:
     Returns:
         KlineData对象列表
     """
-    result = []
-    for kline_dict in kline_list:
-        kline = KlineData(
-            timestamp=datetime.fromisoformat(kline_dict["timestamp"].replace("Z", "+00:00")),
-            open=float(kline_dict["open"]),
-            high=float(kline_dict["high"]),
-            low=float(kline_dict["low"]),
-            close=float(kline_dict["close"]),
-            volume=int(kline_dict["volume"])
+    timestamps, values = convert_kline_data_np(kline_list)
+    return [
+        KlineData(
+            timestamp=timestamp,
+            open=open_price,
+            high=high,
+            low=low,
+            close=close,
+            volume=volume
         )
-        result.append(kline)
-    return result
+        for timestamp, (open_price, high, low, close, volume)
+        in zip(timestamps, values.tolist())
+    ]
+
+
+def _make_endpoint_serializer(include_timestamp: bool = True):
+    """
+    创建笔端点分型的序列化函数
+    
+    相邻笔共用同一端点分型对象，按id缓存其序列化结果，
+    同一对象只构建一次字典。缓存随返回的函数一起释放。
+    
+    Args:
+        include_timestamp: 是否包含时间戳字段
+        
+    Returns:
+        带缓存的端点序列化函数
+    """
+    endpoint_cache: Dict[int, Dict[str, Any]] = {}
+    
+    def serialize_endpoint(fenxing) -> Dict[str, Any]:
+        key = id(fenxing)
+        endpoint = endpoint_cache.get(key)
+        if endpoint is None:
+            endpoint = {
+                "index": fenxing.index,
+                "type": fenxing.type.value,
+                "price": fenxing.price
+            }
+            if include_timestamp:
+                endpoint["timestamp"] = fenxing.timestamp
+            endpoint_cache[key] = endpoint
+        return endpoint
+    
+    return serialize_endpoint
 
 
 def serialize_analysis_result(result) -> Dict[str, Any]:
@@ -47,99 +156,87 @@ def serialize_analysis_result(result) -> Dict[str, Any]:
         序列化后的字典
     """
     # 序列化K线数据
-    kline_data = []
-    for kline in result.kline_data:
-        kline_data.append({
-            "timestamp": kline.timestamp.isoformat(),
-            "open": kline.open,
-            "high": kline.high,
-            "low": kline.low,
-            "close": kline.close,
-            "volume": kline.volume
-        })
+    kline_data = serialize_kline_rows(result.kline_data)
     
     # 序列化分型点
-    fenxing_points = []
-    for fenxing in result.fenxing_points:
-        fenxing_points.append({
+    fenxing_points = [
+        {
             "index": fenxing.index,
             "type": fenxing.type.value,
             "high": fenxing.high,
             "low": fenxing.low,
             "price": fenxing.price,
-            "timestamp": fenxing.timestamp.isoformat(),
+            "timestamp": fenxing.timestamp,
             "confidence": fenxing.confidence
-        })
+        }
+        for fenxing in result.fenxing_points
+    ]
     
     # 序列化笔
-    strokes = []
-    for stroke in result.strokes:
-        strokes.append({
-            "start_fenxing": {
-                "index": stroke.start_fenxing.index,
-                "type": stroke.start_fenxing.type.value,
-                "price": stroke.start_fenxing.price,
-                "timestamp": stroke.start_fenxing.timestamp.isoformat()
-            },
-            "end_fenxing": {
-                "index": stroke.end_fenxing.index,
-                "type": stroke.end_fenxing.type.value,
-                "price": stroke.end_fenxing.price,
-                "timestamp": stroke.end_fenxing.timestamp.isoformat()
-            },
+    serialize_endpoint = _make_endpoint_serializer()
+    strokes = [
+        {
+            "start_fenxing": serialize_endpoint(stroke.start_fenxing),
+            "end_fenxing": serialize_endpoint(stroke.end_fenxing),
             "direction": stroke.direction.value,
             "price_range": stroke.price_range,
             "kline_count": stroke.kline_count,
-            "start_time": stroke.start_time.isoformat(),
-            "end_time": stroke.end_time.isoformat()
-        })
+            "start_time": stroke.start_time,
+            "end_time": stroke.end_time
+        }
+        for stroke in result.strokes
+    ]
     
     # 序列化线段
-    segments = []
-    for segment in result.segments:
-        segments.append({
+    segments = [
+        {
             "direction": segment.direction.value,
             "start_price": segment.start_price,
             "end_price": segment.end_price,
             "price_range": segment.price_range,
-            "start_time": segment.start_time.isoformat(),
-            "end_time": segment.end_time.isoformat(),
+            "start_time": segment.start_time,
+            "end_time": segment.end_time,
             "stroke_count": len(segment.strokes)
-        })
+        }
+        for segment in result.segments
+    ]
     
     # 序列化中枢
-    centers = []
-    for center in result.centers:
-        centers.append({
+    centers = [
+        {
             "center_type": center.center_type.value,
             "high_price": center.high_price,
             "low_price": center.low_price,
             "center_range": center.center_range,
-            "start_time": center.start_time.isoformat(),
-            "end_time": center.end_time.isoformat(),
+            "start_time": center.start_time,
+            "end_time": center.end_time,
             "strength": center.strength,
             "segment_count": len(center.segments)
-        })
+        }
+        for center in result.centers
+    ]
     
     # 序列化MACD数据
-    macd_data = []
-    for macd in result.macd_data:
-        macd_data.append({
-            "timestamp": macd.timestamp.isoformat(),
+    macd_data = [
+        {
+            "timestamp": macd.timestamp,
             "dif": macd.dif,
             "dea": macd.dea,
             "macd": macd.macd
-        })
+        }
+        for macd in result.macd_data
+    ]
     
     # 序列化背驰信号
-    divergence_signals = []
-    for signal in result.divergence_signals:
-        divergence_signals.append({
-            "signal_time": signal.signal_time.isoformat(),
+    divergence_signals = [
+        {
+            "signal_time": signal.signal_time,
             "signal_type": signal.signal_type,
             "strength": signal.strength,
             "description": signal.description
-        })
+        }
+        for signal in result.divergence_signals
+    ]
     
     return {
         "kline_data": kline_data,
@@ -149,28 +246,51 @@ def serialize_analysis_result(result) -> Dict[str, Any]:
         "centers": centers,
         "macd_data": macd_data,
         "divergence_signals": divergence_signals,
-        "analysis_time": result.analysis_time.isoformat()
+        "analysis_time": result.analysis_time
     }
 
 
-@router.post("/complete", response_model=APIResponse)
-async def complete_analysis(request: CompleteAnalysisRequest):
+def _init_analysis_worker() -> None:
+    """分析工作进程初始化：重新设定随机种子，避免各进程生成相同的模拟序列"""
+    chan_theory_engine.kline_simulator = KlineSimulator(seed=secrets.randbits(32))
+
+
+def _run_complete_analysis(
+    count: int,
+    start_price: float,
+    time_interval: str,
+    volatility: float,
+    trend_bias: float,
+    seed: Optional[int] = None
+) -> bytes:
     """
-    完整的缠论分析
+    执行完整分析并编码响应
+    
+    在分析进程池中运行，直接返回编码好的JSON，避免跨进程传递分析结果对象。
     
     Args:
-        request: 完整分析请求
+        count: K线数量
+        start_price: 起始价格
+        time_interval: 时间间隔
+        volatility: 波动率
+        trend_bias: 趋势偏向
+        seed: 随机数种子
         
     Returns:
-        完整的分析结果
+        JSON响应字节串
+        
+    Raises:
+        RuntimeError: 分析失败；部分异常（如pydantic校验错误）无法跨进程反序列化，
+            统一转换为只携带消息的RuntimeError
     """
     try:
         result = chan_theory_engine.complete_analysis(
-            count=request.count,
-            start_price=request.start_price,
-            time_interval=request.time_interval,
-            volatility=request.volatility,
-            trend_bias=request.trend_bias
+            count=count,
+            start_price=start_price,
+            time_interval=time_interval,
+            volatility=volatility,
+            trend_bias=trend_bias,
+            seed=seed
         )
         
         # 获取分析摘要
@@ -179,24 +299,53 @@ async def complete_analysis(request: CompleteAnalysisRequest):
         # 获取质量评估
         quality = chan_theory_engine.validate_analysis_quality(result)
         
-        return APIResponse(
-            success=True,
+        return encode_api_response(
             message="完整缠论分析完成",
             data={
                 "analysis_result": serialize_analysis_result(result),
                 "summary": summary,
                 "quality": quality
-            },
-            timestamp=datetime.now()
+            }
         )
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+@router.post("/complete", response_model=None, responses={200: {"model": APIResponse}})
+async def complete_analysis(request: CompleteAnalysisRequest):
+    """
+    完整的缠论分析
+    
+    Args:
+        request: 完整分析请求
+        
+    Returns:
+        完整的分析结果
+    """
+    try:
+        # 分析在进程池中执行，多个请求可跨CPU核并行
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(
+            get_analysis_executor(initializer=_init_analysis_worker),
+            _run_complete_analysis,
+            request.count,
+            request.start_price,
+            request.time_interval,
+            request.volatility,
+            request.trend_bias,
+            request.seed
+        )
+        
+        # 响应在工作进程中整体编码，这里分块流式写出
+        return stream_encoded_response(content)
         
     except Exception as e:
         print(str(e))
         raise HTTPException(status_code=500, detail=f"缠论分析失败: {str(e)}")
 
 
-@router.post("/fenxing", response_model=APIResponse)
-async def analyze_fenxing(request: FenxingAnalysisRequest):
+@router.post("/fenxing", response_model=None, responses={200: {"model": APIResponse}})
+def analyze_fenxing(request: FenxingAnalysisRequest):
     """
     分型分析
     
@@ -215,38 +364,47 @@ async def analyze_fenxing(request: FenxingAnalysisRequest):
             kline_data, request.min_strength
         )
         
-        # 序列化分型点
+        # 序列化分型点，同时累计统计量
         fenxing_list = []
+        top_count = 0
+        bottom_count = 0
+        confidence_sum = 0.0
         for fenxing in fenxing_points:
+            fenxing_type = fenxing.type.value
+            if fenxing_type == "top":
+                top_count += 1
+            elif fenxing_type == "bottom":
+                bottom_count += 1
+            confidence_sum += fenxing.confidence
             fenxing_list.append({
                 "index": fenxing.index,
-                "type": fenxing.type.value,
+                "type": fenxing_type,
                 "high": fenxing.high,
                 "low": fenxing.low,
                 "price": fenxing.price,
-                "timestamp": fenxing.timestamp.isoformat(),
+                "timestamp": fenxing.timestamp,
                 "confidence": fenxing.confidence
             })
         
-        return APIResponse(
-            success=True,
-            message=f"识别到{len(fenxing_points)}个分型点",
+        total_count = len(fenxing_points)
+        
+        return api_response(
+            message=f"识别到{total_count}个分型点",
             data={
                 "fenxing_points": fenxing_list,
-                "total_count": len(fenxing_points),
-                "top_count": len([f for f in fenxing_points if f.type.value == "top"]),
-                "bottom_count": len([f for f in fenxing_points if f.type.value == "bottom"]),
-                "avg_confidence": sum(f.confidence for f in fenxing_points) / len(fenxing_points) if fenxing_points else 0
-            },
-            timestamp=datetime.now()
+                "total_count": total_count,
+                "top_count": top_count,
+                "bottom_count": bottom_count,
+                "avg_confidence": confidence_sum / total_count if total_count else 0
+            }
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分型分析失败: {str(e)}")
 
 
-@router.post("/stroke", response_model=APIResponse)
-async def analyze_stroke(request: StrokeAnalysisRequest):
+@router.post("/stroke", response_model=None, responses={200: {"model": APIResponse}})
+def analyze_stroke(request: StrokeAnalysisRequest):
     """
     笔分析
     
@@ -263,14 +421,13 @@ async def analyze_stroke(request: StrokeAnalysisRequest):
         # 转换分型点数据
         fenxing_points = []
         for fenxing_dict in request.fenxing_points:
-            from models.analysis import FenxingPoint, FenxingType
             fenxing = FenxingPoint(
                 index=fenxing_dict["index"],
-                type=FenxingType(fenxing_dict["type"]),
+                type=_fenxing_type(fenxing_dict["type"]),
                 high=fenxing_dict["high"],
                 low=fenxing_dict["low"],
                 price=fenxing_dict["price"],
-                timestamp=datetime.fromisoformat(fenxing_dict["timestamp"]),
+                timestamp=parse_datetime(fenxing_dict["timestamp"]),
                 confidence=fenxing_dict["confidence"]
             )
             fenxing_points.append(fenxing)
@@ -279,44 +436,78 @@ async def analyze_stroke(request: StrokeAnalysisRequest):
         strokes = chan_theory_engine.analyze_strokes_only(kline_data, fenxing_points)
         
         # 序列化笔数据
+        serialize_endpoint = _make_endpoint_serializer(include_timestamp=False)
         stroke_list = []
         for stroke in strokes:
             stroke_list.append({
-                "start_fenxing": {
-                    "index": stroke.start_fenxing.index,
-                    "type": stroke.start_fenxing.type.value,
-                    "price": stroke.start_fenxing.price
-                },
-                "end_fenxing": {
-                    "index": stroke.end_fenxing.index,
-                    "type": stroke.end_fenxing.type.value,
-                    "price": stroke.end_fenxing.price
-                },
+                "start_fenxing": serialize_endpoint(stroke.start_fenxing),
+                "end_fenxing": serialize_endpoint(stroke.end_fenxing),
                 "direction": stroke.direction.value,
                 "price_range": stroke.price_range,
                 "kline_count": stroke.kline_count,
-                "start_time": stroke.start_time.isoformat(),
-                "end_time": stroke.end_time.isoformat()
+                "start_time": stroke.start_time,
+                "end_time": stroke.end_time
             })
         
         # 获取笔特征统计
         stroke_features = chan_theory_engine.stroke_builder.analyze_stroke_features(strokes)
         
-        return APIResponse(
-            success=True,
+        return api_response(
             message=f"构建了{len(strokes)}个笔",
             data={
                 "strokes": stroke_list,
                 "features": stroke_features
-            },
-            timestamp=datetime.now()
+            }
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"笔分析失败: {str(e)}")
 
 
-@router.post("/center", response_model=APIResponse)
+# 尚未实现的接口及功能介绍返回固定内容，导入时预先编码
+_CENTER_STUB_RESPONSE = prebuild_api_response(
+    message="中枢分析功能正在开发中",
+    data={
+        "centers": [],
+        "message": "请使用完整分析接口获取中枢分析结果"
+    }
+)
+
+_DIVERGENCE_STUB_RESPONSE = prebuild_api_response(
+    message="背驰分析功能正在开发中",
+    data={
+        "divergence_signals": [],
+        "message": "请使用完整分析接口获取背驰分析结果"
+    }
+)
+
+_ANALYSIS_INFO_RESPONSE = prebuild_api_response(
+    message="缠论分析功能介绍",
+    data={
+        "features": {
+            "complete_analysis": "完整缠论分析，包含分型、笔、线段、中枢、背驰",
+            "fenxing_analysis": "分型识别，寻找顶分型和底分型",
+            "stroke_analysis": "笔构建，连接相邻分型形成笔",
+            "center_analysis": "中枢识别，寻找价格重叠区间",
+            "divergence_analysis": "背驰检测，基于MACD指标判断背驰"
+        },
+        "algorithms": {
+            "fenxing_detector": "基于价格突出程度、成交量确认等多维度评估",
+            "stroke_builder": "严格按照缠论定义构建笔和线段",
+            "center_detector": "识别线段重叠区间，分类中枢类型",
+            "divergence_detector": "MACD背驰算法，趋势力度对比"
+        },
+        "supported_patterns": [
+            "double_top", "double_bottom", "head_shoulders"
+        ],
+        "supported_trends": [
+            "up", "down", "sideways"
+        ]
+    }
+)
+
+
+@router.post("/center", response_model=None, responses={200: {"model": APIResponse}})
 async def analyze_center(request: CenterAnalysisRequest):
     """
     中枢分析
@@ -327,24 +518,12 @@ async def analyze_center(request: CenterAnalysisRequest):
     Returns:
         中枢分析结果
     """
-    try:
-        # 这里简化处理，实际应该从segments数据重构Segment对象
-        # 暂时返回示例数据
-        return APIResponse(
-            success=True,
-            message="中枢分析功能正在开发中",
-            data={
-                "centers": [],
-                "message": "请使用完整分析接口获取中枢分析结果"
-            },
-            timestamp=datetime.now()
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"中枢分析失败: {str(e)}")
+    # 这里简化处理，实际应该从segments数据重构Segment对象
+    # 暂时返回示例数据
+    return prebuilt_response(_CENTER_STUB_RESPONSE)
 
 
-@router.post("/divergence", response_model=APIResponse)
+@router.post("/divergence", response_model=None, responses={200: {"model": APIResponse}})
 async def analyze_divergence(request: DivergenceAnalysisRequest):
     """
     背驰分析
@@ -355,21 +534,9 @@ async def analyze_divergence(request: DivergenceAnalysisRequest):
     Returns:
         背驰分析结果
     """
-    try:
-        # 这里简化处理，实际应该从输入数据重构所需对象
-        # 暂时返回示例数据
-        return APIResponse(
-            success=True,
-            message="背驰分析功能正在开发中",
-            data={
-                "divergence_signals": [],
-                "message": "请使用完整分析接口获取背驰分析结果"
-            },
-            timestamp=datetime.now()
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"背驰分析失败: {str(e)}")
+    # 这里简化处理，实际应该从输入数据重构所需对象
+    # 暂时返回示例数据
+    return prebuilt_response(_DIVERGENCE_STUB_RESPONSE)
 
 
 @router.get("/summary")
@@ -380,29 +547,4 @@ async def get_analysis_info():
     Returns:
         分析功能介绍
     """
-    return APIResponse(
-        success=True,
-        message="缠论分析功能介绍",
-        data={
-            "features": {
-                "complete_analysis": "完整缠论分析，包含分型、笔、线段、中枢、背驰",
-                "fenxing_analysis": "分型识别，寻找顶分型和底分型",
-                "stroke_analysis": "笔构建，连接相邻分型形成笔",
-                "center_analysis": "中枢识别，寻找价格重叠区间",
-                "divergence_analysis": "背驰检测，基于MACD指标判断背驰"
-            },
-            "algorithms": {
-                "fenxing_detector": "基于价格突出程度、成交量确认等多维度评估",
-                "stroke_builder": "严格按照缠论定义构建笔和线段",
-                "center_detector": "识别线段重叠区间，分类中枢类型",
-                "divergence_detector": "MACD背驰算法，趋势力度对比"
-            },
-            "supported_patterns": [
-                "double_top", "double_bottom", "head_shoulders"
-            ],
-            "supported_trends": [
-                "up", "down", "sideways"
-            ]
-        },
-        timestamp=datetime.now()
-    )
\ No newline at end of file
+    return prebuilt_response(_ANALYSIS_INFO_RESPONSE)
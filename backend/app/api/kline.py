@@ -1,17 +1,27 @@
-from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
+from core.config import settings
 from models.requests import (
     KlineGenerateRequest, APIResponse
 )
 from services.chan_theory_engine import chan_theory_engine
+from services.kline_simulator import KlineSimulator
+from utils.serialization import (
+    KLINE_STREAM_PLACEHOLDER, api_response, prebuild_api_response, prebuilt_response,
+    serialize_kline_rows, stream_kline_response
+)
 
 router = APIRouter()
 
+# 随机数种子的取值范围（numpy RandomState 接受的范围）
+_MAX_SEED = 2 ** 32 - 1
+
 
-@router.post("/generate", response_model=APIResponse)
-async def generate_kline_data(request: KlineGenerateRequest):
+@router.post("/generate", response_model=None, responses={200: {"model": APIResponse}})
+def generate_kline_data(request: KlineGenerateRequest):
     """
     生成模拟K线数据
     
@@ -30,24 +40,11 @@ async def generate_kline_data(request: KlineGenerateRequest):
             trend_bias=request.trend_bias
         )
 
-        # 转换为字典格式便于JSON序列化
-        kline_dict_list = []
-        for kline in kline_data:
-            kline_dict = {
-                "timestamp": kline.timestamp.isoformat(),
-                "open": kline.open,
-                "high": kline.high,
-                "low": kline.low,
-                "close": kline.close,
-                "volume": kline.volume
-            }
-            kline_dict_list.append(kline_dict)
-
-        return APIResponse(
-            success=True,
+        # K线数组按块流式编码，不再一次性构建全部行字典
+        return stream_kline_response(
             message=f"成功生成{len(kline_data)}根K线数据",
             data={
-                "kline_data": kline_dict_list,
+                "kline_data": KLINE_STREAM_PLACEHOLDER,
                 "count": len(kline_data),
                 "start_price": request.start_price,
                 "end_price": kline_data[-1].close if kline_data else request.start_price,
@@ -55,19 +52,121 @@ async def generate_kline_data(request: KlineGenerateRequest):
                 "price_change_ratio": (kline_data[
                                            -1].close - request.start_price) / request.start_price if kline_data else 0
             },
-            timestamp=datetime.now()
+            kline_data=kline_data
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"生成K线数据失败: {str(e)}")
 
 
+def _build_pattern_payload(
+        simulator: KlineSimulator,
+        pattern_type: str,
+        count: int,
+        start_price: float,
+        volatility: float
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    生成模式K线数据并组装响应内容
+    
+    Args:
+        simulator: K线模拟器
+        pattern_type: 模式类型
+        count: K线数量
+        start_price: 起始价格
+        volatility: 波动率
+        
+    Returns:
+        (响应消息, 响应数据)
+    """
+    kline_data = simulator.generate_with_patterns(
+        count=count,
+        start_price=start_price,
+        pattern_type=pattern_type,
+        volatility=volatility
+    )
+
+    return f"成功生成{pattern_type}模式K线数据", {
+        "pattern_type": pattern_type,
+        "kline_data": serialize_kline_rows(kline_data),
+        "count": len(kline_data)
+    }
+
+
+def _build_trending_payload(
+        simulator: KlineSimulator,
+        direction: str,
+        count: int,
+        start_price: float,
+        volatility: float
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    生成趋势K线数据并组装响应内容
+    
+    Args:
+        simulator: K线模拟器
+        direction: 趋势方向
+        count: K线数量
+        start_price: 起始价格
+        volatility: 波动率
+        
+    Returns:
+        (响应消息, 响应数据)
+    """
+    kline_data = simulator.generate_trending_data(
+        count=count,
+        start_price=start_price,
+        trend_direction=direction,
+        volatility=volatility
+    )
+
+    return f"成功生成{direction}趋势K线数据", {
+        "trend_direction": direction,
+        "kline_data": serialize_kline_rows(kline_data),
+        "count": len(kline_data),
+        "start_price": start_price,
+        "end_price": kline_data[-1].close if kline_data else start_price
+    }
+
+
+# 指定种子时生成结果由参数唯一确定，按参数缓存预编码的响应
+@lru_cache(maxsize=256)
+def _seeded_pattern_response(
+        pattern_type: str,
+        count: int,
+        start_price: float,
+        volatility: float,
+        seed: int
+) -> Tuple[bytes, bytes]:
+    """生成并预编码指定种子的模式K线响应"""
+    message, data = _build_pattern_payload(
+        KlineSimulator(seed=seed), pattern_type, count, start_price, volatility
+    )
+    return prebuild_api_response(message, data)
+
+
+@lru_cache(maxsize=256)
+def _seeded_trending_response(
+        direction: str,
+        count: int,
+        start_price: float,
+        volatility: float,
+        seed: int
+) -> Tuple[bytes, bytes]:
+    """生成并预编码指定种子的趋势K线响应"""
+    message, data = _build_trending_payload(
+        KlineSimulator(seed=seed), direction, count, start_price, volatility
+    )
+    return prebuild_api_response(message, data)
+
+
 @router.get("/patterns/{pattern_type}")
-async def generate_pattern_data(
+def generate_pattern_data(
         pattern_type: str,
-        count: int = 100,
+        count: int = Query(100, ge=1, le=settings.max_kline_count),
         start_price: float = 100.0,
-        volatility: float = 0.02
+        volatility: float = 0.02,
+        seed: Optional[int] = Query(None, ge=0, le=_MAX_SEED)
 ):
     """
     生成特定技术分析模式的K线数据
@@ -77,6 +176,7 @@ async def generate_pattern_data(
         count: K线数量
         start_price: 起始价格
         volatility: 波动率
+        seed: 随机数种子，指定时相同参数返回缓存的同一份数据
         
     Returns:
         包含特定模式的K线数据
@@ -89,35 +189,18 @@ async def generate_pattern_data(
                 detail=f"不支持的模式类型。支持的类型: {', '.join(valid_patterns)}"
             )
 
-        kline_data = chan_theory_engine.kline_simulator.generate_with_patterns(
-            count=count,
-            start_price=start_price,
-            pattern_type=pattern_type,
-            volatility=volatility
+        if seed is not None:
+            return prebuilt_response(
+                _seeded_pattern_response(pattern_type, count, start_price, volatility, seed)
+            )
+
+        message, data = _build_pattern_payload(
+            chan_theory_engine.kline_simulator, pattern_type, count, start_price, volatility
         )
 
-        # 转换为字典格式
-        kline_dict_list = []
-        for kline in kline_data:
-            kline_dict = {
-                "timestamp": kline.timestamp.isoformat(),
-                "open": kline.open,
-                "high": kline.high,
-                "low": kline.low,
-                "close": kline.close,
-                "volume": kline.volume
-            }
-            kline_dict_list.append(kline_dict)
-
-        return APIResponse(
-            success=True,
-            message=f"成功生成{pattern_type}模式K线数据",
-            data={
-                "pattern_type": pattern_type,
-                "kline_data": kline_dict_list,
-                "count": len(kline_data)
-            },
-            timestamp=datetime.now()
+        return api_response(
+            message=message,
+            data=data
         )
 
     except Exception as e:
@@ -125,11 +208,12 @@ async def generate_pattern_data(
 
 
 @router.get("/trending/{direction}")
-async def generate_trending_data(
+def generate_trending_data(
         direction: str,
-        count: int = 100,
+        count: int = Query(100, ge=1, le=settings.max_kline_count),
         start_price: float = 100.0,
-        volatility: float = 0.02
+        volatility: float = 0.02,
+        seed: Optional[int] = Query(None, ge=0, le=_MAX_SEED)
 ):
     """
     生成特定趋势的K线数据
@@ -139,6 +223,7 @@ async def generate_trending_data(
         count: K线数量
         start_price: 起始价格
         volatility: 波动率
+        seed: 随机数种子，指定时相同参数返回缓存的同一份数据
         
     Returns:
         特定趋势的K线数据
@@ -151,37 +236,18 @@ async def generate_trending_data(
                 detail=f"不支持的趋势方向。支持的方向: {', '.join(valid_directions)}"
             )
 
-        kline_data = chan_theory_engine.kline_simulator.generate_trending_data(
-            count=count,
-            start_price=start_price,
-            trend_direction=direction,
-            volatility=volatility
+        if seed is not None:
+            return prebuilt_response(
+                _seeded_trending_response(direction, count, start_price, volatility, seed)
+            )
+
+        message, data = _build_trending_payload(
+            chan_theory_engine.kline_simulator, direction, count, start_price, volatility
         )
 
-        # 转换为字典格式
-        kline_dict_list = []
-        for kline in kline_data:
-            kline_dict = {
-                "timestamp": kline.timestamp.isoformat(),
-                "open": kline.open,
-                "high": kline.high,
-                "low": kline.low,
-                "close": kline.close,
-                "volume": kline.volume
-            }
-            kline_dict_list.append(kline_dict)
-
-        return APIResponse(
-            success=True,
-            message=f"成功生成{direction}趋势K线数据",
-            data={
-                "trend_direction": direction,
-                "kline_data": kline_dict_list,
-                "count": len(kline_data),
-                "start_price": start_price,
-                "end_price": kline_data[-1].close if kline_data else start_price
-            },
-            timestamp=datetime.now()
+        return api_response(
+            message=message,
+            data=data
         )
 
     except Exception as e:
@@ -1,7 +1,8 @@
 # FastAPI应用配置
 import os
+from typing import Optional
 
-from pydantic.v1 import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -13,15 +14,21 @@ class Settings(BaseSettings):
     # API设置
     api_v1_prefix: str = "/api"
     
-    # CORS设置
-    backend_cors_origins: list = ["*"]
+    # CORS设置（前端由本服务同源提供，默认只放行本机地址，可通过环境变量覆盖）
+    backend_cors_origins: list = ["http://localhost:8000", "http://127.0.0.1:8000"]
+    
+    # 响应压缩设置
+    gzip_minimum_size: int = 1024
+    gzip_compress_level: int = 5
+    
+    # 分析进程池工作进程数，None表示CPU核数，0表示不使用进程池
+    analysis_process_workers: Optional[int] = None
     
     # 数据设置
     default_kline_count: int = 100
     max_kline_count: int = 1000
     
-    class Config:
-        env_file = ".env"
+    model_config = SettingsConfigDict(env_file=".env")
 
 
 # 全局设置实例
@@ -0,0 +1,72 @@
+# 分析任务执行器
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from core.config import settings
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_stage_pool: Optional[ThreadPoolExecutor] = None
+_stage_pool_lock = threading.Lock()
+
+
+def get_analysis_executor(initializer: Optional[Callable[[], None]] = None) -> Optional[Executor]:
+    """
+    获取运行CPU密集型分析任务的进程池
+    
+    进程池在首次使用时创建，各工作进程独立持有GIL，多个分析请求可并行执行。
+    
+    Args:
+        initializer: 工作进程启动时调用的初始化函数
+        
+    Returns:
+        进程池；配置为0个工作进程时返回None，由调用方改用默认线程池
+    """
+    global _process_pool
+    
+    workers = settings.analysis_process_workers
+    if workers == 0:
+        return None
+    
+    if _process_pool is None:
+        # 使用spawn启动，避免在已有线程的服务进程中fork
+        _process_pool = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initializer
+        )
+    return _process_pool
+
+
+def get_stage_executor() -> ThreadPoolExecutor:
+    """
+    获取在单次分析内并行执行相互独立步骤的线程池
+    
+    NumPy/pandas计算期间释放GIL，可与纯Python的结构识别步骤重叠执行。
+    线程池按进程创建，分析工作进程中各自持有一个。
+    
+    Returns:
+        线程池
+    """
+    global _stage_pool
+    
+    if _stage_pool is None:
+        with _stage_pool_lock:
+            if _stage_pool is None:
+                _stage_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chan-stage")
+    return _stage_pool
+
+
+def shutdown_analysis_executor() -> None:
+    """关闭分析进程池及步骤线程池"""
+    global _process_pool, _stage_pool
+    
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+    
+    if _stage_pool is not None:
+        _stage_pool.shutdown(wait=False, cancel_futures=True)
+        _stage_pool = None
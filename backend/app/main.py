@@ -1,9 +1,17 @@
+from pathlib import Path
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from api import api_router
 from core.config import settings
+from core.executor import shutdown_analysis_executor
+
+# 前端目录按本文件定位（backend/app/main.py 上两级），不依赖启动时的工作目录
+_FRONTEND_DIR = Path(__file__).resolve().parents[2] / "frontend"
 
 
 def create_application() -> FastAPI:
@@ -13,7 +21,9 @@ def create_application() -> FastAPI:
         version=settings.version,
         description=settings.description,
         docs_url="/docs",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        # orjson原生序列化datetime/float，避免标准库json的二次编码开销
+        default_response_class=ORJSONResponse
     )
 
     # 添加CORS中间件
@@ -25,11 +35,21 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # 压缩较大的K线JSON响应
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.gzip_minimum_size,
+        compresslevel=settings.gzip_compress_level
+    )
+
+    # 关闭时释放分析进程池
+    app.add_event_handler("shutdown", shutdown_analysis_executor)
+
     # 注册API路由
     app.include_router(api_router, prefix=settings.api_v1_prefix)
 
     # 静态文件服务
-    app.mount("/", StaticFiles(directory="../../frontend", html=True), name="frontend")
+    app.mount("/", StaticFiles(directory=_FRONTEND_DIR, html=True), name="frontend")
 
     return app
 
@@ -118,7 +118,7 @@ class MACDData(BaseModel):
 
 class DivergenceSignal(BaseModel):
     """背驰信号模型"""
-    center: Center = Field(..., description="相关中枢")
+    center: Optional[Center] = Field(None, description="相关中枢，趋势背驰不关联特定中枢时为None")
     signal_time: datetime = Field(..., description="信号时间")
     signal_type: str = Field(..., description="信号类型")
     strength: float = Field(..., description="背驰强度", ge=0, le=1)
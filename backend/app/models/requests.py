@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, TypedDict
 from datetime import datetime
 
 
@@ -48,6 +48,9 @@ class CompleteAnalysisRequest(AnalysisRequest):
     time_interval: str = Field("1m", description="时间间隔")
     volatility: float = Field(0.02, description="波动率", ge=0.001, le=0.1)
     trend_bias: float = Field(0.0, description="趋势偏向", ge=-0.05, le=0.05)
+    seed: Optional[int] = Field(
+        None, description="随机数种子，指定时相同参数生成相同的K线序列", ge=0, le=2 ** 32 - 1
+    )
 
 
 class APIResponse(BaseModel):
@@ -60,4 +63,12 @@ class APIResponse(BaseModel):
     class Config:
         json_encoders = {
             datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+class APIResponseDict(TypedDict):
+    """API响应字典，结构与APIResponse一致，由orjson直接编码，不经过pydantic"""
+    success: bool
+    message: str
+    data: Optional[dict]
+    timestamp: datetime
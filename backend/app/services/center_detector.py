@@ -1,7 +1,192 @@
-from typing import List, Optional, Tuple
+import bisect
+from operator import attrgetter
+from typing import List, NamedTuple
+
+import numpy as np
+
 from models.analysis import (
-    KlineData, Segment, Center, CenterType, StrokeDirection
+    KlineData, Segment, Center, CenterType
 )
+from utils._njit import njit, kernel_input
+from utils.timestamps import datetimes_to_us
+
+
+# 中枢强度下限，低于该值的候选中枢被丢弃
+_MIN_CENTER_STRENGTH = 0.3
+
+# 候选中枢数量达到该值时才使用按时间有序的查找，数量较少时直接两两比较更快
+_SWEEP_MIN_CENTERS = 16
+
+# 中枢类型编码到枚举的映射，编码由 _center_type_code 产生
+_CENTER_TYPES = {1: CenterType.UP, -1: CenterType.DOWN, 0: CenterType.CONSOLIDATION}
+
+
+class SegmentArrays(NamedTuple):
+    """线段数值列（SoA），一次构建后供各分析步骤复用"""
+    start_price: np.ndarray  # 起始价格
+    end_price: np.ndarray    # 结束价格
+    high: np.ndarray         # 线段最高价（含线段内各笔端点）
+    low: np.ndarray          # 线段最低价（含线段内各笔端点）
+    span_high: np.ndarray    # 起止价中的较高者
+    span_low: np.ndarray     # 起止价中的较低者
+    start_us: np.ndarray     # 开始时间（int64 微秒）
+    end_us: np.ndarray       # 结束时间（int64 微秒）
+
+
+@njit(cache=True)
+def _passes_shape(high_price, low_price, duration):
+    """区间大小与持续时间检查：区间相对均价在0.1%-50%之间，且持续至少1小时"""
+    center_range = high_price - low_price
+    
+    avg_price = (high_price + low_price) / 2
+    if center_range / avg_price > 0.5:  # 区间过大
+        return False
+    
+    if center_range / avg_price < 0.001:  # 区间过小
+        return False
+    
+    if duration < 3600:  # 少于1小时
+        return False
+    
+    return True
+
+
+@njit(cache=True)
+def _oscillation_range_sum(span_highs, span_lows, start, end, high_price, low_price):
+    """[start, end) 内起止价区间完全落在中枢内的线段振幅之和"""
+    total = 0.0
+    for i in range(start, end):
+        if span_lows[i] >= low_price and span_highs[i] <= high_price:
+            total += span_highs[i] - span_lows[i]
+    return total
+
+
+@njit(cache=True)
+def _oscillation_factor(oscillation_sum, center_range):
+    """振荡幅度相对中枢区间的评分 (0-1)"""
+    if center_range == 0:
+        return 0.0
+    
+    oscillation_ratio = oscillation_sum / center_range if center_range > 0 else 0.0
+    return min(1.0, oscillation_ratio / 2.0)  # 振荡幅度达到中枢2倍为满分
+
+
+@njit(cache=True)
+def _center_strength(segment_count, high_price, low_price, duration, oscillation_sum):
+    """中枢强度评分 (0-1)：线段数量、重叠区间大小、时间持续长度、价格振荡幅度四项各占25%"""
+    # 1. 线段数量因子 (25%)
+    segment_count_factor = min(1.0, (segment_count - 3) / 5.0 + 0.5)
+    
+    # 2. 重叠区间因子 (25%)
+    center_range = high_price - low_price
+    avg_price = (high_price + low_price) / 2
+    range_ratio = center_range / avg_price
+    range_factor = min(1.0, range_ratio / 0.1)  # 区间占价格10%为满分
+    
+    # 3. 时间持续因子 (25%)
+    if segment_count > 1:
+        duration_hours = duration / 3600
+        duration_factor = min(1.0, duration_hours / 24.0)  # 24小时为满分
+    else:
+        duration_factor = 0.5
+    
+    # 4. 价格振荡因子 (25%)
+    oscillation_factor = _oscillation_factor(oscillation_sum, center_range)
+    
+    # 加权计算总强度
+    total_strength = (
+        segment_count_factor * 0.25 +
+        range_factor * 0.25 +
+        duration_factor * 0.25 +
+        oscillation_factor * 0.25
+    )
+    
+    return min(1.0, max(0.0, total_strength))
+
+
+@njit(cache=True)
+def _center_type_code(start_price, end_price):
+    """中枢类型编码：1 上涨，-1 下跌，0 整理"""
+    price_change_ratio = (end_price - start_price) / start_price
+    
+    if price_change_ratio > 0.02:  # 上涨超过2%
+        return 1
+    elif price_change_ratio < -0.02:  # 下跌超过2%
+        return -1
+    return 0
+
+
+@njit(cache=True)
+def _find_centers_kernel(
+    segment_highs, segment_lows, span_highs, span_lows,
+    start_prices, end_prices, start_us, end_us
+):
+    """
+    线性扫描重叠线段区间，并在同一循环内完成验证和强度计算
+    
+    Args:
+        segment_highs: 各线段最高价
+        segment_lows: 各线段最低价
+        span_highs: 各线段起止价中的较高者
+        span_lows: 各线段起止价中的较低者
+        start_prices: 各线段起始价
+        end_prices: 各线段结束价
+        start_us: 各线段开始时间（微秒）
+        end_us: 各线段结束时间（微秒）
+        
+    Returns:
+        通过验证的中枢 (起始下标, 结束下标, 高点, 低点, 强度, 类型编码)，结束下标不包含在内
+    """
+    count = len(segment_highs)
+    run_starts = np.empty(count, dtype=np.int64)
+    run_ends = np.empty(count, dtype=np.int64)
+    center_highs = np.empty(count, dtype=np.float64)
+    center_lows = np.empty(count, dtype=np.float64)
+    strengths = np.empty(count, dtype=np.float64)
+    type_codes = np.empty(count, dtype=np.int64)
+    found = 0
+    
+    start = 0
+    while start < count:
+        overlap_high = segment_highs[start]
+        overlap_low = segment_lows[start]
+        end = start + 1
+        
+        while end < count:
+            next_high = min(overlap_high, segment_highs[end])
+            next_low = max(overlap_low, segment_lows[end])
+            if next_high <= next_low:
+                break
+            overlap_high = next_high
+            overlap_low = next_low
+            end += 1
+        
+        if end - start >= 3:
+            duration = int(end_us[end - 1] - start_us[start]) / 1_000_000
+            if _passes_shape(overlap_high, overlap_low, duration):
+                oscillation_sum = _oscillation_range_sum(
+                    span_highs, span_lows, start, end, overlap_high, overlap_low
+                )
+                strength = _center_strength(
+                    end - start, overlap_high, overlap_low, duration, oscillation_sum
+                )
+                if strength >= _MIN_CENTER_STRENGTH:
+                    run_starts[found] = start
+                    run_ends[found] = end
+                    center_highs[found] = overlap_high
+                    center_lows[found] = overlap_low
+                    strengths[found] = strength
+                    type_codes[found] = _center_type_code(
+                        start_prices[start], end_prices[end - 1]
+                    )
+                    found += 1
+        
+        start = end
+    
+    return (
+        run_starts[:found], run_ends[:found], center_highs[:found],
+        center_lows[:found], strengths[:found], type_codes[:found]
+    )
 
 
 class CenterDetector:
@@ -36,361 +221,184 @@ class CenterDetector:
         
         centers = []
         
-        # 滑动窗口寻找中枢
-        for i in range(len(segments) - 2):
-            for j in range(i + 3, len(segments) + 1):
-                candidate_segments = segments[i:j]
-                center = self._analyze_potential_center(candidate_segments)
-                
-                if center:
-                    # 验证中枢有效性
-                    if self._validate_center(center, kline_data):
-                        centers.append(center)
+        # 线段数值列只构建一次
+        arrays = self._segments_to_arrays(segments)
+        
+        # 扫描、验证与强度计算在编译核心中一次完成，仅为通过验证的区间构建中枢对象
+        run_starts, run_ends, highs, lows, strengths, type_codes = _find_centers_kernel(
+            *(kernel_input(column) for column in (
+                arrays.high, arrays.low, arrays.span_high, arrays.span_low,
+                arrays.start_price, arrays.end_price, arrays.start_us, arrays.end_us
+            ))
+        )
+        
+        for start, end, high_price, low_price, strength, type_code in zip(
+            run_starts.tolist(), run_ends.tolist(), highs.tolist(),
+            lows.tolist(), strengths.tolist(), type_codes.tolist()
+        ):
+            center_segments = segments[start:end]
+            centers.append(Center(
+                segments=center_segments,
+                center_type=_CENTER_TYPES[type_code],
+                high_price=high_price,
+                low_price=low_price,
+                center_range=high_price - low_price,
+                start_time=center_segments[0].start_time,
+                end_time=center_segments[-1].end_time,
+                strength=strength
+            ))
         
         # 去重和优化中枢
         optimized_centers = self._optimize_centers(centers)
         
         return optimized_centers
     
-    def _analyze_potential_center(self, segments: List[Segment]) -> Optional[Center]:
+    def _segments_to_arrays(self, segments: List[Segment]) -> SegmentArrays:
         """
-        分析潜在中枢
+        将线段列表转换为数值列
         
         Args:
-            segments: 候选线段列表
+            segments: 线段列表
             
         Returns:
-            中枢对象或None
+            线段数值列
         """
-        if len(segments) < 3:
-            return None
-        
-        # 计算重叠区间
-        overlap_range = self._calculate_overlap_range(segments)
-        if not overlap_range:
-            return None
-        
-        high_price, low_price = overlap_range
-        
-        # 检查重叠区间是否有效
-        if high_price <= low_price:
-            return None
-        
-        # 判断中枢类型
-        center_type = self._determine_center_type(segments)
-        
-        # 计算中枢强度
-        strength = self._calculate_center_strength(segments, overlap_range)
-        
-        center = Center(
-            segments=segments,
-            center_type=center_type,
-            high_price=high_price,
-            low_price=low_price,
-            center_range=high_price - low_price,
-            start_time=segments[0].start_time,
-            end_time=segments[-1].end_time,
-            strength=strength
+        count = len(segments)
+        start_prices = np.fromiter((s.start_price for s in segments), dtype=np.float64, count=count)
+        end_prices = np.fromiter((s.end_price for s in segments), dtype=np.float64, count=count)
+        
+        span_highs = np.maximum(start_prices, end_prices)
+        span_lows = np.minimum(start_prices, end_prices)
+        
+        # 时间转为整数微秒（与datetime精度一致），持续时间计算不再产生timedelta对象
+        start_us = datetimes_to_us((s.start_time for s in segments), count)
+        end_us = datetimes_to_us((s.end_time for s in segments), count)
+        
+        # 线段最高价、最低价：起止价与线段内各笔端点价格的最值。
+        # 各线段的笔端点价格首尾相接排成一列，按线段分组一次归约（线段至少含一笔）
+        stroke_counts = np.fromiter((len(s.strokes) for s in segments), dtype=np.int64, count=count)
+        stroke_total = int(stroke_counts.sum())
+        stroke_starts = np.fromiter(
+            (stroke.start_fenxing.price for s in segments for stroke in s.strokes),
+            dtype=np.float64, count=stroke_total
+        )
+        stroke_ends = np.fromiter(
+            (stroke.end_fenxing.price for s in segments for stroke in s.strokes),
+            dtype=np.float64, count=stroke_total
+        )
+        offsets = np.zeros(count, dtype=np.int64)
+        np.cumsum(stroke_counts[:-1], out=offsets[1:])
+        highs = np.maximum(span_highs, np.maximum.reduceat(np.maximum(stroke_starts, stroke_ends), offsets))
+        lows = np.minimum(span_lows, np.minimum.reduceat(np.minimum(stroke_starts, stroke_ends), offsets))
+        
+        return SegmentArrays(
+            start_price=start_prices,
+            end_price=end_prices,
+            high=highs,
+            low=lows,
+            span_high=span_highs,
+            span_low=span_lows,
+            start_us=start_us,
+            end_us=end_us
         )
-        
-        return center
     
-    def _calculate_overlap_range(self, segments: List[Segment]) -> Optional[Tuple[float, float]]:
+    def _optimize_centers(self, centers: List[Center]) -> List[Center]:
         """
-        计算线段重叠区间
+        优化中枢列表，去除重叠和低质量中枢
         
         Args:
-            segments: 线段列表
+            centers: 原始中枢列表
             
         Returns:
-            (high_price, low_price) 或 None
+            优化后的中枢列表
         """
-        if len(segments) < 3:
-            return None
-        
-        # 获取每个线段的价格区间
-        segment_ranges = []
-        for segment in segments:
-            segment_high = max(segment.start_price, segment.end_price)
-            segment_low = min(segment.start_price, segment.end_price)
-            
-            # 扩展区间以包含线段内的所有笔
-            for stroke in segment.strokes:
-                stroke_high = max(stroke.start_fenxing.price, stroke.end_fenxing.price)
-                stroke_low = min(stroke.start_fenxing.price, stroke.end_fenxing.price)
-                segment_high = max(segment_high, stroke_high)
-                segment_low = min(segment_low, stroke_low)
-            
-            segment_ranges.append((segment_high, segment_low))
-        
-        # 计算所有线段的重叠区间
-        overlap_high = min(range_high for range_high, _ in segment_ranges)
-        overlap_low = max(range_low for _, range_low in segment_ranges)
-        
-        # 检查是否有有效重叠
-        if overlap_high > overlap_low:
-            return (overlap_high, overlap_low)
+        if not centers:
+            return []
         
-        # 如果没有完全重叠，尝试放宽条件
-        return self._calculate_relaxed_overlap(segment_ranges)
-    
-    def _calculate_relaxed_overlap(self, segment_ranges: List[Tuple[float, float]]) -> Optional[Tuple[float, float]]:
-        """
-        计算放宽条件的重叠区间
+        # 按强度排序：去重需检查全部候选，无法提前结束，因此仍为完整排序
+        centers.sort(key=attrgetter("strength"), reverse=True)
         
-        Args:
-            segment_ranges: 线段价格区间列表
+        if len(centers) < _SWEEP_MIN_CENTERS:
+            optimized = []
             
-        Returns:
-            重叠区间或None
-        """
-        if len(segment_ranges) < 3:
-            return None
-        
-        # 寻找至少3个线段有重叠的区间
-        best_overlap = None
-        max_overlap_count = 0
-        
-        all_prices = []
-        for high, low in segment_ranges:
-            all_prices.extend([high, low])
-        
-        all_prices.sort()
-        
-        # 尝试不同的价格区间
-        for i in range(len(all_prices)):
-            for j in range(i + 1, len(all_prices)):
-                test_high = all_prices[j]
-                test_low = all_prices[i]
-                
-                # 计算有多少线段与此区间重叠
-                overlap_count = 0
-                for seg_high, seg_low in segment_ranges:
-                    if self._ranges_overlap((test_high, test_low), (seg_high, seg_low)):
-                        overlap_count += 1
+            for center in centers:
+                # 检查是否与已有中枢重叠
+                overlapped = False
+                for existing in optimized:
+                    if self._centers_overlap(center, existing):
+                        overlapped = True
+                        break
                 
-                if overlap_count >= 3 and overlap_count > max_overlap_count:
-                    max_overlap_count = overlap_count
-                    best_overlap = (test_high, test_low)
-        
-        return best_overlap
-    
-    def _ranges_overlap(self, range1: Tuple[float, float], range2: Tuple[float, float]) -> bool:
-        """
-        检查两个价格区间是否重叠
-        
-        Args:
-            range1: 第一个区间 (high, low)
-            range2: 第二个区间 (high, low)
-            
-        Returns:
-            是否重叠
-        """
-        high1, low1 = range1
-        high2, low2 = range2
-        
-        return not (high1 <= low2 or high2 <= low1)
-    
-    def _determine_center_type(self, segments: List[Segment]) -> CenterType:
-        """
-        判断中枢类型
-        
-        Args:
-            segments: 构成中枢的线段
-            
-        Returns:
-            中枢类型
-        """
-        if not segments:
-            return CenterType.CONSOLIDATION
-        
-        # 统计上升和下降线段
-        up_segments = [s for s in segments if s.direction == StrokeDirection.UP]
-        down_segments = [s for s in segments if s.direction == StrokeDirection.DOWN]
-        
-        # 计算整体趋势
-        start_price = segments[0].start_price
-        end_price = segments[-1].end_price
-        
-        price_change_ratio = (end_price - start_price) / start_price
-        
-        # 判断中枢类型
-        if price_change_ratio > 0.02:  # 上涨超过2%
-            return CenterType.UP
-        elif price_change_ratio < -0.02:  # 下跌超过2%
-            return CenterType.DOWN
+                if not overlapped:
+                    optimized.append(center)
         else:
-            return CenterType.CONSOLIDATION
-    
-    def _calculate_center_strength(
-        self,
-        segments: List[Segment],
-        overlap_range: Tuple[float, float]
-    ) -> float:
-        """
-        计算中枢强度
-        
-        强度计算因素：
-        1. 参与线段数量
-        2. 重叠区间大小
-        3. 时间持续长度
-        4. 价格振荡幅度
-        
-        Args:
-            segments: 构成中枢的线段
-            overlap_range: 重叠区间
-            
-        Returns:
-            强度值 (0-1)
-        """
-        high_price, low_price = overlap_range
-        
-        # 1. 线段数量因子 (25%)
-        segment_count_factor = min(1.0, (len(segments) - 3) / 5.0 + 0.5)
-        
-        # 2. 重叠区间因子 (25%)
-        center_range = high_price - low_price
-        avg_price = (high_price + low_price) / 2
-        range_ratio = center_range / avg_price
-        range_factor = min(1.0, range_ratio / 0.1)  # 区间占价格10%为满分
-        
-        # 3. 时间持续因子 (25%)
-        if len(segments) > 1:
-            duration = (segments[-1].end_time - segments[0].start_time).total_seconds()
-            duration_hours = duration / 3600
-            duration_factor = min(1.0, duration_hours / 24.0)  # 24小时为满分
-        else:
-            duration_factor = 0.5
-        
-        # 4. 价格振荡因子 (25%)
-        oscillation_factor = self._calculate_oscillation_factor(segments, overlap_range)
-        
-        # 加权计算总强度
-        total_strength = (
-            segment_count_factor * 0.25 +
-            range_factor * 0.25 +
-            duration_factor * 0.25 +
-            oscillation_factor * 0.25
-        )
-        
-        return min(1.0, max(0.0, total_strength))
-    
-    def _calculate_oscillation_factor(
-        self,
-        segments: List[Segment],
-        overlap_range: Tuple[float, float]
-    ) -> float:
-        """
-        计算价格振荡因子
-        
-        Args:
-            segments: 线段列表
-            overlap_range: 重叠区间
-            
-        Returns:
-            振荡因子 (0-1)
-        """
-        high_price, low_price = overlap_range
-        center_range = high_price - low_price
-        
-        if center_range == 0:
-            return 0.0
+            optimized = self._select_non_overlapping(centers)
         
-        # 计算价格在中枢内的振荡次数和幅度
-        oscillations = 0
-        total_oscillation_range = 0
-        
-        for segment in segments:
-            segment_high = max(segment.start_price, segment.end_price)
-            segment_low = min(segment.start_price, segment.end_price)
-            
-            # 检查线段是否在中枢内振荡
-            if low_price <= segment_low <= high_price and low_price <= segment_high <= high_price:
-                oscillations += 1
-                total_oscillation_range += abs(segment.end_price - segment.start_price)
-        
-        # 振荡因子计算
-        oscillation_ratio = total_oscillation_range / center_range if center_range > 0 else 0
-        oscillation_factor = min(1.0, oscillation_ratio / 2.0)  # 振荡幅度达到中枢2倍为满分
+        # 按时间排序
+        optimized.sort(key=attrgetter("start_time"))
         
-        return oscillation_factor
+        return optimized
     
-    def _validate_center(self, center: Center, kline_data: List[KlineData]) -> bool:
+    def _select_non_overlapping(self, centers: List[Center]) -> List[Center]:
         """
-        验证中枢有效性
+        按给定顺序贪心保留互不重叠的中枢
         
-        验证条件：
-        1. 中枢区间合理
-        2. 价格在区间内有足够振荡
-        3. 时间持续足够
-        4. 结构完整性
+        已保留中枢按开始时间有序存放，并记录其中最长的持续时间。
+        与新中枢时间重叠的已保留中枢，其开始时间必然落在
+        (start_time - 最长持续时间, end_time) 内，只需二分定位后检查该窗口。
         
         Args:
-            center: 中枢对象
-            kline_data: K线数据
+            centers: 按优先级排序的中枢列表
             
         Returns:
-            是否有效
+            保留的中枢列表（保持输入顺序）
         """
-        # 1. 基本条件检查
-        if center.center_range <= 0:
-            return False
-        
-        if len(center.segments) < 3:
-            return False
-        
-        # 2. 价格区间合理性
-        avg_price = (center.high_price + center.low_price) / 2
-        if center.center_range / avg_price > 0.5:  # 区间过大
-            return False
-        
-        if center.center_range / avg_price < 0.001:  # 区间过小
-            return False
-        
-        # 3. 时间持续检查
-        duration = (center.end_time - center.start_time).total_seconds()
-        if duration < 3600:  # 少于1小时
-            return False
-        
-        # 4. 强度阈值
-        if center.strength < 0.3:
-            return False
-        
-        return True
-    
-    def _optimize_centers(self, centers: List[Center]) -> List[Center]:
-        """
-        优化中枢列表，去除重叠和低质量中枢
-        
-        Args:
-            centers: 原始中枢列表
-            
-        Returns:
-            优化后的中枢列表
-        """
-        if not centers:
-            return []
-        
-        # 按强度排序
-        centers.sort(key=lambda x: x.strength, reverse=True)
-        
-        optimized = []
+        selected = []
+        # 已保留中枢的时间与价格区间按列存放，重叠判断直接内联比较
+        kept_starts = []
+        kept_ends = []
+        kept_highs = []
+        kept_lows = []
+        max_duration = None
         
         for center in centers:
-            # 检查是否与已有中枢重叠
+            start_time = center.start_time
+            end_time = center.end_time
+            high_price = center.high_price
+            low_price = center.low_price
+            
+            lower = 0
+            if max_duration is not None:
+                lower = bisect.bisect_right(kept_starts, start_time - max_duration)
+            upper = bisect.bisect_left(kept_starts, end_time)
+            
+            # 与 _centers_overlap 相同的时间、价格重叠条件；
+            # 二分上界已保证 kept_starts[i] < end_time，只需检查结束时间
             overlapped = False
-            for existing in optimized:
-                if self._centers_overlap(center, existing):
+            for i in range(lower, upper):
+                if (
+                    start_time < kept_ends[i] and
+                    low_price < kept_highs[i] and
+                    kept_lows[i] < high_price
+                ):
                     overlapped = True
                     break
             
-            if not overlapped:
-                optimized.append(center)
-        
-        # 按时间排序
-        optimized.sort(key=lambda x: x.start_time)
+            if overlapped:
+                continue
+            
+            selected.append(center)
+            position = bisect.bisect_right(kept_starts, start_time)
+            kept_starts.insert(position, start_time)
+            kept_ends.insert(position, end_time)
+            kept_highs.insert(position, high_price)
+            kept_lows.insert(position, low_price)
+            
+            duration = center.end_time - center.start_time
+            if max_duration is None or duration > max_duration:
+                max_duration = duration
         
-        return optimized
+        return selected
     
     def _centers_overlap(self, center1: Center, center2: Center) -> bool:
         """
@@ -403,19 +411,15 @@ class CenterDetector:
         Returns:
             是否重叠
         """
-        # 时间重叠检查
-        time_overlap = not (
-            center1.end_time <= center2.start_time or
-            center2.end_time <= center1.start_time
-        )
+        # 时间不重叠时无需再比较价格
+        if center1.end_time <= center2.start_time or center2.end_time <= center1.start_time:
+            return False
         
         # 价格重叠检查
-        price_overlap = self._ranges_overlap(
-            (center1.high_price, center1.low_price),
-            (center2.high_price, center2.low_price)
+        return not (
+            center1.high_price <= center2.low_price or
+            center2.high_price <= center1.low_price
         )
-        
-        return time_overlap and price_overlap
     
     def analyze_center_features(self, centers: List[Center]) -> dict:
         """
@@ -430,48 +434,30 @@ class CenterDetector:
         if not centers:
             return {}
         
-        features = {
-            "total_centers": len(centers),
-            "up_centers": 0,
-            "down_centers": 0,
-            "consolidation_centers": 0,
-            "avg_strength": 0,
-            "avg_duration_hours": 0,
-            "avg_price_range": 0,
-            "max_strength": 0,
-            "min_strength": 1.0
-        }
+        count = len(centers)
         
-        total_strength = 0
-        total_duration = 0
-        total_range = 0
-        
-        for center in centers:
-            # 统计类型
-            if center.center_type == CenterType.UP:
-                features["up_centers"] += 1
-            elif center.center_type == CenterType.DOWN:
-                features["down_centers"] += 1
-            else:
-                features["consolidation_centers"] += 1
-            
-            # 累计统计
-            total_strength += center.strength
-            total_range += center.center_range
-            
-            duration = (center.end_time - center.start_time).total_seconds() / 3600
-            total_duration += duration
-            
-            features["max_strength"] = max(features["max_strength"], center.strength)
-            features["min_strength"] = min(features["min_strength"], center.strength)
+        # 按列提取中枢属性，统计量由NumPy归约一次得到
+        strengths = np.fromiter((c.strength for c in centers), dtype=np.float64, count=count)
+        price_ranges = np.fromiter((c.center_range for c in centers), dtype=np.float64, count=count)
+        # 时间转为整数微秒，带时区的时间按UTC换算
+        start_us = datetimes_to_us((c.start_time for c in centers), count)
+        end_us = datetimes_to_us((c.end_time for c in centers), count)
+        durations_hours = (end_us - start_us) / 3.6e9
         
-        # 计算平均值
-        if len(centers) > 0:
-            features["avg_strength"] = total_strength / len(centers)
-            features["avg_duration_hours"] = total_duration / len(centers)
-            features["avg_price_range"] = total_range / len(centers)
+        up_count = sum(1 for c in centers if c.center_type == CenterType.UP)
+        down_count = sum(1 for c in centers if c.center_type == CenterType.DOWN)
         
-        return features
+        return {
+            "total_centers": count,
+            "up_centers": up_count,
+            "down_centers": down_count,
+            "consolidation_centers": count - up_count - down_count,
+            "avg_strength": float(strengths.mean()),
+            "avg_duration_hours": float(durations_hours.mean()),
+            "avg_price_range": float(price_ranges.mean()),
+            "max_strength": float(strengths.max()),
+            "min_strength": float(strengths.min())
+        }
     
     def find_center_extensions(self, centers: List[Center]) -> List[dict]:
         """
@@ -1,14 +1,19 @@
 from datetime import datetime
 from typing import List, Optional
+
+import numpy as np
+
 from models.analysis import (
     KlineData, AnalysisResult, FenxingPoint, Stroke, 
-    Segment, Center, MACDData, DivergenceSignal
+    Segment, Center, MACDData, DivergenceSignal, FenxingType
 )
-from services.kline_simulator import kline_simulator
+from services.kline_simulator import KlineSimulator, kline_simulator
 from services.fenxing_detector import fenxing_detector
 from services.stroke_builder import stroke_builder
 from services.center_detector import center_detector
 from services.divergence_detector import divergence_detector
+from core.executor import get_stage_executor
+from utils.kline_columns import kline_columns
 
 
 class ChanTheoryEngine:
@@ -29,7 +34,8 @@ class ChanTheoryEngine:
         time_interval: str = "1m",
         volatility: float = 0.02,
         trend_bias: float = 0.0,
-        min_fenxing_strength: float = 0.5
+        min_fenxing_strength: float = 0.5,
+        seed: Optional[int] = None
     ) -> AnalysisResult:
         """
         完整的缠论分析
@@ -41,12 +47,14 @@ class ChanTheoryEngine:
             volatility: 波动率
             trend_bias: 趋势偏向
             min_fenxing_strength: 最小分型强度
+            seed: 随机数种子，指定时由独立的模拟器生成K线，相同参数得到相同的价格序列
             
         Returns:
             完整分析结果
         """
-        # 1. 生成K线数据
-        kline_data = self.kline_simulator.generate_kline_data(
+        # 1. 生成K线数据（共享模拟器的随机状态不受指定种子的请求影响）
+        simulator = self.kline_simulator if seed is None else KlineSimulator(seed=seed)
+        kline_data = simulator.generate_kline_data(
             count=count,
             start_price=start_price,
             time_interval=time_interval,
@@ -54,13 +62,21 @@ class ChanTheoryEngine:
             trend_bias=trend_bias
         )
         
+        # K线数值列只构建一次，供分型、笔、MACD与背驰各步骤共享
+        columns = kline_columns(kline_data)
+        
+        # MACD只依赖K线数据，在线程池中与结构识别(2-5)并行计算
+        macd_future = get_stage_executor().submit(
+            self.divergence_detector.calculate_macd, kline_data, columns=columns
+        )
+        
         # 2. 分型识别
         fenxing_points = self.fenxing_detector.find_fenxing_points(
-            kline_data, min_fenxing_strength
+            kline_data, min_fenxing_strength, columns
         )
         
         # 3. 构建笔
-        strokes = self.stroke_builder.build_strokes(kline_data, fenxing_points)
+        strokes = self.stroke_builder.build_strokes(kline_data, fenxing_points, columns)
         
         # 4. 构建线段
         segments = self.stroke_builder.build_segments(strokes, kline_data)
@@ -68,12 +84,12 @@ class ChanTheoryEngine:
         # 5. 识别中枢
         centers = self.center_detector.find_centers(segments, kline_data)
         
-        # 6. 计算MACD
-        macd_data = self.divergence_detector.calculate_macd(kline_data)
+        # 6. 获取MACD计算结果
+        macd_data = macd_future.result()
         
         # 7. 检测背驰
         divergence_signals = self.divergence_detector.detect_divergences(
-            kline_data, centers, macd_data
+            kline_data, centers, macd_data, columns
         )
         
         # 8. 构建完整结果
@@ -105,13 +121,21 @@ class ChanTheoryEngine:
         Returns:
             分析结果
         """
+        # K线数值列只构建一次，供各步骤共享
+        columns = kline_columns(kline_data)
+        
+        # MACD只依赖K线数据，在线程池中与结构识别并行计算
+        macd_future = get_stage_executor().submit(
+            self.divergence_detector.calculate_macd, kline_data, columns=columns
+        )
+        
         # 分型识别
         fenxing_points = self.fenxing_detector.find_fenxing_points(
-            kline_data, min_fenxing_strength
+            kline_data, min_fenxing_strength, columns
         )
         
         # 构建笔
-        strokes = self.stroke_builder.build_strokes(kline_data, fenxing_points)
+        strokes = self.stroke_builder.build_strokes(kline_data, fenxing_points, columns)
         
         # 构建线段
         segments = self.stroke_builder.build_segments(strokes, kline_data)
@@ -119,12 +143,12 @@ class ChanTheoryEngine:
         # 识别中枢
         centers = self.center_detector.find_centers(segments, kline_data)
         
-        # 计算MACD
-        macd_data = self.divergence_detector.calculate_macd(kline_data)
+        # 获取MACD计算结果
+        macd_data = macd_future.result()
         
         # 检测背驰
         divergence_signals = self.divergence_detector.detect_divergences(
-            kline_data, centers, macd_data
+            kline_data, centers, macd_data, columns
         )
         
         result = AnalysisResult(
@@ -250,42 +274,62 @@ class ChanTheoryEngine:
         Returns:
             分析摘要
         """
+        kline_data = result.kline_data
+        fenxing_points = result.fenxing_points
+        divergence_signals = result.divergence_signals
+        
+        # K线最高价、最低价：整列提取后在C层归约
+        highest = lowest = None
+        if kline_data:
+            count = len(kline_data)
+            highest = float(np.fromiter((k.high for k in kline_data), dtype=np.float64, count=count).max())
+            lowest = float(np.fromiter((k.low for k in kline_data), dtype=np.float64, count=count).min())
+        
+        # 分型类型计数与置信度累加单次遍历
+        top_count = 0
+        confidence_sum = 0
+        for fenxing in fenxing_points:
+            if fenxing.type == FenxingType.TOP:
+                top_count += 1
+            confidence_sum += fenxing.confidence
+        bottom_count = len(fenxing_points) - top_count
+        
+        # 背驰信号类型计数与强度累加单次遍历
+        signal_types = {}
+        strength_sum = 0
+        for signal in divergence_signals:
+            signal_types[signal.signal_type] = signal_types.get(signal.signal_type, 0) + 1
+            strength_sum += signal.strength
+        
         summary = {
             "basic_info": {
-                "kline_count": len(result.kline_data),
+                "kline_count": len(kline_data),
                 "time_range": {
-                    "start": result.kline_data[0].timestamp if result.kline_data else None,
-                    "end": result.kline_data[-1].timestamp if result.kline_data else None
+                    "start": kline_data[0].timestamp if kline_data else None,
+                    "end": kline_data[-1].timestamp if kline_data else None
                 },
                 "price_range": {
-                    "start": result.kline_data[0].close if result.kline_data else None,
-                    "end": result.kline_data[-1].close if result.kline_data else None,
-                    "highest": max(k.high for k in result.kline_data) if result.kline_data else None,
-                    "lowest": min(k.low for k in result.kline_data) if result.kline_data else None
+                    "start": kline_data[0].close if kline_data else None,
+                    "end": kline_data[-1].close if kline_data else None,
+                    "highest": highest,
+                    "lowest": lowest
                 }
             },
             "fenxing_stats": {
-                "total_count": len(result.fenxing_points),
-                "top_fenxing": len([f for f in result.fenxing_points if f.type.value == "top"]),
-                "bottom_fenxing": len([f for f in result.fenxing_points if f.type.value == "bottom"]),
-                "avg_confidence": sum(f.confidence for f in result.fenxing_points) / len(result.fenxing_points) if result.fenxing_points else 0
+                "total_count": len(fenxing_points),
+                "top_fenxing": top_count,
+                "bottom_fenxing": bottom_count,
+                "avg_confidence": confidence_sum / len(fenxing_points) if fenxing_points else 0
             },
             "stroke_stats": self.stroke_builder.analyze_stroke_features(result.strokes),
             "center_stats": self.center_detector.analyze_center_features(result.centers),
             "divergence_stats": {
-                "total_signals": len(result.divergence_signals),
-                "signal_types": {},
-                "avg_strength": sum(s.strength for s in result.divergence_signals) / len(result.divergence_signals) if result.divergence_signals else 0
+                "total_signals": len(divergence_signals),
+                "signal_types": signal_types,
+                "avg_strength": strength_sum / len(divergence_signals) if divergence_signals else 0
             }
         }
         
-        # 统计背驰信号类型
-        for signal in result.divergence_signals:
-            signal_type = signal.signal_type
-            if signal_type not in summary["divergence_stats"]["signal_types"]:
-                summary["divergence_stats"]["signal_types"][signal_type] = 0
-            summary["divergence_stats"]["signal_types"][signal_type] += 1
-        
         return summary
     
     def validate_analysis_quality(self, result: AnalysisResult) -> dict:
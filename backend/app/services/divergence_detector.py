@@ -1,10 +1,360 @@
 import numpy as np
 import pandas as pd
-from typing import List, Optional, Tuple
+from typing import List, NamedTuple, Optional, Tuple, Union
+from pydantic import TypeAdapter
 from models.analysis import (
     KlineData, Center, MACDData, DivergenceSignal,
     CenterType
 )
+from utils._njit import njit, NUMBA_AVAILABLE
+from utils.kline_columns import KlineColumns
+from utils.timestamps import datetime_to_us, datetimes_to_us
+
+try:
+    # EMA是一阶递归滤波，lfilter在C层完成递推，省去pandas的对象开销
+    from scipy.signal import lfilter
+except ImportError:  # pragma: no cover - 取决于运行环境
+    lfilter = None
+
+# 整列校验MACD数据：一次进入pydantic-core，比逐个 MACDData(...) 构造快
+_MACD_LIST_ADAPTER = TypeAdapter(List[MACDData])
+
+# 趋势背驰分析所需的最少K线/MACD数量
+_MIN_TREND_BARS = 50
+# 中枢突破后背驰分析所需的最少K线数量
+_MIN_POST_CENTER_BARS = 10
+# 同类型信号去重的时间窗口（1小时，微秒）
+_DEDUP_WINDOW_US = 3600 * 1_000_000
+
+# MACD背驰强度：DIF与柱状图回落（抬升）比例的权重、放大倍数及趋势背驰的强度阈值。
+# 数组版本 _macd_divergence_strengths 与编译核心 _trend_divergence_kernel 共用
+_DIF_WEIGHT = 0.6
+_HISTOGRAM_WEIGHT = 0.4
+_STRENGTH_SCALE = 5
+_TREND_STRENGTH_THRESHOLD = 0.5
+# 趋势背驰要求价格至少高（低）0.1%
+_NEW_HIGH_RATIO = 1.001
+_NEW_LOW_RATIO = 0.999
+
+
+@njit(cache=True)
+def _ewm_adjusted_kernel(values, decay):
+    """
+    按 pandas adjust=True 的递推方式逐点计算EMA，结果与pandas逐位一致
+    
+    Args:
+        values: 输入序列（非空、无缺失值）
+        decay: 衰减因子 1-α
+        
+    Returns:
+        EMA序列
+    """
+    result = np.empty(len(values), dtype=np.float64)
+    weighted = values[0]
+    old_weight = 1.0
+    result[0] = weighted
+    
+    for i in range(1, len(values)):
+        current = values[i]
+        old_weight *= decay
+        if weighted != current:
+            weighted = (old_weight * weighted + current) / (old_weight + 1.0)
+        old_weight += 1.0
+        result[i] = weighted
+    
+    return result
+
+
+def _ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    指数加权移动平均，与 pandas ewm(span=span).mean()（adjust=True）一致
+    
+    y[t] = Σ(1-α)^i·x[t-i] / Σ(1-α)^i。numba可用时以编译后的递推循环计算；
+    否则分子按一阶递归滤波由lfilter计算，分母为等比数列和的闭式
+    (1-(1-α)^(t+1)) / α，都不可用时退回pandas。
+    
+    Args:
+        values: 输入序列
+        span: 跨度，α = 2 / (span + 1)
+        
+    Returns:
+        EMA序列
+    """
+    decay = 1.0 - 2.0 / (span + 1)
+    
+    if NUMBA_AVAILABLE and len(values) > 0:
+        return _ewm_adjusted_kernel(values, decay)
+    
+    if lfilter is None:
+        return pd.Series(values).ewm(span=span).mean().to_numpy()
+    
+    weighted_sum = lfilter([1.0], [1.0, -decay], values)
+    # expm1 避免 1-(1-α)^(t+1) 在t较小时的相消误差；span=1 时 log(0) = -inf，结果仍为1
+    with np.errstate(divide="ignore"):
+        log_decay = np.log(decay)
+    weight_total = -np.expm1(log_decay * np.arange(1, len(values) + 1)) / (1.0 - decay)
+    return weighted_sum / weight_total
+
+
+def _strict_window_extrema(values: np.ndarray, window: int, find_max: bool) -> List[Tuple[int, float]]:
+    """
+    寻找严格局部极值：前后各 window 个点均严格小于（或大于）该点
+    
+    Args:
+        values: 价格序列
+        window: 单侧窗口大小
+        find_max: True寻找高点，False寻找低点
+        
+    Returns:
+        极值点列表 [(index, price)]
+    """
+    if len(values) < 2 * window + 1:
+        return []
+    
+    # 每行为以候选点为中心的窗口，中心两侧的邻居分别归约后与中心比较
+    windows = np.lib.stride_tricks.sliding_window_view(values, 2 * window + 1)
+    centers = windows[:, window]
+    if find_max:
+        neighbors = np.maximum(windows[:, :window].max(axis=1), windows[:, window + 1:].max(axis=1))
+        mask = centers > neighbors
+    else:
+        neighbors = np.minimum(windows[:, :window].min(axis=1), windows[:, window + 1:].min(axis=1))
+        mask = centers < neighbors
+    
+    indices = np.flatnonzero(mask)
+    return list(zip((indices + window).tolist(), centers[indices].tolist()))
+
+
+def _macd_divergence_strengths(
+    prev_dif: np.ndarray,
+    curr_dif: np.ndarray,
+    prev_macd: np.ndarray,
+    curr_macd: np.ndarray,
+    is_top: bool
+) -> np.ndarray:
+    """
+    批量计算MACD背驰强度
+    
+    顶背驰：DIF/柱状图回落幅度相对前值的比例；底背驰：抬升幅度相对前值的比例。
+    前值为0或未回落（抬升）时该项为0，综合强度放大5倍并限制在0-1。
+    
+    Args:
+        prev_dif: 前一极值点DIF
+        curr_dif: 当前极值点DIF
+        prev_macd: 前一极值点MACD柱
+        curr_macd: 当前极值点MACD柱
+        is_top: True计算顶背驰，False计算底背驰
+        
+    Returns:
+        背驰强度数组 (0-1)
+    """
+    def relative_change(prev: np.ndarray, curr: np.ndarray) -> np.ndarray:
+        delta = prev - curr if is_top else curr - prev
+        ratio = np.zeros(len(delta), dtype=np.float64)
+        np.divide(delta, np.abs(prev), out=ratio, where=(delta > 0) & (prev != 0))
+        return ratio
+    
+    # 综合背驰强度
+    total_divergence = (
+        relative_change(prev_dif, curr_dif) * _DIF_WEIGHT
+        + relative_change(prev_macd, curr_macd) * _HISTOGRAM_WEIGHT
+    )
+    return np.minimum(1.0, np.maximum(0.0, total_divergence * _STRENGTH_SCALE))  # 放大并限制在0-1
+
+
+def _trend_divergence_pairs(prices, difs, histograms, is_top):
+    """
+    整列判断相邻极值点对的趋势背驰，参数与返回值同 _trend_divergence_kernel
+    
+    Returns:
+        (当前极值点在序列中的下标数组, 背驰强度数组)
+    """
+    if is_top:
+        new_extreme = prices[1:] > prices[:-1] * _NEW_HIGH_RATIO
+    else:
+        new_extreme = prices[1:] < prices[:-1] * _NEW_LOW_RATIO
+    
+    strengths = _macd_divergence_strengths(
+        difs[:-1], difs[1:], histograms[:-1], histograms[1:], is_top
+    )
+    pairs = np.flatnonzero(new_extreme & (strengths > _TREND_STRENGTH_THRESHOLD)) + 1
+    return pairs, strengths[pairs - 1]
+
+
+@njit(cache=True)
+def _relative_change_scalar(prev, curr, is_top):
+    """单个点对的回落（抬升）比例，与 _macd_divergence_strengths 中的数组版本逐位一致"""
+    delta = prev - curr if is_top else curr - prev
+    if delta > 0 and prev != 0:
+        return delta / abs(prev)
+    return 0.0
+
+
+@njit(cache=True)
+def _trend_divergence_kernel(prices, difs, histograms, is_top):
+    """
+    逐个相邻极值点对判断趋势背驰，只输出通过新高（低）与强度阈值的点对
+    
+    强度按 _macd_divergence_strengths 的同一组权重和放大倍数逐对计算，结果与
+    _trend_divergence_pairs 逐位一致。
+    
+    Args:
+        prices: 极值点价格
+        difs: 极值点DIF
+        histograms: 极值点MACD柱
+        is_top: True检测顶背驰，False检测底背驰
+        
+    Returns:
+        (当前极值点在序列中的下标数组, 背驰强度数组)
+    """
+    count = len(prices)
+    pair_indices = np.empty(max(count - 1, 0), dtype=np.int64)
+    strengths = np.empty(max(count - 1, 0), dtype=np.float64)
+    found = 0
+    
+    for i in range(1, count):
+        if is_top:
+            new_extreme = prices[i] > prices[i - 1] * _NEW_HIGH_RATIO
+        else:
+            new_extreme = prices[i] < prices[i - 1] * _NEW_LOW_RATIO
+        if not new_extreme:
+            continue
+        
+        total_divergence = (
+            _relative_change_scalar(difs[i - 1], difs[i], is_top) * _DIF_WEIGHT
+            + _relative_change_scalar(histograms[i - 1], histograms[i], is_top) * _HISTOGRAM_WEIGHT
+        )
+        strength = min(1.0, max(0.0, total_divergence * _STRENGTH_SCALE))
+        
+        if strength > _TREND_STRENGTH_THRESHOLD:
+            pair_indices[found] = i
+            strengths[found] = strength
+            found += 1
+    
+    return pair_indices[:found], strengths[:found]
+
+
+class KlineArrays(NamedTuple):
+    """K线数值列（SoA），一次构建后供背驰检测各步骤复用"""
+    timestamp_us: np.ndarray  # 时间（int64 微秒）
+    high: np.ndarray          # 最高价
+    low: np.ndarray           # 最低价
+    
+    def take(self, selection: Union[slice, np.ndarray]) -> "KlineArrays":
+        """按切片或下标数组选取子序列"""
+        return KlineArrays(*(column[selection] for column in self))
+
+
+def _timestamps_us(items) -> np.ndarray:
+    """提取带 timestamp 属性的序列的时间列（int64 微秒）"""
+    return datetimes_to_us((item.timestamp for item in items), len(items))
+
+
+def _kline_arrays(kline_data: List[KlineData]) -> KlineArrays:
+    """将K线列表转换为数值列"""
+    count = len(kline_data)
+    return KlineArrays(
+        timestamp_us=_timestamps_us(kline_data),
+        high=np.fromiter((k.high for k in kline_data), dtype=np.float64, count=count),
+        low=np.fromiter((k.low for k in kline_data), dtype=np.float64, count=count)
+    )
+
+
+def _take(items: list, selection: Union[slice, np.ndarray]) -> list:
+    """按 _TimeIndex 返回的选择取出列表元素"""
+    if isinstance(selection, slice):
+        return items[selection]
+    return [items[i] for i in selection.tolist()]
+
+
+def _selection_size(selection: Union[slice, np.ndarray]) -> int:
+    """_TimeIndex 返回的选择所含元素个数"""
+    if isinstance(selection, slice):
+        return selection.stop - selection.start
+    return len(selection)
+
+
+class _TimeIndex:
+    """按时间范围定位序列下标：时间有序时二分查找返回切片，否则按掩码返回下标数组"""
+    
+    def __init__(self, timestamp_us: np.ndarray):
+        """
+        初始化时间索引
+        
+        Args:
+            timestamp_us: 时间列（int64 微秒）
+        """
+        self._times = timestamp_us
+        self._is_sorted = bool(np.all(timestamp_us[1:] >= timestamp_us[:-1]))
+    
+    def between(self, start_time, end_time) -> Union[slice, np.ndarray]:
+        """选取 start_time <= t <= end_time 的元素"""
+        start = datetime_to_us(start_time)
+        end = datetime_to_us(end_time)
+        if self._is_sorted:
+            return slice(
+                int(np.searchsorted(self._times, start, side="left")),
+                int(np.searchsorted(self._times, end, side="right"))
+            )
+        return np.flatnonzero((self._times >= start) & (self._times <= end))
+    
+    def after(self, time) -> Union[slice, np.ndarray]:
+        """选取 t > time 的元素"""
+        target = datetime_to_us(time)
+        if self._is_sorted:
+            return slice(int(np.searchsorted(self._times, target, side="right")), len(self._times))
+        return np.flatnonzero(self._times > target)
+
+
+class _MACDLookup:
+    """按时间查找MACD数据：精确匹配走哈希表，否则二分查找最接近的时间点"""
+    
+    def __init__(self, macd_data: List[MACDData]):
+        """
+        初始化查找表
+        
+        Args:
+            macd_data: MACD数据
+        """
+        self._macd_data = macd_data
+        # 反向构建使重复时间保留第一次出现的数据
+        self._by_timestamp = {m.timestamp: m for m in reversed(macd_data)}
+        
+        times = _timestamps_us(macd_data)
+        self._order = np.argsort(times, kind="stable")
+        self._sorted_times = times[self._order]
+    
+    def get(self, target_time) -> Optional[MACDData]:
+        """
+        获取指定时间的MACD数据，无精确匹配时返回时间最接近者（距离相同取列表中靠前者）
+        
+        Args:
+            target_time: 目标时间
+            
+        Returns:
+            MACD数据，MACD为空时返回None
+        """
+        macd = self._by_timestamp.get(target_time)
+        if macd is not None or not self._macd_data:
+            return macd
+        
+        sorted_times = self._sorted_times
+        target = datetime_to_us(target_time)
+        position = int(np.searchsorted(sorted_times, target))
+        
+        # 左右两侧相邻时间各取其重复组中最靠前的数据
+        candidates = []
+        if position > 0:
+            left = int(np.searchsorted(sorted_times, sorted_times[position - 1]))
+            candidates.append(left)
+        if position < len(sorted_times):
+            candidates.append(position)
+        
+        best = min(
+            candidates,
+            key=lambda i: (abs(int(sorted_times[i]) - int(target)), int(self._order[i]))
+        )
+        return self._macd_data[int(self._order[best])]
 
 
 class DivergenceDetector:
@@ -19,7 +369,8 @@ class DivergenceDetector:
         kline_data: List[KlineData],
         fast_period: int = 12,
         slow_period: int = 26,
-        signal_period: int = 9
+        signal_period: int = 9,
+        columns: Optional[KlineColumns] = None
     ) -> List[MACDData]:
         """
         计算MACD指标
@@ -33,6 +384,7 @@ class DivergenceDetector:
             fast_period: 快线周期
             slow_period: 慢线周期
             signal_period: 信号线周期
+            columns: 流水线入口已构建的K线数值列，未提供时按需提取
             
         Returns:
             MACD数据列表
@@ -41,41 +393,44 @@ class DivergenceDetector:
             return []
         
         # 提取收盘价
-        close_prices = [k.close for k in kline_data]
-        df = pd.DataFrame({'close': close_prices})
+        if columns is not None:
+            close_prices = columns.close
+        else:
+            close_prices = np.fromiter((k.close for k in kline_data), dtype=np.float64, count=len(kline_data))
         
         # 计算EMA
-        ema_fast = df['close'].ewm(span=fast_period).mean()
-        ema_slow = df['close'].ewm(span=slow_period).mean()
+        ema_fast = _ewm_mean(close_prices, fast_period)
+        ema_slow = _ewm_mean(close_prices, slow_period)
         
         # 计算MACD线 (DIF)
         macd_line = ema_fast - ema_slow
         
         # 计算信号线 (DEA)
-        signal_line = macd_line.ewm(span=signal_period).mean()
+        signal_line = _ewm_mean(macd_line, signal_period)
         
         # 计算MACD柱状图
         histogram = macd_line - signal_line
         
-        # 构建MACD数据
-        macd_data = []
-        for i in range(len(kline_data)):
-            if i >= slow_period - 1:  # 确保有足够数据计算
-                macd = MACDData(
-                    timestamp=kline_data[i].timestamp,
-                    dif=float(macd_line.iloc[i]),
-                    dea=float(signal_line.iloc[i]),
-                    macd=float(histogram.iloc[i])
-                )
-                macd_data.append(macd)
+        # 构建MACD数据，跳过数据不足的前 slow_period-1 根K线
+        start = slow_period - 1
+        rows = [
+            {'timestamp': kline.timestamp, 'dif': dif, 'dea': dea, 'macd': macd}
+            for kline, dif, dea, macd in zip(
+                kline_data[start:],
+                macd_line[start:].tolist(),
+                signal_line[start:].tolist(),
+                histogram[start:].tolist()
+            )
+        ]
         
-        return macd_data
+        return _MACD_LIST_ADAPTER.validate_python(rows)
     
     def detect_divergences(
         self,
         kline_data: List[KlineData],
         centers: List[Center],
-        macd_data: List[MACDData]
+        macd_data: List[MACDData],
+        columns: Optional[KlineColumns] = None
     ) -> List[DivergenceSignal]:
         """
         检测背驰信号
@@ -89,6 +444,7 @@ class DivergenceDetector:
             kline_data: K线数据
             centers: 中枢列表
             macd_data: MACD数据
+            columns: 流水线入口已构建的K线数值列，未提供时按需提取
             
         Returns:
             背驰信号列表
@@ -98,18 +454,27 @@ class DivergenceDetector:
         
         divergence_signals = []
         
+        # K线数值列与时间索引只构建一次，供各中枢复用
+        if columns is not None:
+            kline_arrays = KlineArrays(columns.timestamp_us, columns.high, columns.low)
+        else:
+            kline_arrays = _kline_arrays(kline_data)
+        kline_index = _TimeIndex(kline_arrays.timestamp_us)
+        macd_index = _TimeIndex(_timestamps_us(macd_data))
+        
         for center in centers:
             # 分析中枢前后的背驰
             signals = self._analyze_center_divergence(
-                center, kline_data, macd_data
+                center, kline_data, macd_data, kline_arrays, kline_index, macd_index
             )
             divergence_signals.extend(signals)
         
-        # 分析整体趋势背驰
-        trend_signals = self._analyze_trend_divergence(
-            kline_data, macd_data
-        )
-        divergence_signals.extend(trend_signals)
+        # 分析整体趋势背驰（数据不足时不进入，与函数内部的门槛一致）
+        if len(kline_data) >= _MIN_TREND_BARS and len(macd_data) >= _MIN_TREND_BARS:
+            trend_signals = self._analyze_trend_divergence(
+                kline_data, macd_data, kline_arrays
+            )
+            divergence_signals.extend(trend_signals)
         
         # 去重和排序
         divergence_signals = self._optimize_divergence_signals(divergence_signals)
@@ -120,7 +485,10 @@ class DivergenceDetector:
         self,
         center: Center,
         kline_data: List[KlineData],
-        macd_data: List[MACDData]
+        macd_data: List[MACDData],
+        kline_arrays: Optional[KlineArrays] = None,
+        kline_index: Optional[_TimeIndex] = None,
+        macd_index: Optional[_TimeIndex] = None
     ) -> List[DivergenceSignal]:
         """
         分析中枢相关的背驰
@@ -129,32 +497,42 @@ class DivergenceDetector:
             center: 中枢
             kline_data: K线数据
             macd_data: MACD数据
+            kline_arrays: K线数值列，为None时重新构建
+            kline_index: K线时间索引，为None时重新构建
+            macd_index: MACD时间索引，为None时重新构建
             
         Returns:
             背驰信号列表
         """
         signals = []
         
+        if kline_arrays is None:
+            kline_arrays = _kline_arrays(kline_data)
+        if kline_index is None:
+            kline_index = _TimeIndex(kline_arrays.timestamp_us)
+        if macd_index is None:
+            macd_index = _TimeIndex(_timestamps_us(macd_data))
+        
         # 获取中枢时间范围内的数据
-        center_klines = self._get_klines_in_timerange(
-            kline_data, center.start_time, center.end_time
-        )
-        center_macd = self._get_macd_in_timerange(
-            macd_data, center.start_time, center.end_time
-        )
+        center_selection = kline_index.between(center.start_time, center.end_time)
+        center_klines = _take(kline_data, center_selection)
+        center_macd = _take(macd_data, macd_index.between(center.start_time, center.end_time))
         
         if not center_klines or not center_macd:
             return signals
         
-        # 分析中枢突破后的背驰
-        post_center_signals = self._analyze_post_center_divergence(
-            center, kline_data, macd_data
-        )
-        signals.extend(post_center_signals)
+        # 分析中枢突破后的背驰；中枢后的选择只定位一次并向下传递，K线不足时直接跳过
+        post_selection = kline_index.after(center.end_time)
+        if _selection_size(post_selection) >= _MIN_POST_CENTER_BARS:
+            post_center_signals = self._analyze_post_center_divergence(
+                center, kline_data, macd_data, kline_arrays, kline_index, macd_index,
+                post_selection
+            )
+            signals.extend(post_center_signals)
         
         # 分析中枢内部的力度背驰
         internal_signals = self._analyze_internal_divergence(
-            center, center_klines, center_macd
+            center, center_klines, center_macd, kline_arrays.take(center_selection)
         )
         signals.extend(internal_signals)
         
@@ -164,7 +542,11 @@ class DivergenceDetector:
         self,
         center: Center,
         kline_data: List[KlineData],
-        macd_data: List[MACDData]
+        macd_data: List[MACDData],
+        kline_arrays: Optional[KlineArrays] = None,
+        kline_index: Optional[_TimeIndex] = None,
+        macd_index: Optional[_TimeIndex] = None,
+        post_selection: Optional[Union[slice, np.ndarray]] = None
     ) -> List[DivergenceSignal]:
         """
         分析中枢突破后的背驰
@@ -173,21 +555,35 @@ class DivergenceDetector:
             center: 中枢
             kline_data: K线数据
             macd_data: MACD数据
+            kline_arrays: K线数值列，为None时重新构建
+            kline_index: K线时间索引，为None时重新构建
+            macd_index: MACD时间索引，为None时重新构建
+            post_selection: 中枢结束后的K线选择，为None时按时间定位
             
         Returns:
             背驰信号列表
         """
         signals = []
         
-        # 获取中枢后的数据
-        post_klines = [k for k in kline_data if k.timestamp > center.end_time]
-        post_macd = [m for m in macd_data if m.timestamp > center.end_time]
+        if kline_arrays is None:
+            kline_arrays = _kline_arrays(kline_data)
+        if kline_index is None:
+            kline_index = _TimeIndex(kline_arrays.timestamp_us)
+        if macd_index is None:
+            macd_index = _TimeIndex(_timestamps_us(macd_data))
         
-        if len(post_klines) < 10:  # 数据不够
+        # 获取中枢后的数据
+        if post_selection is None:
+            post_selection = kline_index.after(center.end_time)
+        if _selection_size(post_selection) < _MIN_POST_CENTER_BARS:  # 数据不够
             return signals
         
+        post_klines = _take(kline_data, post_selection)
+        post_macd = _take(macd_data, macd_index.after(center.end_time))
+        
         # 寻找突破确认点
-        break_point = self._find_center_break_point(center, post_klines)
+        post_arrays = kline_arrays.take(post_selection)
+        break_point = self._find_center_break_point(center, post_klines, post_arrays)
         if not break_point:
             return signals
         
@@ -195,7 +591,7 @@ class DivergenceDetector:
         if center.center_type == CenterType.UP or center.center_type == CenterType.CONSOLIDATION:
             # 寻找上破后的顶背驰
             signal = self._detect_top_divergence_after_break(
-                center, break_point, post_klines, post_macd
+                center, break_point, post_klines, post_macd, post_arrays
             )
             if signal:
                 signals.append(signal)
@@ -203,7 +599,7 @@ class DivergenceDetector:
         if center.center_type == CenterType.DOWN or center.center_type == CenterType.CONSOLIDATION:
             # 寻找下破后的底背驰
             signal = self._detect_bottom_divergence_after_break(
-                center, break_point, post_klines, post_macd
+                center, break_point, post_klines, post_macd, post_arrays
             )
             if signal:
                 signals.append(signal)
@@ -214,7 +610,8 @@ class DivergenceDetector:
         self,
         center: Center,
         center_klines: List[KlineData],
-        center_macd: List[MACDData]
+        center_macd: List[MACDData],
+        center_arrays: Optional[KlineArrays] = None
     ) -> List[DivergenceSignal]:
         """
         分析中枢内部的力度背驰
@@ -223,6 +620,7 @@ class DivergenceDetector:
             center: 中枢
             center_klines: 中枢内K线数据
             center_macd: 中枢内MACD数据
+            center_arrays: 中枢内K线数值列，为None时重新构建
             
         Returns:
             背驰信号列表
@@ -233,26 +631,26 @@ class DivergenceDetector:
             return signals
         
         # 分析中枢内的高低点对比
-        highs, lows = self._find_internal_extremes(center_klines)
+        highs, lows = self._find_internal_extremes(center_klines, center_arrays)
+        
+        # 相邻极值点的新高/新低条件先整体比较，只对满足条件的点对构建信号
+        high_prices = np.array([price for _, price in highs], dtype=np.float64)
+        low_prices = np.array([price for _, price in lows], dtype=np.float64)
+        new_high_pairs = np.flatnonzero(high_prices[1:] > high_prices[:-1] * 1.001) + 1
+        new_low_pairs = np.flatnonzero(low_prices[1:] < low_prices[:-1] * 0.999) + 1
         
         # 检测内部顶背驰
-        for i in range(1, len(highs)):
-            prev_high = highs[i-1]
-            curr_high = highs[i]
-            
+        for i in new_high_pairs.tolist():
             signal = self._check_internal_top_divergence(
-                prev_high, curr_high, center, center_macd
+                highs[i-1], highs[i], center, center_macd
             )
             if signal:
                 signals.append(signal)
         
         # 检测内部底背驰
-        for i in range(1, len(lows)):
-            prev_low = lows[i-1]
-            curr_low = lows[i]
-            
+        for i in new_low_pairs.tolist():
             signal = self._check_internal_bottom_divergence(
-                prev_low, curr_low, center, center_macd
+                lows[i-1], lows[i], center, center_macd
             )
             if signal:
                 signals.append(signal)
@@ -262,7 +660,8 @@ class DivergenceDetector:
     def _analyze_trend_divergence(
         self,
         kline_data: List[KlineData],
-        macd_data: List[MACDData]
+        macd_data: List[MACDData],
+        kline_arrays: Optional[KlineArrays] = None
     ) -> List[DivergenceSignal]:
         """
         分析整体趋势背驰
@@ -270,28 +669,40 @@ class DivergenceDetector:
         Args:
             kline_data: K线数据
             macd_data: MACD数据
+            kline_arrays: K线数值列，未提供时按需提取
             
         Returns:
             背驰信号列表
         """
         signals = []
         
-        if len(kline_data) < 50 or len(macd_data) < 50:
+        if len(kline_data) < _MIN_TREND_BARS or len(macd_data) < _MIN_TREND_BARS:
             return signals
         
         # 寻找价格极值点
-        price_highs = self._find_price_highs(kline_data)
-        price_lows = self._find_price_lows(kline_data)
+        if kline_arrays is not None:
+            price_highs = self._find_price_highs(kline_data, highs=kline_arrays.high)
+            price_lows = self._find_price_lows(kline_data, lows=kline_arrays.low)
+        else:
+            price_highs = self._find_price_highs(kline_data)
+            price_lows = self._find_price_lows(kline_data)
+        
+        # 极值点不足两个时无法成对比较
+        if len(price_highs) < 2 and len(price_lows) < 2:
+            return signals
+        
+        # MACD按时间的查找表只构建一次
+        macd_lookup = _MACDLookup(macd_data)
         
         # 检测顶背驰
         top_signals = self._detect_trend_top_divergence(
-            price_highs, kline_data, macd_data
+            price_highs, kline_data, macd_data, macd_lookup
         )
         signals.extend(top_signals)
         
         # 检测底背驰
         bottom_signals = self._detect_trend_bottom_divergence(
-            price_lows, kline_data, macd_data
+            price_lows, kline_data, macd_data, macd_lookup
         )
         signals.extend(bottom_signals)
         
@@ -301,7 +712,8 @@ class DivergenceDetector:
         self,
         price_highs: List[Tuple[int, float]],
         kline_data: List[KlineData],
-        macd_data: List[MACDData]
+        macd_data: List[MACDData],
+        macd_lookup: Optional[_MACDLookup] = None
     ) -> List[DivergenceSignal]:
         """
         检测趋势顶背驰
@@ -310,6 +722,7 @@ class DivergenceDetector:
             price_highs: 价格高点列表 [(index, price)]
             kline_data: K线数据
             macd_data: MACD数据
+            macd_lookup: MACD时间查找表，为None时按需构建
             
         Returns:
             背驰信号列表
@@ -319,30 +732,18 @@ class DivergenceDetector:
         if len(price_highs) < 2:
             return signals
         
-        for i in range(1, len(price_highs)):
-            prev_high_idx, prev_high_price = price_highs[i-1]
-            curr_high_idx, curr_high_price = price_highs[i]
-            
-            # 价格创新高
-            if curr_high_price > prev_high_price * 1.001:  # 至少高0.1%
-                
-                # 获取对应的MACD值
-                prev_macd = self._get_macd_at_index(macd_data, prev_high_idx, kline_data)
-                curr_macd = self._get_macd_at_index(macd_data, curr_high_idx, kline_data)
-                
-                if prev_macd and curr_macd:
-                    # 检查MACD是否背驰
-                    macd_divergence = self._check_macd_top_divergence(prev_macd, curr_macd)
-                    
-                    if macd_divergence > 0.5:  # 背驰强度阈值
-                        signal = DivergenceSignal(
-                            center=None,  # 趋势背驰不关联特定中枢
-                            signal_time=kline_data[curr_high_idx].timestamp,
-                            signal_type="trend_top_divergence",
-                            strength=macd_divergence,
-                            description=f"价格创新高{curr_high_price:.2f}，但MACD未创新高，形成顶背驰"
-                        )
-                        signals.append(signal)
+        # 逐对的新高判断与MACD背驰强度整体计算，只为通过阈值的点对构建信号
+        for curr_high_idx, curr_high_price, macd_divergence in self._trend_divergence_candidates(
+            price_highs, kline_data, macd_data, macd_lookup, is_top=True
+        ):
+            signal = DivergenceSignal(
+                center=None,  # 趋势背驰不关联特定中枢
+                signal_time=kline_data[curr_high_idx].timestamp,
+                signal_type="trend_top_divergence",
+                strength=macd_divergence,
+                description=f"价格创新高{curr_high_price:.2f}，但MACD未创新高，形成顶背驰"
+            )
+            signals.append(signal)
         
         return signals
     
@@ -350,7 +751,8 @@ class DivergenceDetector:
         self,
         price_lows: List[Tuple[int, float]],
         kline_data: List[KlineData],
-        macd_data: List[MACDData]
+        macd_data: List[MACDData],
+        macd_lookup: Optional[_MACDLookup] = None
     ) -> List[DivergenceSignal]:
         """
         检测趋势底背驰
@@ -359,6 +761,7 @@ class DivergenceDetector:
             price_lows: 价格低点列表 [(index, price)]
             kline_data: K线数据
             macd_data: MACD数据
+            macd_lookup: MACD时间查找表，为None时按需构建
             
         Returns:
             背驰信号列表
@@ -368,33 +771,67 @@ class DivergenceDetector:
         if len(price_lows) < 2:
             return signals
         
-        for i in range(1, len(price_lows)):
-            prev_low_idx, prev_low_price = price_lows[i-1]
-            curr_low_idx, curr_low_price = price_lows[i]
-            
-            # 价格创新低
-            if curr_low_price < prev_low_price * 0.999:  # 至少低0.1%
-                
-                # 获取对应的MACD值
-                prev_macd = self._get_macd_at_index(macd_data, prev_low_idx, kline_data)
-                curr_macd = self._get_macd_at_index(macd_data, curr_low_idx, kline_data)
-                
-                if prev_macd and curr_macd:
-                    # 检查MACD是否背驰
-                    macd_divergence = self._check_macd_bottom_divergence(prev_macd, curr_macd)
-                    
-                    if macd_divergence > 0.5:  # 背驰强度阈值
-                        signal = DivergenceSignal(
-                            center=None,  # 趋势背驰不关联特定中枢
-                            signal_time=kline_data[curr_low_idx].timestamp,
-                            signal_type="trend_bottom_divergence",
-                            strength=macd_divergence,
-                            description=f"价格创新低{curr_low_price:.2f}，但MACD未创新低，形成底背驰"
-                        )
-                        signals.append(signal)
+        # 逐对的新低判断与MACD背驰强度整体计算，只为通过阈值的点对构建信号
+        for curr_low_idx, curr_low_price, macd_divergence in self._trend_divergence_candidates(
+            price_lows, kline_data, macd_data, macd_lookup, is_top=False
+        ):
+            signal = DivergenceSignal(
+                center=None,  # 趋势背驰不关联特定中枢
+                signal_time=kline_data[curr_low_idx].timestamp,
+                signal_type="trend_bottom_divergence",
+                strength=macd_divergence,
+                description=f"价格创新低{curr_low_price:.2f}，但MACD未创新低，形成底背驰"
+            )
+            signals.append(signal)
         
         return signals
     
+    def _trend_divergence_candidates(
+        self,
+        extremes: List[Tuple[int, float]],
+        kline_data: List[KlineData],
+        macd_data: List[MACDData],
+        macd_lookup: Optional[_MACDLookup],
+        is_top: bool
+    ) -> List[Tuple[int, float, float]]:
+        """
+        批量计算相邻极值点对的趋势背驰
+        
+        Args:
+            extremes: 价格极值点列表 [(index, price)]
+            kline_data: K线数据
+            macd_data: MACD数据
+            macd_lookup: MACD时间查找表，为None时按需构建
+            is_top: True检测顶背驰，False检测底背驰
+            
+        Returns:
+            价格创新高（低）且背驰强度超过阈值的点对 [(当前极值下标, 当前极值价格, 背驰强度)]
+        """
+        if len(extremes) < 2 or not macd_data:
+            return []
+        
+        if macd_lookup is None:
+            macd_lookup = _MACDLookup(macd_data)
+        
+        # 每个极值点只查找一次对应的MACD数据
+        macd_points = [
+            self._get_macd_at_index(macd_data, index, kline_data, macd_lookup)
+            for index, _ in extremes
+        ]
+        count = len(extremes)
+        prices = np.fromiter((price for _, price in extremes), dtype=np.float64, count=count)
+        difs = np.fromiter((m.dif for m in macd_points), dtype=np.float64, count=count)
+        histograms = np.fromiter((m.macd for m in macd_points), dtype=np.float64, count=count)
+        
+        # numba可用时编译后逐对判断，省去整列的中间数组，否则整列计算，两者结果相同
+        find_pairs = _trend_divergence_kernel if NUMBA_AVAILABLE else _trend_divergence_pairs
+        pairs, pair_strengths = find_pairs(prices, difs, histograms, is_top)
+        
+        return [
+            (extremes[i][0], extremes[i][1], strength)
+            for i, strength in zip(pairs.tolist(), pair_strengths.tolist())
+        ]
+    
     def _check_macd_top_divergence(self, prev_macd: MACDData, curr_macd: MACDData) -> float:
         """
         检查MACD顶背驰强度
@@ -406,19 +843,10 @@ class DivergenceDetector:
         Returns:
             背驰强度 (0-1)
         """
-        # DIF线背驰检查
-        dif_divergence = 0
-        if prev_macd.dif > curr_macd.dif:
-            dif_divergence = (prev_macd.dif - curr_macd.dif) / abs(prev_macd.dif) if prev_macd.dif != 0 else 0
-        
-        # MACD柱状图背驰检查
-        macd_divergence = 0
-        if prev_macd.macd > curr_macd.macd:
-            macd_divergence = (prev_macd.macd - curr_macd.macd) / abs(prev_macd.macd) if prev_macd.macd != 0 else 0
-        
-        # 综合背驰强度
-        total_divergence = (dif_divergence * 0.6 + macd_divergence * 0.4)
-        return min(1.0, max(0.0, total_divergence * 5))  # 放大并限制在0-1
+        return float(_macd_divergence_strengths(
+            np.array([prev_macd.dif]), np.array([curr_macd.dif]),
+            np.array([prev_macd.macd]), np.array([curr_macd.macd]), True
+        )[0])
     
     def _check_macd_bottom_divergence(self, prev_macd: MACDData, curr_macd: MACDData) -> float:
         """
@@ -431,70 +859,55 @@ class DivergenceDetector:
         Returns:
             背驰强度 (0-1)
         """
-        # DIF线背驰检查
-        dif_divergence = 0
-        if prev_macd.dif < curr_macd.dif:
-            dif_divergence = (curr_macd.dif - prev_macd.dif) / abs(prev_macd.dif) if prev_macd.dif != 0 else 0
-        
-        # MACD柱状图背驰检查
-        macd_divergence = 0
-        if prev_macd.macd < curr_macd.macd:
-            macd_divergence = (curr_macd.macd - prev_macd.macd) / abs(prev_macd.macd) if prev_macd.macd != 0 else 0
-        
-        # 综合背驰强度
-        total_divergence = (dif_divergence * 0.6 + macd_divergence * 0.4)
-        return min(1.0, max(0.0, total_divergence * 5))  # 放大并限制在0-1
-    
-    def _get_klines_in_timerange(
-        self,
-        kline_data: List[KlineData],
-        start_time,
-        end_time
-    ) -> List[KlineData]:
-        """获取时间范围内的K线数据"""
-        return [k for k in kline_data if start_time <= k.timestamp <= end_time]
-    
-    def _get_macd_in_timerange(
-        self,
-        macd_data: List[MACDData],
-        start_time,
-        end_time
-    ) -> List[MACDData]:
-        """获取时间范围内的MACD数据"""
-        return [m for m in macd_data if start_time <= m.timestamp <= end_time]
+        return float(_macd_divergence_strengths(
+            np.array([prev_macd.dif]), np.array([curr_macd.dif]),
+            np.array([prev_macd.macd]), np.array([curr_macd.macd]), False
+        )[0])
     
     def _find_center_break_point(
         self,
         center: Center,
-        post_klines: List[KlineData]
+        post_klines: List[KlineData],
+        post_arrays: Optional[KlineArrays] = None
     ) -> Optional[KlineData]:
         """寻找中枢突破确认点"""
         if not post_klines:
             return None
         
-        # 寻找突破中枢区间的K线
-        for kline in post_klines:
-            if kline.high > center.high_price or kline.low < center.low_price:
-                return kline
+        if post_arrays is None:
+            post_arrays = _kline_arrays(post_klines)
         
-        return None
+        # 寻找第一根突破中枢区间的K线
+        broken = (post_arrays.high > center.high_price) | (post_arrays.low < center.low_price)
+        index = int(np.argmax(broken))
+        if not broken[index]:
+            return None
+        
+        return post_klines[index]
     
     def _detect_top_divergence_after_break(
         self,
         center: Center,
         break_point: KlineData,
         post_klines: List[KlineData],
-        post_macd: List[MACDData]
+        post_macd: List[MACDData],
+        post_arrays: Optional[KlineArrays] = None
     ) -> Optional[DivergenceSignal]:
         """检测突破后的顶背驰"""
         # 寻找突破后的最高点
         max_high = break_point.high
         max_high_time = break_point.timestamp
         
-        for kline in post_klines[:20]:  # 检查突破后20根K线
-            if kline.high > max_high:
-                max_high = kline.high
-                max_high_time = kline.timestamp
+        if post_arrays is None:
+            post_arrays = _kline_arrays(post_klines)
+        
+        # 检查突破后20根K线；argmax取首个最大值，仅严格高于突破点时替换
+        window = post_arrays.high[:20]
+        if len(window):
+            j = int(window.argmax())
+            if window[j] > max_high:
+                max_high = post_klines[j].high
+                max_high_time = post_klines[j].timestamp
         
         # 检查是否形成背驰
         # 这里简化处理，实际应该更复杂的逻辑
@@ -514,17 +927,24 @@ class DivergenceDetector:
         center: Center,
         break_point: KlineData,
         post_klines: List[KlineData],
-        post_macd: List[MACDData]
+        post_macd: List[MACDData],
+        post_arrays: Optional[KlineArrays] = None
     ) -> Optional[DivergenceSignal]:
         """检测突破后的底背驰"""
         # 寻找突破后的最低点
         min_low = break_point.low
         min_low_time = break_point.timestamp
         
-        for kline in post_klines[:20]:  # 检查突破后20根K线
-            if kline.low < min_low:
-                min_low = kline.low
-                min_low_time = kline.timestamp
+        if post_arrays is None:
+            post_arrays = _kline_arrays(post_klines)
+        
+        # 检查突破后20根K线；argmin取首个最小值，仅严格低于突破点时替换
+        window = post_arrays.low[:20]
+        if len(window):
+            j = int(window.argmin())
+            if window[j] < min_low:
+                min_low = post_klines[j].low
+                min_low_time = post_klines[j].timestamp
         
         # 检查是否形成背驰
         if min_low < center.low_price * 0.98:  # 显著突破
@@ -538,19 +958,25 @@ class DivergenceDetector:
         
         return None
     
-    def _find_internal_extremes(self, klines: List[KlineData]) -> Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]:
-        """寻找内部极值点"""
-        highs = []
-        lows = []
+    def _find_internal_extremes(
+        self,
+        klines: List[KlineData],
+        arrays: Optional[KlineArrays] = None
+    ) -> Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]:
+        """寻找内部极值点：高点严格高于左右相邻K线，低点严格低于左右相邻K线"""
+        if len(klines) < 3:
+            return [], []
         
-        for i in range(1, len(klines) - 1):
-            # 寻找高点
-            if klines[i].high > klines[i-1].high and klines[i].high > klines[i+1].high:
-                highs.append((i, klines[i].high))
-            
-            # 寻找低点
-            if klines[i].low < klines[i-1].low and klines[i].low < klines[i+1].low:
-                lows.append((i, klines[i].low))
+        if arrays is None:
+            arrays = _kline_arrays(klines)
+        
+        high = arrays.high
+        low = arrays.low
+        high_indices = np.flatnonzero((high[1:-1] > high[:-2]) & (high[1:-1] > high[2:])) + 1
+        low_indices = np.flatnonzero((low[1:-1] < low[:-2]) & (low[1:-1] < low[2:])) + 1
+        
+        highs = list(zip(high_indices.tolist(), high[high_indices].tolist()))
+        lows = list(zip(low_indices.tolist(), low[low_indices].tolist()))
         
         return highs, lows
     
@@ -600,72 +1026,43 @@ class DivergenceDetector:
         
         return None
     
-    def _find_price_highs(self, kline_data: List[KlineData], window: int = 5) -> List[Tuple[int, float]]:
-        """寻找价格高点"""
-        highs = []
-        
-        for i in range(window, len(kline_data) - window):
-            is_high = True
-            current_high = kline_data[i].high
-            
-            # 检查周围窗口内是否是最高点
-            for j in range(i - window, i + window + 1):
-                if j != i and kline_data[j].high >= current_high:
-                    is_high = False
-                    break
-            
-            if is_high:
-                highs.append((i, current_high))
-        
-        return highs
+    def _find_price_highs(
+        self,
+        kline_data: List[KlineData],
+        window: int = 5,
+        highs: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """寻找价格高点（已有最高价列时直接使用）"""
+        if highs is None:
+            highs = np.fromiter((k.high for k in kline_data), dtype=np.float64, count=len(kline_data))
+        return _strict_window_extrema(highs, window, find_max=True)
     
-    def _find_price_lows(self, kline_data: List[KlineData], window: int = 5) -> List[Tuple[int, float]]:
-        """寻找价格低点"""
-        lows = []
-        
-        for i in range(window, len(kline_data) - window):
-            is_low = True
-            current_low = kline_data[i].low
-            
-            # 检查周围窗口内是否是最低点
-            for j in range(i - window, i + window + 1):
-                if j != i and kline_data[j].low <= current_low:
-                    is_low = False
-                    break
-            
-            if is_low:
-                lows.append((i, current_low))
-        
-        return lows
+    def _find_price_lows(
+        self,
+        kline_data: List[KlineData],
+        window: int = 5,
+        lows: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """寻找价格低点（已有最低价列时直接使用）"""
+        if lows is None:
+            lows = np.fromiter((k.low for k in kline_data), dtype=np.float64, count=len(kline_data))
+        return _strict_window_extrema(lows, window, find_max=False)
     
     def _get_macd_at_index(
         self,
         macd_data: List[MACDData],
         kline_index: int,
-        kline_data: List[KlineData]
+        kline_data: List[KlineData],
+        macd_lookup: Optional[_MACDLookup] = None
     ) -> Optional[MACDData]:
-        """根据K线索引获取对应的MACD数据"""
+        """根据K线索引获取对应的MACD数据，无精确匹配时取时间最接近者"""
         if kline_index >= len(kline_data):
             return None
         
-        target_time = kline_data[kline_index].timestamp
-        
-        # 寻找最接近的MACD数据
-        for macd in macd_data:
-            if macd.timestamp == target_time:
-                return macd
+        if macd_lookup is None:
+            macd_lookup = _MACDLookup(macd_data)
         
-        # 如果没有完全匹配，寻找最接近的
-        closest_macd = None
-        min_diff = float('inf')
-        
-        for macd in macd_data:
-            diff = abs((macd.timestamp - target_time).total_seconds())
-            if diff < min_diff:
-                min_diff = diff
-                closest_macd = macd
-        
-        return closest_macd
+        return macd_lookup.get(kline_data[kline_index].timestamp)
     
     def _optimize_divergence_signals(self, signals: List[DivergenceSignal]) -> List[DivergenceSignal]:
         """优化背驰信号，去重和排序"""
@@ -675,22 +1072,31 @@ class DivergenceDetector:
         # 按时间排序
         signals.sort(key=lambda x: x.signal_time)
         
-        # 去除时间太接近的重复信号
-        optimized = []
-        for signal in signals:
-            is_duplicate = False
-            for existing in optimized:
-                time_diff = abs((signal.signal_time - existing.signal_time).total_seconds())
-                if time_diff < 3600 and signal.signal_type == existing.signal_type:  # 1小时内的同类型信号
+        # 排序后的信号时间一次性转换为整数微秒，扫描中的时间差均为非负整数相减
+        signal_times = datetimes_to_us((item.signal_time for item in signals), len(signals)).tolist()
+        
+        # 去除时间太接近的重复信号。按时间扫描时，同类型已保留信号两两相隔至少1小时，
+        # 只有该类型最近保留的一个可能与当前信号相距1小时内
+        kept = {}  # 保留顺序 -> 信号，替换时删除旧项并追加到末尾
+        last_key_by_type = {}
+        
+        for key, signal in enumerate(signals):
+            last_key = last_key_by_type.get(signal.signal_type)
+            if last_key is not None:
+                existing = kept[last_key]
+                time_diff = signal_times[key] - signal_times[last_key]
+                if time_diff < _DEDUP_WINDOW_US:  # 1小时内的同类型信号
                     if signal.strength > existing.strength:
                         # 替换为更强的信号
-                        optimized.remove(existing)
-                        optimized.append(signal)
-                    is_duplicate = True
-                    break
+                        del kept[last_key]
+                        kept[key] = signal
+                        last_key_by_type[signal.signal_type] = key
+                    continue
             
-            if not is_duplicate:
-                optimized.append(signal)
+            kept[key] = signal
+            last_key_by_type[signal.signal_type] = key
+        
+        optimized = list(kept.values())
         
         return optimized
 
@@ -1,5 +1,434 @@
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
 from models.analysis import KlineData, FenxingPoint, FenxingType
+from utils._njit import njit, NUMBA_AVAILABLE, kernel_input
+from utils.kline_columns import KlineColumns
+from utils.timestamps import datetimes_to_us
+
+
+# ---------------------------------------------------------------------------
+# 分型检测核心函数
+#
+# 以下函数只操作数值数组，安装numba时编译为机器码，否则以纯Python执行。
+# 浮点运算顺序与逐K线计算保持一致，两种执行方式结果相同。
+# ---------------------------------------------------------------------------
+
+@njit(cache=True)
+def _clamp_unit(value):
+    """截断到0-1区间，等价于 min(1.0, max(0.0, value))"""
+    if not value > 0.0:
+        value = 0.0
+    if not value < 1.0:
+        value = 1.0
+    return value
+
+
+@njit(cache=True)
+def _price_prominence_top(highs, index):
+    """计算顶分型价格突出程度"""
+    n = len(highs)
+    window = min(5, index, n - index - 1)
+    if window < 1:
+        return 0.5
+    
+    current_high = highs[index]
+    max_nearby = 0.0
+    total = 0.0
+    count = 0
+    for i in range(index - window, index + window + 1):
+        if i != index:
+            value = highs[i]
+            if count == 0 or value > max_nearby:
+                max_nearby = value
+            total += value
+            count += 1
+    
+    avg_nearby = total / count
+    if max_nearby == 0:
+        return 0.5
+    
+    prominence = (current_high - max_nearby) / max_nearby
+    relative_prominence = (current_high - avg_nearby) / avg_nearby
+    
+    # 归一化到0-1
+    return _clamp_unit((prominence + relative_prominence * 0.5) * 10)
+
+
+@njit(cache=True)
+def _price_prominence_bottom(lows, index):
+    """计算底分型价格突出程度"""
+    n = len(lows)
+    window = min(5, index, n - index - 1)
+    if window < 1:
+        return 0.5
+    
+    current_low = lows[index]
+    min_nearby = 0.0
+    total = 0.0
+    count = 0
+    for i in range(index - window, index + window + 1):
+        if i != index:
+            value = lows[i]
+            if count == 0 or value < min_nearby:
+                min_nearby = value
+            total += value
+            count += 1
+    
+    avg_nearby = total / count
+    if avg_nearby == 0:
+        return 0.5
+    
+    prominence = (min_nearby - current_low) / avg_nearby
+    relative_prominence = (avg_nearby - current_low) / avg_nearby
+    
+    # 归一化到0-1
+    return _clamp_unit((prominence + relative_prominence * 0.5) * 10)
+
+
+@njit(cache=True)
+def _volume_confirmation(volumes, volume_prefix, index):
+    """计算成交量确认程度，邻域成交量之和由前缀和得到（整数运算，结果与逐项累加相同）"""
+    n = len(volumes)
+    window = min(3, index, n - index - 1)
+    if window < 1:
+        return 0.5
+    
+    total = volume_prefix[index + window + 1] - volume_prefix[index - window] - volumes[index]
+    count = 2 * window
+    
+    avg_volume = total / count
+    if avg_volume == 0:
+        return 0.5
+    
+    # 成交量放大程度，放大1.5倍以上给满分
+    volume_ratio = volumes[index] / avg_volume
+    return _clamp_unit(volume_ratio - 0.5)
+
+
+@njit(cache=True)
+def _surrounding_confirmation(values, index, is_top):
+    """计算周围确认程度：更大范围内低于顶点（或高于底点）的K线比例"""
+    n = len(values)
+    window = min(10, index, n - index - 1)
+    if window < 2:
+        return 0.5
+    
+    current = values[index]
+    confirmed_count = 0
+    total_count = 0
+    for i in range(index - window, index + window + 1):
+        if i != index:
+            total_count += 1
+            if is_top:
+                if values[i] < current:
+                    confirmed_count += 1
+            elif values[i] > current:
+                confirmed_count += 1
+    
+    return confirmed_count / total_count
+
+
+@njit(cache=True)
+def _fenxing_kernel(highs, lows, volumes, volume_prefix, top_candidates, bottom_candidates,
+                    max_high, min_high, max_low, min_low, min_strength):
+    """
+    计算候选分型的强度并按阈值筛选
+    
+    强度由价格突出程度(30%)、成交量确认(20%)、周围确认(30%)、
+    相对位置(20%)加权得到。
+    
+    Args:
+        highs: 最高价序列
+        lows: 最低价序列
+        volumes: 成交量序列
+        volume_prefix: 成交量前缀和，volume_prefix[i] 为前i根K线成交量之和
+        top_candidates: 顶分型候选索引（升序）
+        bottom_candidates: 底分型候选索引（升序）
+        max_high: 最高价序列最大值
+        min_high: 最高价序列最小值
+        max_low: 最低价序列最大值
+        min_low: 最低价序列最小值
+        min_strength: 最小强度阈值
+        
+    Returns:
+        (索引, 是否顶分型, 强度) 三个数组，先顶分型后底分型
+    """
+    capacity = len(top_candidates) + len(bottom_candidates)
+    indices = np.empty(capacity, dtype=np.int64)
+    is_top = np.empty(capacity, dtype=np.bool_)
+    confidences = np.empty(capacity, dtype=np.float64)
+    found = 0
+    
+    # 顶分型
+    for i in top_candidates:
+        current_high = highs[i]
+        if max_high == min_high:
+            relative_position = 0.5
+        else:
+            relative_position = (current_high - min_high) / (max_high - min_high)
+        
+        prominence = _price_prominence_top(highs, i)
+        volume = _volume_confirmation(volumes, volume_prefix, i)
+        # 周围确认不超过1，按同样的求和顺序以1代入即为强度上界，不足阈值时不再计算
+        if _clamp_unit(prominence * 0.3 + volume * 0.2 + 0.3 + relative_position * 0.2) < min_strength:
+            continue
+        
+        strength = _clamp_unit(
+            prominence * 0.3 +
+            volume * 0.2 +
+            _surrounding_confirmation(highs, i, True) * 0.3 +
+            relative_position * 0.2
+        )
+        if strength >= min_strength:
+            indices[found] = i
+            is_top[found] = True
+            confidences[found] = strength
+            found += 1
+    
+    # 底分型
+    for i in bottom_candidates:
+        current_low = lows[i]
+        # 在低位的分型更有意义
+        if max_low == min_low:
+            relative_position = 0.5
+        else:
+            relative_position = 1.0 - (current_low - min_low) / (max_low - min_low)
+        
+        prominence = _price_prominence_bottom(lows, i)
+        volume = _volume_confirmation(volumes, volume_prefix, i)
+        # 周围确认不超过1，按同样的求和顺序以1代入即为强度上界，不足阈值时不再计算
+        if _clamp_unit(prominence * 0.3 + volume * 0.2 + 0.3 + relative_position * 0.2) < min_strength:
+            continue
+        
+        strength = _clamp_unit(
+            prominence * 0.3 +
+            volume * 0.2 +
+            _surrounding_confirmation(lows, i, False) * 0.3 +
+            relative_position * 0.2
+        )
+        if strength >= min_strength:
+            indices[found] = i
+            is_top[found] = False
+            confidences[found] = strength
+            found += 1
+    
+    return indices[:found], is_top[:found], confidences[:found]
+
+
+@njit(cache=True)
+def _alternation_kernel(is_top, confidences):
+    """
+    过滤相邻的同类型分型，与上一个保留的分型同类型时只保留强度更高者（强度相同保留先出现的）
+    
+    Args:
+        is_top: 按时间排序的分型是否为顶分型
+        confidences: 对应的强度
+        
+    Returns:
+        保留分型的位置数组
+    """
+    n = len(is_top)
+    kept = np.empty(n, dtype=np.int64)
+    if n == 0:
+        return kept
+    
+    kept[0] = 0
+    found = 1
+    for i in range(1, n):
+        last = kept[found - 1]
+        if is_top[i] != is_top[last]:
+            kept[found] = i
+            found += 1
+        elif confidences[i] > confidences[last]:
+            kept[found - 1] = i
+    
+    return kept[:found]
+
+
+# ---------------------------------------------------------------------------
+# 分型强度的数组化实现
+#
+# numba不可用时使用：所有候选点的邻域一次取成矩阵整体计算。邻域内的累加按列
+# 从左到右进行，与核心函数逐点循环的求和顺序一致，两者结果逐位相同。
+# ---------------------------------------------------------------------------
+
+def _neighborhoods(values: np.ndarray, candidates: np.ndarray, radius: int):
+    """
+    取候选点左右各 radius 根K线组成的邻域矩阵
+    
+    Args:
+        values: 数值序列
+        candidates: 候选索引
+        radius: 最大单侧窗口
+        
+    Returns:
+        (邻域矩阵, 有效掩码, 实际窗口)。实际窗口为 min(radius, i, n-i-1)，
+        超出实际窗口的位置与中心点在掩码中为False
+    """
+    n = len(values)
+    window = np.minimum(np.minimum(candidates, n - 1 - candidates), radius)
+    offsets = np.arange(-radius, radius + 1)
+    positions = np.clip(candidates[:, None] + offsets, 0, n - 1)
+    mask = (np.abs(offsets) <= window[:, None]) & (offsets != 0)
+    return values[positions], mask, window
+
+
+def _ordered_sum(matrix: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """按列从左到右累加掩码内的元素，与逐点循环的累加顺序一致"""
+    total = np.zeros(len(matrix), dtype=matrix.dtype)
+    for column in range(matrix.shape[1]):
+        total = total + np.where(mask[:, column], matrix[:, column], 0)
+    return total
+
+
+def _clamp_units(values: np.ndarray) -> np.ndarray:
+    """逐元素截断到0-1区间，与 _clamp_unit 一致（NaN视为0）"""
+    values = np.where(values > 0.0, values, 0.0)
+    return np.where(values < 1.0, values, 1.0)
+
+
+def _price_prominence_scores(values: np.ndarray, candidates: np.ndarray, is_top: bool) -> np.ndarray:
+    """批量计算价格突出程度，对应 _price_prominence_top / _price_prominence_bottom"""
+    matrix, mask, window = _neighborhoods(values, candidates, 5)
+    current = values[candidates]
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_nearby = _ordered_sum(matrix, mask) / (2 * window)
+        if is_top:
+            max_nearby = np.where(mask, matrix, -np.inf).max(axis=1)
+            prominence = (current - max_nearby) / max_nearby
+            relative_prominence = (current - avg_nearby) / avg_nearby
+            degenerate = max_nearby == 0
+        else:
+            min_nearby = np.where(mask, matrix, np.inf).min(axis=1)
+            prominence = (min_nearby - current) / avg_nearby
+            relative_prominence = (avg_nearby - current) / avg_nearby
+            degenerate = avg_nearby == 0
+        scores = _clamp_units((prominence + relative_prominence * 0.5) * 10)
+    
+    return np.where(degenerate | (window < 1), 0.5, scores)
+
+
+def _volume_confirmation_scores(
+    volumes: np.ndarray,
+    volume_prefix: np.ndarray,
+    candidates: np.ndarray
+) -> np.ndarray:
+    """批量计算成交量确认程度，对应 _volume_confirmation"""
+    n = len(volumes)
+    window = np.minimum(np.minimum(candidates, n - 1 - candidates), 3)
+    total = volume_prefix[candidates + window + 1] - volume_prefix[candidates - window] - volumes[candidates]
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_volume = total / (2 * window)
+        scores = _clamp_units(volumes[candidates] / avg_volume - 0.5)
+    
+    return np.where((window < 1) | (avg_volume == 0), 0.5, scores)
+
+
+def _surrounding_confirmation_scores(values: np.ndarray, candidates: np.ndarray, is_top: bool) -> np.ndarray:
+    """批量计算周围确认程度，对应 _surrounding_confirmation"""
+    matrix, mask, window = _neighborhoods(values, candidates, 10)
+    current = values[candidates][:, None]
+    confirmed = (matrix < current) if is_top else (matrix > current)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.count_nonzero(confirmed & mask, axis=1) / (2 * window)
+    
+    return np.where(window < 2, 0.5, scores)
+
+
+def _candidate_strengths(values, volumes, volume_prefix, candidates, position, is_top, min_strength):
+    """
+    计算同一类候选分型的强度，返回达到阈值的候选
+    
+    周围确认不超过1，先以1代入求出强度上界，只对上界达到阈值的候选计算周围确认。
+    
+    Args:
+        values: 顶分型为最高价，底分型为最低价
+        volumes: 成交量数组
+        volume_prefix: 成交量前缀和
+        candidates: 候选索引
+        position: 候选的相对位置得分
+        is_top: 是否顶分型
+        min_strength: 最小强度阈值
+        
+    Returns:
+        (达到阈值的候选掩码, 对应的强度)
+    """
+    prominence = _price_prominence_scores(values, candidates, is_top)
+    volume = _volume_confirmation_scores(volumes, volume_prefix, candidates)
+    alive = np.flatnonzero(
+        _clamp_units(prominence * 0.3 + volume * 0.2 + 0.3 + position * 0.2) >= min_strength
+    )
+    
+    strengths = _clamp_units(
+        prominence[alive] * 0.3 +
+        volume[alive] * 0.2 +
+        _surrounding_confirmation_scores(values, candidates[alive], is_top) * 0.3 +
+        position[alive] * 0.2
+    )
+    passed = strengths >= min_strength
+    kept = np.zeros(len(candidates), dtype=np.bool_)
+    kept[alive[passed]] = True
+    return kept, strengths[passed]
+
+
+def _score_candidates(highs, lows, volumes, volume_prefix, top_candidates, bottom_candidates,
+                      max_high, min_high, max_low, min_low, min_strength):
+    """
+    数组化计算候选分型的强度并按阈值筛选，参数与返回值同 _fenxing_kernel
+    
+    Returns:
+        (索引, 是否顶分型, 强度) 三个数组，先顶分型后底分型
+    """
+    # 顶分型
+    top_highs = highs[top_candidates]
+    if max_high == min_high:
+        top_position = np.full(len(top_candidates), 0.5)
+    else:
+        top_position = (top_highs - min_high) / (max_high - min_high)
+    top_kept, top_strengths = _candidate_strengths(
+        highs, volumes, volume_prefix, top_candidates, top_position, True, min_strength
+    )
+    
+    # 底分型，在低位的分型更有意义
+    bottom_lows = lows[bottom_candidates]
+    if max_low == min_low:
+        bottom_position = np.full(len(bottom_candidates), 0.5)
+    else:
+        bottom_position = 1.0 - (bottom_lows - min_low) / (max_low - min_low)
+    bottom_kept, bottom_strengths = _candidate_strengths(
+        lows, volumes, volume_prefix, bottom_candidates, bottom_position, False, min_strength
+    )
+    
+    indices = np.concatenate((top_candidates[top_kept], bottom_candidates[bottom_kept]))
+    is_top = np.concatenate((
+        np.ones(np.count_nonzero(top_kept), dtype=np.bool_),
+        np.zeros(np.count_nonzero(bottom_kept), dtype=np.bool_)
+    ))
+    confidences = np.concatenate((top_strengths, bottom_strengths))
+    return indices, is_top, confidences
+
+
+class FenxingArrays(NamedTuple):
+    """分型数值列（SoA），供只读取数值字段的调用方直接使用，无需构建分型点对象"""
+    index: np.ndarray         # K线索引（int64）
+    is_top: np.ndarray        # 是否顶分型
+    confidence: np.ndarray    # 强度
+    
+    def take(self, selection: np.ndarray) -> "FenxingArrays":
+        """按下标数组选取子序列"""
+        return FenxingArrays(*(column[selection] for column in self))
+
+
+_EMPTY_FENXING = FenxingArrays(
+    index=np.empty(0, dtype=np.int64),
+    is_top=np.empty(0, dtype=np.bool_),
+    confidence=np.empty(0, dtype=np.float64)
+)
 
 
 class FenxingDetector:
@@ -12,7 +441,8 @@ class FenxingDetector:
     def find_fenxing_points(
         self,
         kline_data: List[KlineData],
-        min_strength: float = 0.5
+        min_strength: float = 0.5,
+        columns: Optional[KlineColumns] = None
     ) -> List[FenxingPoint]:
         """
         识别所有分型点
@@ -20,430 +450,123 @@ class FenxingDetector:
         Args:
             kline_data: K线数据列表
             min_strength: 最小强度阈值
+            columns: 流水线入口已构建的K线数值列，未提供时按需提取
             
         Returns:
             分型点列表
         """
-        if len(kline_data) < 3:
-            return []
+        fenxing = self.find_fenxing_points_raw(kline_data, min_strength, columns)
         
         fenxing_points = []
-        
-        # 寻找顶分型
-        top_fenxings = self._find_top_fenxing(kline_data, min_strength)
-        fenxing_points.extend(top_fenxings)
-        
-        # 寻找底分型
-        bottom_fenxings = self._find_bottom_fenxing(kline_data, min_strength)
-        fenxing_points.extend(bottom_fenxings)
-        
-        # 按时间排序
-        fenxing_points.sort(key=lambda x: x.timestamp)
-        
-        # 过滤相邻的同类型分型
-        filtered_points = self._filter_adjacent_fenxing(fenxing_points)
-        
-        return filtered_points
-    
-    def _find_top_fenxing(
-        self,
-        kline_data: List[KlineData],
-        min_strength: float
-    ) -> List[FenxingPoint]:
-        """
-        寻找顶分型
-        
-        顶分型定义：
-        1. 当前K线最高价大于前一根和后一根K线最高价
-        2. 连续3根K线形成局部高点
-        3. 强度计算基于价格差异和确认程度
-        
-        Args:
-            kline_data: K线数据
-            min_strength: 最小强度
-            
-        Returns:
-            顶分型点列表
-        """
-        top_fenxings = []
-        
-        for i in range(1, len(kline_data) - 1):
-            current = kline_data[i]
-            prev = kline_data[i - 1]
-            next_kline = kline_data[i + 1]
-            
-            # 基本条件：当前K线高点大于前后K线高点
-            if current.high > prev.high and current.high > next_kline.high:
-                
-                # 计算强度
-                strength = self._calculate_top_fenxing_strength(
-                    kline_data, i, min_strength
-                )
-                
-                if strength >= min_strength:
-                    fenxing = FenxingPoint(
-                        index=i,
-                        type=FenxingType.TOP,
-                        high=current.high,
-                        low=current.low,
-                        price=current.high,  # 顶分型关键价格是最高价
-                        timestamp=current.timestamp,
-                        confidence=strength
-                    )
-                    top_fenxings.append(fenxing)
-        
-        return top_fenxings
+        for index, top, confidence in zip(
+            fenxing.index.tolist(), fenxing.is_top.tolist(), fenxing.confidence.tolist()
+        ):
+            kline = kline_data[index]
+            # 核心函数的输出已保证字段合法，跳过逐字段校验
+            fenxing_points.append(FenxingPoint.model_construct(
+                index=index,
+                type=FenxingType.TOP if top else FenxingType.BOTTOM,
+                high=kline.high,
+                low=kline.low,
+                price=kline.high if top else kline.low,  # 顶分型取最高价，底分型取最低价
+                timestamp=kline.timestamp,
+                confidence=confidence
+            ))
+        
+        return fenxing_points
     
-    def _find_bottom_fenxing(
+    def find_fenxing_points_raw(
         self,
         kline_data: List[KlineData],
-        min_strength: float
-    ) -> List[FenxingPoint]:
+        min_strength: float = 0.5,
+        columns: Optional[KlineColumns] = None
+    ) -> FenxingArrays:
         """
-        寻找底分型
+        识别所有分型点，以数值列返回
         
-        底分型定义：
-        1. 当前K线最低价小于前一根和后一根K线最低价
-        2. 连续3根K线形成局部低点
-        3. 强度计算基于价格差异和确认程度
+        结果与 find_fenxing_points 逐项对应，只构建调用方需要的分型点对象。
         
         Args:
-            kline_data: K线数据
-            min_strength: 最小强度
+            kline_data: K线数据列表
+            min_strength: 最小强度阈值
+            columns: 流水线入口已构建的K线数值列，未提供时按需提取
             
         Returns:
-            底分型点列表
+            分型数值列
         """
-        bottom_fenxings = []
+        if len(kline_data) < 3:
+            return _EMPTY_FENXING
         
-        for i in range(1, len(kline_data) - 1):
-            current = kline_data[i]
-            prev = kline_data[i - 1]
-            next_kline = kline_data[i + 1]
-            
-            # 基本条件：当前K线低点小于前后K线低点
-            if current.low < prev.low and current.low < next_kline.low:
-                
-                # 计算强度
-                strength = self._calculate_bottom_fenxing_strength(
-                    kline_data, i, min_strength
-                )
-                
-                if strength >= min_strength:
-                    fenxing = FenxingPoint(
-                        index=i,
-                        type=FenxingType.BOTTOM,
-                        high=current.high,
-                        low=current.low,
-                        price=current.low,  # 底分型关键价格是最低价
-                        timestamp=current.timestamp,
-                        confidence=strength
-                    )
-                    bottom_fenxings.append(fenxing)
+        # 寻找顶分型和底分型（已按时间排序）
+        candidates = self._detect_candidates(kline_data, min_strength, columns)
         
-        return bottom_fenxings
+        # 过滤相邻的同类型分型
+        kept = _alternation_kernel(kernel_input(candidates.is_top), kernel_input(candidates.confidence))
+        return candidates.take(kept)
     
-    def _calculate_top_fenxing_strength(
+    def _detect_candidates(
         self,
         kline_data: List[KlineData],
-        index: int,
-        min_strength: float
-    ) -> float:
+        min_strength: float,
+        columns: Optional[KlineColumns] = None
+    ) -> FenxingArrays:
         """
-        计算顶分型强度
-        
-        强度计算因素：
-        1. 价格突出程度
-        2. 成交量确认
-        3. 周围K线确认数量
-        4. 相对位置（是否在高位）
+        调用检测核心函数，并将结果按时间排序
         
         Args:
             kline_data: K线数据
-            index: 当前K线索引
             min_strength: 最小强度
+            columns: K线数值列，未提供时按需提取
             
         Returns:
-            强度值 (0-1)
+            分型数值列（按时间排序，同一时间顶分型在前）
         """
-        current = kline_data[index]
-        
-        # 1. 价格突出程度 (30%)
-        price_prominence = self._calculate_price_prominence_top(kline_data, index)
-        
-        # 2. 成交量确认 (20%)
-        volume_confirmation = self._calculate_volume_confirmation(kline_data, index)
-        
-        # 3. 周围确认 (30%)
-        surrounding_confirmation = self._calculate_surrounding_confirmation_top(kline_data, index)
-        
-        # 4. 相对位置 (20%)
-        relative_position = self._calculate_relative_position_top(kline_data, index)
-        
-        # 加权计算总强度
-        total_strength = (
-            price_prominence * 0.3 +
-            volume_confirmation * 0.2 +
-            surrounding_confirmation * 0.3 +
-            relative_position * 0.2
+        n = len(kline_data)
+        if columns is not None:
+            highs, lows, volumes = columns.high, columns.low, columns.volume
+        else:
+            highs = np.fromiter((k.high for k in kline_data), dtype=np.float64, count=n)
+            lows = np.fromiter((k.low for k in kline_data), dtype=np.float64, count=n)
+            volumes = np.fromiter((k.volume for k in kline_data), dtype=np.int64, count=n)
+        
+        # 三点比较一次性得到候选：顶分型高点大于前后K线高点，底分型低点小于前后K线低点
+        middle_highs = highs[1:-1]
+        middle_lows = lows[1:-1]
+        top_candidates = np.flatnonzero((middle_highs > highs[:-2]) & (middle_highs > highs[2:])) + 1
+        bottom_candidates = np.flatnonzero((middle_lows < lows[:-2]) & (middle_lows < lows[2:])) + 1
+        
+        # 成交量前缀和，邻域成交量之和 O(1) 得到
+        volume_prefix = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(volumes, out=volume_prefix[1:])
+        
+        # numba可用时逐点编译执行，否则整体数组化计算，两者结果相同
+        score = _fenxing_kernel if NUMBA_AVAILABLE else _score_candidates
+        indices, is_top, confidences = score(
+            highs, lows, volumes, volume_prefix, top_candidates, bottom_candidates,
+            float(highs.max()), float(highs.min()), float(lows.max()), float(lows.min()),
+            float(min_strength)
         )
         
-        return min(1.0, max(0.0, total_strength))
-    
-    def _calculate_bottom_fenxing_strength(
-        self,
-        kline_data: List[KlineData],
-        index: int,
-        min_strength: float
-    ) -> float:
-        """
-        计算底分型强度
-        
-        Args:
-            kline_data: K线数据
-            index: 当前K线索引
-            min_strength: 最小强度
-            
-        Returns:
-            强度值 (0-1)
-        """
-        current = kline_data[index]
-        
-        # 1. 价格突出程度 (30%)
-        price_prominence = self._calculate_price_prominence_bottom(kline_data, index)
-        
-        # 2. 成交量确认 (20%)
-        volume_confirmation = self._calculate_volume_confirmation(kline_data, index)
-        
-        # 3. 周围确认 (30%)
-        surrounding_confirmation = self._calculate_surrounding_confirmation_bottom(kline_data, index)
-        
-        # 4. 相对位置 (20%)
-        relative_position = self._calculate_relative_position_bottom(kline_data, index)
-        
-        # 加权计算总强度
-        total_strength = (
-            price_prominence * 0.3 +
-            volume_confirmation * 0.2 +
-            surrounding_confirmation * 0.3 +
-            relative_position * 0.2
+        # 核心函数输出先顶后底，按时间稳定排序后与逐点按时间排序的结果一致；
+        # 未提供数值列时只对命中的分型取时间
+        if columns is not None:
+            timestamps = columns.timestamp_us[indices]
+        else:
+            timestamps = datetimes_to_us((kline_data[i].timestamp for i in indices.tolist()), len(indices))
+        order = np.argsort(timestamps, kind="stable")
+        
+        return FenxingArrays(
+            index=indices[order],
+            is_top=is_top[order],
+            confidence=confidences[order]
         )
-        
-        return min(1.0, max(0.0, total_strength))
-    
-    def _calculate_price_prominence_top(self, kline_data: List[KlineData], index: int) -> float:
-        """计算顶分型价格突出程度"""
-        current = kline_data[index]
-        
-        # 计算与周围K线的价格差异
-        window = min(5, index, len(kline_data) - index - 1)
-        if window < 1:
-            return 0.5
-        
-        nearby_highs = []
-        for i in range(max(0, index - window), min(len(kline_data), index + window + 1)):
-            if i != index:
-                nearby_highs.append(kline_data[i].high)
-        
-        if not nearby_highs:
-            return 0.5
-        
-        max_nearby = max(nearby_highs)
-        avg_nearby = sum(nearby_highs) / len(nearby_highs)
-        
-        # 计算突出程度
-        if max_nearby == 0:
-            return 0.5
-        
-        prominence = (current.high - max_nearby) / max_nearby
-        relative_prominence = (current.high - avg_nearby) / avg_nearby
-        
-        # 归一化到0-1
-        score = min(1.0, max(0.0, (prominence + relative_prominence * 0.5) * 10))
-        return score
-    
-    def _calculate_price_prominence_bottom(self, kline_data: List[KlineData], index: int) -> float:
-        """计算底分型价格突出程度"""
-        current = kline_data[index]
-        
-        # 计算与周围K线的价格差异
-        window = min(5, index, len(kline_data) - index - 1)
-        if window < 1:
-            return 0.5
-        
-        nearby_lows = []
-        for i in range(max(0, index - window), min(len(kline_data), index + window + 1)):
-            if i != index:
-                nearby_lows.append(kline_data[i].low)
-        
-        if not nearby_lows:
-            return 0.5
-        
-        min_nearby = min(nearby_lows)
-        avg_nearby = sum(nearby_lows) / len(nearby_lows)
-        
-        # 计算突出程度
-        if avg_nearby == 0:
-            return 0.5
-        
-        prominence = (min_nearby - current.low) / avg_nearby
-        relative_prominence = (avg_nearby - current.low) / avg_nearby
-        
-        # 归一化到0-1
-        score = min(1.0, max(0.0, (prominence + relative_prominence * 0.5) * 10))
-        return score
-    
-    def _calculate_volume_confirmation(self, kline_data: List[KlineData], index: int) -> float:
-        """计算成交量确认程度"""
-        current = kline_data[index]
-        
-        # 计算与前后几根K线的成交量对比
-        window = min(3, index, len(kline_data) - index - 1)
-        if window < 1:
-            return 0.5
-        
-        nearby_volumes = []
-        for i in range(max(0, index - window), min(len(kline_data), index + window + 1)):
-            if i != index:
-                nearby_volumes.append(kline_data[i].volume)
-        
-        if not nearby_volumes:
-            return 0.5
-        
-        avg_volume = sum(nearby_volumes) / len(nearby_volumes)
-        
-        if avg_volume == 0:
-            return 0.5
-        
-        # 成交量放大程度
-        volume_ratio = current.volume / avg_volume
-        
-        # 归一化：成交量放大1.5倍以上给满分
-        score = min(1.0, max(0.0, (volume_ratio - 0.5) / 1.0))
-        return score
-    
-    def _calculate_surrounding_confirmation_top(self, kline_data: List[KlineData], index: int) -> float:
-        """计算顶分型周围确认程度"""
-        # 检查更大范围内是否确实是高点
-        window = min(10, index, len(kline_data) - index - 1)
-        if window < 2:
-            return 0.5
-        
-        current_high = kline_data[index].high
-        higher_count = 0
-        total_count = 0
-        
-        for i in range(max(0, index - window), min(len(kline_data), index + window + 1)):
-            if i != index:
-                total_count += 1
-                if kline_data[i].high < current_high:
-                    higher_count += 1
-        
-        if total_count == 0:
-            return 0.5
-        
-        # 周围低于当前高点的K线比例
-        confirmation_ratio = higher_count / total_count
-        return confirmation_ratio
-    
-    def _calculate_surrounding_confirmation_bottom(self, kline_data: List[KlineData], index: int) -> float:
-        """计算底分型周围确认程度"""
-        # 检查更大范围内是否确实是低点
-        window = min(10, index, len(kline_data) - index - 1)
-        if window < 2:
-            return 0.5
-        
-        current_low = kline_data[index].low
-        lower_count = 0
-        total_count = 0
-        
-        for i in range(max(0, index - window), min(len(kline_data), index + window + 1)):
-            if i != index:
-                total_count += 1
-                if kline_data[i].low > current_low:
-                    lower_count += 1
-        
-        if total_count == 0:
-            return 0.5
-        
-        # 周围高于当前低点的K线比例
-        confirmation_ratio = lower_count / total_count
-        return confirmation_ratio
-    
-    def _calculate_relative_position_top(self, kline_data: List[KlineData], index: int) -> float:
-        """计算顶分型相对位置（是否在高位）"""
-        # 计算在整个数据序列中的相对高度
-        all_highs = [k.high for k in kline_data]
-        max_high = max(all_highs)
-        min_high = min(all_highs)
-        
-        if max_high == min_high:
-            return 0.5
-        
-        current_high = kline_data[index].high
-        relative_position = (current_high - min_high) / (max_high - min_high)
-        
-        # 在高位的分型更有意义
-        return relative_position
-    
-    def _calculate_relative_position_bottom(self, kline_data: List[KlineData], index: int) -> float:
-        """计算底分型相对位置（是否在低位）"""
-        # 计算在整个数据序列中的相对高度
-        all_lows = [k.low for k in kline_data]
-        max_low = max(all_lows)
-        min_low = min(all_lows)
-        
-        if max_low == min_low:
-            return 0.5
-        
-        current_low = kline_data[index].low
-        relative_position = (current_low - min_low) / (max_low - min_low)
-        
-        # 在低位的分型更有意义（1 - relative_position）
-        return 1.0 - relative_position
-    
-    def _filter_adjacent_fenxing(self, fenxing_points: List[FenxingPoint]) -> List[FenxingPoint]:
-        """
-        过滤相邻的同类型分型，保留强度更高的
-        
-        Args:
-            fenxing_points: 原始分型点列表
-            
-        Returns:
-            过滤后的分型点列表
-        """
-        if len(fenxing_points) <= 1:
-            return fenxing_points
-        
-        filtered = []
-        i = 0
-        
-        while i < len(fenxing_points):
-            current = fenxing_points[i]
-            
-            # 寻找相同类型的连续分型
-            same_type_group = [current]
-            j = i + 1
-            
-            while j < len(fenxing_points) and fenxing_points[j].type == current.type:
-                same_type_group.append(fenxing_points[j])
-                j += 1
-            
-            # 如果有多个相同类型的分型，选择强度最高的
-            if len(same_type_group) > 1:
-                best_fenxing = max(same_type_group, key=lambda x: x.confidence)
-                filtered.append(best_fenxing)
-            else:
-                filtered.append(current)
-            
-            i = j
-        
-        return filtered
     
     def validate_fenxing_sequence(self, fenxing_points: List[FenxingPoint]) -> List[FenxingPoint]:
         """
         验证分型序列的合理性，确保顶底分型交替出现
         
+        连续同类型分型中保留强度最高的，与识别分型时相邻同类型分型的过滤共用同一核心函数。
+        
         Args:
             fenxing_points: 分型点列表
             
@@ -453,21 +576,13 @@ class FenxingDetector:
         if len(fenxing_points) <= 1:
             return fenxing_points
         
-        validated = [fenxing_points[0]]
-        
-        for i in range(1, len(fenxing_points)):
-            current = fenxing_points[i]
-            last = validated[-1]
-            
-            # 确保顶底分型交替
-            if current.type != last.type:
-                validated.append(current)
-            else:
-                # 如果类型相同，选择强度更高的
-                if current.confidence > last.confidence:
-                    validated[-1] = current
-        
-        return validated
+        count = len(fenxing_points)
+        is_top = np.fromiter(
+            (f.type == FenxingType.TOP for f in fenxing_points), dtype=np.bool_, count=count
+        )
+        confidences = np.fromiter((f.confidence for f in fenxing_points), dtype=np.float64, count=count)
+        kept = _alternation_kernel(kernel_input(is_top), kernel_input(confidences))
+        return [fenxing_points[i] for i in kept.tolist()]
 
 
 # 全局分型检测器实例
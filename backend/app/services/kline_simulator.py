@@ -1,16 +1,33 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple, Union
 from models.analysis import KlineData
 
+# 时间间隔标识 -> K线时间步长，未知标识按1分钟处理
+_INTERVAL_STEPS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "30m": timedelta(minutes=30),
+    "1h": timedelta(minutes=60),
+    "4h": timedelta(minutes=240),
+    "1d": timedelta(minutes=1440)
+}
+_DEFAULT_INTERVAL_STEP = _INTERVAL_STEPS["1m"]
+
 
 class KlineSimulator:
     """K线数据模拟器"""
     
-    def __init__(self):
-        """初始化模拟器"""
-        self.random_state = np.random.RandomState(42)
+    def __init__(self, seed: int = 42):
+        """
+        初始化模拟器
+        
+        Args:
+            seed: 随机数种子
+        """
+        self.random_state = np.random.RandomState(seed)
     
     def generate_kline_data(
         self,
@@ -39,71 +56,89 @@ class KlineSimulator:
             start_time = datetime.now()
         
         # 解析时间间隔
-        interval_minutes = self._parse_time_interval(time_interval)
+        time_step = self._parse_time_interval(time_interval)
         
         # 生成价格序列
         prices = self._generate_price_series(count, start_price, volatility, trend_bias)
         
-        # 生成OHLC数据
-        kline_list = []
-        current_time = start_time
+        return self._build_klines(prices, start_price, start_time, time_step)
+    
+    def _build_klines(
+        self,
+        prices: np.ndarray,
+        start_price: float,
+        start_time: datetime,
+        time_step: timedelta
+    ) -> List[KlineData]:
+        """
+        由收盘价序列生成OHLC数据
         
-        for i in range(count):
-            # 生成当前K线的OHLC
-            if i == 0:
-                open_price = start_price
-            else:
-                open_price = kline_list[-1].close
-            
-            close_price = prices[i]
-            
-            # 生成高低价，确保high >= max(open, close), low <= min(open, close)
-            price_range = abs(close_price - open_price) * self.random_state.uniform(0.5, 2.0)
-            high_price = max(open_price, close_price) + price_range * self.random_state.uniform(0, 0.8)
-            low_price = min(open_price, close_price) - price_range * self.random_state.uniform(0, 0.8)
-            
-            # 确保价格合理性
-            high_price = max(high_price, open_price, close_price)
-            low_price = min(low_price, open_price, close_price)
-            
-            # 生成成交量（基于价格波动调整）
-            base_volume = 10000
-            volatility_factor = abs(close_price - open_price) / open_price * 100
-            volume = int(base_volume * (1 + volatility_factor) * self.random_state.uniform(0.5, 2.0))
+        Args:
+            prices: 收盘价序列
+            start_price: 起始价格（首根K线的开盘价）
+            start_time: 首根K线时间
+            time_step: K线时间步长
             
-            kline = KlineData(
-                timestamp=current_time,
-                open=round(open_price, 2),
-                high=round(high_price, 2),
-                low=round(low_price, 2),
-                close=round(close_price, 2),
+        Returns:
+            K线数据列表
+        """
+        count = len(prices)
+        
+        # 每根K线依次抽取4个均匀随机数：波动幅度、上影线、下影线、成交量系数。
+        # 一次抽取 (count, 4) 的随机数矩阵，行优先顺序与逐根抽取相同，随机序列不变
+        draws = self.random_state.random_sample((count, 4))
+        range_factor = 0.5 + 1.5 * draws[:, 0]   # uniform(0.5, 2.0)
+        upper_factor = 0.8 * draws[:, 1]         # uniform(0, 0.8)
+        lower_factor = 0.8 * draws[:, 2]         # uniform(0, 0.8)
+        volume_factor = 0.5 + 1.5 * draws[:, 3]  # uniform(0.5, 2.0)
+        
+        # 收盘价保留两位小数；开盘价为前一根K线的收盘价，首根K线为起始价格
+        close_prices = np.round(prices, 2)
+        open_prices = np.empty(count)
+        open_prices[:1] = start_price
+        open_prices[1:] = close_prices[:-1]
+        
+        # 生成高低价（基于未取整的收盘价），确保high >= max(open, close), low <= min(open, close)
+        price_range = np.abs(prices - open_prices) * range_factor
+        high_prices = np.maximum(open_prices, prices) + price_range * upper_factor
+        low_prices = np.minimum(open_prices, prices) - price_range * lower_factor
+        
+        # 生成成交量（基于价格波动调整）
+        base_volume = 10000
+        volatility_factor = np.abs(prices - open_prices) / open_prices * 100
+        volumes = (base_volume * (1 + volatility_factor) * volume_factor).astype(np.int64)
+        
+        # 模拟数据由本模块生成，字段可信，跳过逐字段校验
+        kline_list = [
+            KlineData.model_construct(
+                timestamp=start_time + i * time_step,
+                open=open_price,
+                high=high_price,
+                low=low_price,
+                close=close_price,
                 volume=volume
             )
-            
-            kline_list.append(kline)
-            current_time += timedelta(minutes=interval_minutes)
+            for i, (open_price, high_price, low_price, close_price, volume) in enumerate(zip(
+                [float(round(start_price, 2))] + open_prices[1:].tolist(),
+                np.round(high_prices, 2).tolist(),
+                np.round(low_prices, 2).tolist(),
+                close_prices.tolist(),
+                volumes.tolist()
+            ))
+        ]
         
         return kline_list
     
-    def _parse_time_interval(self, interval: str) -> int:
-        """解析时间间隔为分钟数"""
-        interval_map = {
-            "1m": 1,
-            "5m": 5,
-            "15m": 15,
-            "30m": 30,
-            "1h": 60,
-            "4h": 240,
-            "1d": 1440
-        }
-        return interval_map.get(interval, 1)
+    def _parse_time_interval(self, interval: str) -> timedelta:
+        """解析时间间隔为K线时间步长"""
+        return _INTERVAL_STEPS.get(interval, _DEFAULT_INTERVAL_STEP)
     
     def _generate_price_series(
         self,
         count: int,
         start_price: float,
-        volatility: float,
-        trend_bias: float
+        volatility: Union[float, np.ndarray],
+        trend_bias: Union[float, np.ndarray]
     ) -> np.ndarray:
         """
         生成价格序列（几何布朗运动）
@@ -111,8 +146,8 @@ class KlineSimulator:
         Args:
             count: 数据点数量
             start_price: 起始价格
-            volatility: 波动率
-            trend_bias: 趋势偏向
+            volatility: 波动率，可为逐点数组
+            trend_bias: 趋势偏向，可为逐点数组
             
         Returns:
             价格序列
@@ -153,20 +188,35 @@ class KlineSimulator:
         # 寻找重要价位
         price_levels = np.percentile(prices, [20, 50, 80])
         
-        for i in range(1, len(modified_prices)):
-            current_price = modified_prices[i]
-            
-            # 检查是否接近支撑阻力位
-            for level in price_levels:
-                distance = abs(current_price - level) / level
-                if distance < 0.02:  # 距离重要价位2%以内
-                    # 增加在该价位停留的概率
-                    if self.random_state.random() < 0.3:
-                        bounce_factor = self.random_state.uniform(0.8, 1.2)
-                        if current_price > level:
-                            modified_prices[i] = level + (current_price - level) * bounce_factor
-                        else:
-                            modified_prices[i] = level - (level - current_price) * bounce_factor
+        # 一次算出各K线与各价位的距离，只有距离重要价位2%以内的(K线, 价位)才会抽取随机数
+        distances = np.abs(prices[1:, None] - price_levels) / price_levels
+        near_bars, near_levels = np.nonzero(distances < 0.02)
+        if len(near_bars) == 0:
+            return modified_prices
+        
+        # 每个接近的(K线, 价位)按顺序先抽一个随机数，小于0.3时再抽一个反弹系数，
+        # 共需不超过 2*K 个随机数。先整体预取，按实际用量回放随机状态，
+        # 使随机序列与逐个抽取完全一致
+        state = self.random_state.get_state()
+        draws = self.random_state.random_sample(2 * len(near_bars)).tolist()
+        used = 0
+        
+        for bar, level_index in zip((near_bars + 1).tolist(), near_levels.tolist()):
+            stay_draw = draws[used]
+            used += 1
+            # 增加在该价位停留的概率
+            if stay_draw < 0.3:
+                bounce_factor = 0.8 + (1.2 - 0.8) * draws[used]  # uniform(0.8, 1.2)
+                used += 1
+                current_price = prices[bar]
+                level = price_levels[level_index]
+                if current_price > level:
+                    modified_prices[bar] = level + (current_price - level) * bounce_factor
+                else:
+                    modified_prices[bar] = level - (level - current_price) * bounce_factor
+        
+        self.random_state.set_state(state)
+        self.random_state.random_sample(used)
         
         return modified_prices
     
@@ -179,19 +229,19 @@ class KlineSimulator:
         
         # 计算移动平均来识别趋势
         window = min(10, len(prices) // 3)
-        ma = pd.Series(prices).rolling(window=window).mean().fillna(method='bfill')
+        ma = pd.Series(prices).rolling(window=window).mean().bfill().to_numpy()
         
-        for i in range(window, len(modified_prices)):
-            # 判断趋势方向
-            trend_slope = (ma.iloc[i] - ma.iloc[i-window//2]) / ma.iloc[i-window//2]
-            
-            # 在趋势方向上增加小幅推动
-            if abs(trend_slope) > 0.01:  # 有明显趋势
-                momentum_factor = self.random_state.uniform(0.001, 0.005)
-                if trend_slope > 0:  # 上升趋势
-                    modified_prices[i] *= (1 + momentum_factor)
-                else:  # 下降趋势
-                    modified_prices[i] *= (1 - momentum_factor)
+        # 一次算出各K线的趋势斜率：与 window//2 根之前的均线相比
+        half = window // 2
+        base = ma[window - half:len(ma) - half]
+        trend_slope = (ma[window:] - base) / base
+        
+        # 在趋势方向上增加小幅推动，只有有明显趋势的K线按顺序各抽取一个推动系数
+        trending = np.flatnonzero(np.abs(trend_slope) > 0.01)
+        momentum_factor = self.random_state.uniform(0.001, 0.005, len(trending))
+        bars = trending + window
+        up = trend_slope[trending] > 0  # 上升趋势
+        modified_prices[bars] *= np.where(up, 1 + momentum_factor, 1 - momentum_factor)
         
         return modified_prices
     
@@ -257,105 +307,63 @@ class KlineSimulator:
         else:
             return self.generate_kline_data(count, start_price, **kwargs)
     
-    def _generate_double_top_pattern(self, count: int, start_price: float, **kwargs) -> List[KlineData]:
-        """生成双顶模式"""
-        # 分阶段生成：上升-回调-再次上升-下跌
-        stage_counts = [count//4, count//4, count//4, count//4]
+    def _generate_staged_data(
+        self,
+        count: int,
+        start_price: float,
+        stages: Sequence[Tuple[float, float]],
+        start_time: Optional[datetime] = None,
+        time_interval: str = "1m",
+        volatility: float = 0.02
+    ) -> List[KlineData]:
+        """
+        按阶段的趋势与波动率一次生成连续的K线数据
         
-        # 第一阶段：上升到第一个顶部
-        data1 = self.generate_trending_data(
-            stage_counts[0], start_price, "up", 
-            volatility=0.015, **kwargs
-        )
+        K线数量均分到各阶段，余数归入最后一个阶段。各阶段的趋势偏向与
+        波动率展开为逐点数组，整段价格路径一次生成。
         
-        # 第二阶段：回调
-        data2 = self.generate_trending_data(
-            stage_counts[1], data1[-1].close, "down",
-            volatility=0.02, trend_bias=-0.005, **kwargs
-        )
+        Args:
+            count: 生成数量
+            start_price: 起始价格
+            stages: 各阶段 (趋势偏向, 相对波动率)，相对波动率乘以 volatility
+            start_time: 开始时间
+            time_interval: 时间间隔
+            volatility: 基准波动率
+            
+        Returns:
+            K线数据列表
+        """
+        if start_time is None:
+            start_time = datetime.now()
         
-        # 第三阶段：再次上升（形成双顶）
-        target_price = data1[-1].close * 0.98  # 略低于第一个顶部
-        data3 = self.generate_trending_data(
-            stage_counts[2], data2[-1].close, "up",
-            volatility=0.015, **kwargs
-        )
+        stage_count, remainder = divmod(count, len(stages))
+        stage_counts = [stage_count] * len(stages)
+        stage_counts[-1] += remainder
         
-        # 第四阶段：下跌确认
-        data4 = self.generate_trending_data(
-            stage_counts[3], data3[-1].close, "down",
-            volatility=0.025, trend_bias=-0.008, **kwargs
-        )
+        trend_biases = np.repeat([bias for bias, _ in stages], stage_counts)
+        volatilities = np.repeat([factor * volatility for _, factor in stages], stage_counts)
         
-        return data1 + data2[1:] + data3[1:] + data4[1:]
+        prices = self._generate_price_series(count, start_price, volatilities, trend_biases)
+        
+        return self._build_klines(prices, start_price, start_time, self._parse_time_interval(time_interval))
+    
+    def _generate_double_top_pattern(self, count: int, start_price: float, **kwargs) -> List[KlineData]:
+        """生成双顶模式"""
+        # 分阶段生成：上升-回调-再次上升（形成双顶）-下跌确认
+        stages = [(0.01, 0.75), (-0.005, 1.0), (0.01, 0.75), (-0.008, 1.25)]
+        return self._generate_staged_data(count, start_price, stages, **kwargs)
     
     def _generate_double_bottom_pattern(self, count: int, start_price: float, **kwargs) -> List[KlineData]:
         """生成双底模式"""
-        # 分阶段生成：下跌-反弹-再次下跌-上涨
-        stage_counts = [count//4, count//4, count//4, count//4]
-        
-        # 第一阶段：下跌到第一个底部
-        data1 = self.generate_trending_data(
-            stage_counts[0], start_price, "down",
-            volatility=0.02, **kwargs
-        )
-        
-        # 第二阶段：反弹
-        data2 = self.generate_trending_data(
-            stage_counts[1], data1[-1].close, "up",
-            volatility=0.015, trend_bias=0.005, **kwargs
-        )
-        
-        # 第三阶段：再次下跌（形成双底）
-        data3 = self.generate_trending_data(
-            stage_counts[2], data2[-1].close, "down",
-            volatility=0.02, **kwargs
-        )
-        
-        # 第四阶段：上涨确认
-        data4 = self.generate_trending_data(
-            stage_counts[3], data3[-1].close, "up",
-            volatility=0.025, trend_bias=0.008, **kwargs
-        )
-        
-        return data1 + data2[1:] + data3[1:] + data4[1:]
+        # 分阶段生成：下跌-反弹-再次下跌（形成双底）-上涨确认
+        stages = [(-0.01, 1.0), (0.005, 0.75), (-0.01, 1.0), (0.008, 1.25)]
+        return self._generate_staged_data(count, start_price, stages, **kwargs)
     
     def _generate_head_shoulders_pattern(self, count: int, start_price: float, **kwargs) -> List[KlineData]:
         """生成头肩顶模式"""
-        # 分阶段生成：左肩-头部-右肩-颈线突破
-        stage_counts = [count//5, count//5, count//5, count//5, count//5]
-        
-        # 左肩
-        data1 = self.generate_trending_data(
-            stage_counts[0], start_price, "up",
-            volatility=0.015, **kwargs
-        )
-        
-        # 回调到颈线
-        data2 = self.generate_trending_data(
-            stage_counts[1], data1[-1].close, "down",
-            volatility=0.02, trend_bias=-0.003, **kwargs
-        )
-        
-        # 头部（最高点）
-        data3 = self.generate_trending_data(
-            stage_counts[2], data2[-1].close, "up",
-            volatility=0.015, trend_bias=0.008, **kwargs
-        )
-        
-        # 再次回调到颈线
-        data4 = self.generate_trending_data(
-            stage_counts[3], data3[-1].close, "down",
-            volatility=0.02, trend_bias=-0.005, **kwargs
-        )
-        
-        # 右肩（较低的高点）
-        data5 = self.generate_trending_data(
-            stage_counts[4], data4[-1].close, "up",
-            volatility=0.015, trend_bias=0.003, **kwargs
-        )
-        
-        return data1 + data2[1:] + data3[1:] + data4[1:] + data5[1:]
+        # 分阶段生成：左肩-回调到颈线-头部（最高点）-再次回调到颈线-右肩（较低的高点）
+        stages = [(0.01, 0.75), (-0.003, 1.0), (0.008, 0.75), (-0.005, 1.0), (0.003, 0.75)]
+        return self._generate_staged_data(count, start_price, stages, **kwargs)
 
 
 # 全局模拟器实例
@@ -1,8 +1,82 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+import numpy as np
+
 from models.analysis import (
     KlineData, FenxingPoint, FenxingType, 
     Stroke, Segment, StrokeDirection
 )
+from utils._njit import njit, NUMBA_AVAILABLE
+from utils.kline_columns import KlineColumns
+
+
+@njit(cache=True)
+def _interior_extremes_kernel(highs, lows, fenxing_indices):
+    """
+    逐对扫描相邻分型之间（不含两端）K线的最高价与最低价，语义同 _interior_extremes
+    
+    NaN不参与比较；区间内全为NaN时结果为-inf/inf，与数组化实现的NaN在突破判断中等价。
+    """
+    n = len(lows)
+    pair_count = len(fenxing_indices) - 1
+    interior_high = np.full(pair_count, -np.inf)
+    interior_low = np.full(pair_count, np.inf)
+    
+    for k in range(pair_count):
+        start = min(fenxing_indices[k], fenxing_indices[k + 1]) + 1
+        end = max(fenxing_indices[k], fenxing_indices[k + 1])
+        if end >= n:
+            continue
+        for j in range(start, end):
+            if highs[j] > interior_high[k]:
+                interior_high[k] = highs[j]
+            if lows[j] < interior_low[k]:
+                interior_low[k] = lows[j]
+    
+    return interior_high, interior_low
+
+
+def _interior_extremes(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    fenxing_indices: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次计算每对相邻分型之间（不含两端）K线的最高价与最低价
+    
+    所有区间的最值由一次 reduceat 得到。fmax/fmin 忽略NaN，与逐根比较的结果一致；
+    区间内没有K线（或索引越界）时最高价为-inf、最低价为inf，不会触发突破。
+    
+    Args:
+        highs: K线最高价列
+        lows: K线最低价列
+        fenxing_indices: 按顺序排列的分型K线索引
+        
+    Returns:
+        (区间最高价, 区间最低价)，长度为分型数减一
+    """
+    if NUMBA_AVAILABLE:
+        return _interior_extremes_kernel(highs, lows, fenxing_indices)
+    
+    pair_count = len(fenxing_indices) - 1
+    interior_high = np.full(pair_count, -np.inf)
+    interior_low = np.full(pair_count, np.inf)
+    
+    starts = np.minimum(fenxing_indices[:-1], fenxing_indices[1:]) + 1
+    ends = np.maximum(fenxing_indices[:-1], fenxing_indices[1:])
+    valid = (starts < ends) & (ends < len(lows))
+    if not valid.any():
+        return interior_high, interior_low
+    
+    # reduceat 在相邻下标之间归约：偶数位置为各区间 [start, end) 的结果，奇数位置丢弃
+    bounds = np.column_stack((starts[valid], ends[valid])).ravel()
+    interior_high[valid] = np.fmax.reduceat(highs, bounds)[::2]
+    interior_low[valid] = np.fmin.reduceat(lows, bounds)[::2]
+    return interior_high, interior_low
+
+
+# 以“是否上升笔”为下标的笔方向
+_STROKE_DIRECTIONS = (StrokeDirection.DOWN, StrokeDirection.UP)
 
 
 class StrokeBuilder:
@@ -15,7 +89,8 @@ class StrokeBuilder:
     def build_strokes(
         self,
         kline_data: List[KlineData],
-        fenxing_points: List[FenxingPoint]
+        fenxing_points: List[FenxingPoint],
+        columns: Optional[KlineColumns] = None
     ) -> List[Stroke]:
         """
         根据分型点构建笔
@@ -28,6 +103,7 @@ class StrokeBuilder:
         Args:
             kline_data: K线数据
             fenxing_points: 分型点列表
+            columns: 流水线入口已构建的K线数值列，未提供时按需提取
             
         Returns:
             笔列表
@@ -35,19 +111,48 @@ class StrokeBuilder:
         if len(fenxing_points) < 2:
             return []
         
+        fenxing_count = len(fenxing_points)
+        indices = np.fromiter((f.index for f in fenxing_points), dtype=np.int64, count=fenxing_count)
+        prices = np.fromiter((f.price for f in fenxing_points), dtype=np.float64, count=fenxing_count)
+        is_top = np.fromiter(
+            (f.type == FenxingType.TOP for f in fenxing_points), dtype=np.bool_, count=fenxing_count
+        )
+        is_bottom = np.fromiter(
+            (f.type == FenxingType.BOTTOM for f in fenxing_points), dtype=np.bool_, count=fenxing_count
+        )
+        
+        # 所有相邻分型对一次完成方向判断与有效性验证：底->顶为上升笔，顶->底为下降笔
+        up = is_bottom[:-1] & is_top[1:]
+        down = is_top[:-1] & is_bottom[1:]
+        valid = self._validate_strokes(fenxing_points, kline_data, indices, prices, up, down, columns)
+        
+        # 笔的价格幅度与K线数量
+        price_ranges = np.abs(prices[1:] - prices[:-1])
+        kline_counts = np.abs(indices[1:] - indices[:-1]) + 1
+        
+        positions = np.flatnonzero(valid)
+        stroke_up = up[positions]
+        
         strokes = []
         
-        for i in range(len(fenxing_points) - 1):
-            start_fenxing = fenxing_points[i]
-            end_fenxing = fenxing_points[i + 1]
-            
-            # 确保相邻分型类型不同
-            if start_fenxing.type != end_fenxing.type:
-                stroke = self._create_stroke(
-                    start_fenxing, end_fenxing, kline_data
-                )
-                if stroke:
-                    strokes.append(stroke)
+        for i, is_up, price_range, kline_count in zip(
+            positions.tolist(),
+            stroke_up.tolist(),
+            price_ranges[valid].tolist(),
+            kline_counts[valid].tolist()
+        ):
+            strokes.append(self._create_stroke(
+                fenxing_points[i], fenxing_points[i + 1],
+                _STROKE_DIRECTIONS[is_up], price_range, kline_count
+            ))
+        
+        # 只有首尾相接且同向的相邻笔才可能合并；没有这样的笔对时无需优化
+        mergeable = (
+            (indices[positions[:-1] + 1] == indices[positions[1:]]) &
+            (stroke_up[:-1] == stroke_up[1:])
+        )
+        if not mergeable.any():
+            return strokes
         
         # 验证和优化笔序列
         optimized_strokes = self._optimize_strokes(strokes, kline_data)
@@ -58,41 +163,28 @@ class StrokeBuilder:
         self,
         start_fenxing: FenxingPoint,
         end_fenxing: FenxingPoint,
-        kline_data: List[KlineData]
-    ) -> Optional[Stroke]:
+        direction: StrokeDirection,
+        price_range: float,
+        kline_count: int
+    ) -> Stroke:
         """
         创建单个笔
         
         Args:
             start_fenxing: 起始分型
             end_fenxing: 结束分型
-            kline_data: K线数据
+            direction: 笔方向
+            price_range: 价格幅度
+            kline_count: K线数量
             
         Returns:
             笔对象
         """
-        # 确定笔的方向
-        if start_fenxing.type == FenxingType.BOTTOM and end_fenxing.type == FenxingType.TOP:
-            direction = StrokeDirection.UP
-            price_range = end_fenxing.price - start_fenxing.price
-        elif start_fenxing.type == FenxingType.TOP and end_fenxing.type == FenxingType.BOTTOM:
-            direction = StrokeDirection.DOWN
-            price_range = start_fenxing.price - end_fenxing.price
-        else:
-            return None
-        
-        # 计算K线数量
-        kline_count = abs(end_fenxing.index - start_fenxing.index) + 1
-        
-        # 验证笔的有效性
-        if not self._validate_stroke(start_fenxing, end_fenxing, kline_data, direction):
-            return None
-        
         stroke = Stroke(
             start_fenxing=start_fenxing,
             end_fenxing=end_fenxing,
             direction=direction,
-            price_range=abs(price_range),
+            price_range=price_range,
             kline_count=kline_count,
             start_time=start_fenxing.timestamp,
             end_time=end_fenxing.timestamp
@@ -100,15 +192,18 @@ class StrokeBuilder:
         
         return stroke
     
-    def _validate_stroke(
+    def _validate_strokes(
         self,
-        start_fenxing: FenxingPoint,
-        end_fenxing: FenxingPoint,
+        fenxing_points: List[FenxingPoint],
         kline_data: List[KlineData],
-        direction: StrokeDirection
-    ) -> bool:
+        indices: np.ndarray,
+        prices: np.ndarray,
+        up: np.ndarray,
+        down: np.ndarray,
+        columns: Optional[KlineColumns] = None
+    ) -> np.ndarray:
         """
-        验证笔的有效性
+        验证所有相邻分型对构成的笔的有效性
         
         验证规则：
         1. 笔的方向必须一致
@@ -116,44 +211,41 @@ class StrokeBuilder:
         3. 价格变化必须有意义
         
         Args:
-            start_fenxing: 起始分型
-            end_fenxing: 结束分型
+            fenxing_points: 分型点列表
             kline_data: K线数据
-            direction: 笔方向
+            indices: 分型K线索引列
+            prices: 分型价格列
+            up: 各分型对是否构成上升笔
+            down: 各分型对是否构成下降笔
+            columns: K线数值列，未提供时按需提取
             
         Returns:
-            是否有效
+            各分型对是否构成有效笔的掩码
         """
-        start_idx = start_fenxing.index
-        end_idx = end_fenxing.index
-        
-        # 确保索引有效
-        if start_idx >= len(kline_data) or end_idx >= len(kline_data):
-            return False
+        count = len(kline_data)
+        fenxing_count = len(fenxing_points)
         
-        # 价格变化阈值检查
-        price_change_ratio = abs(end_fenxing.price - start_fenxing.price) / start_fenxing.price
-        if price_change_ratio < 0.001:  # 价格变化太小
-            return False
+        # 方向明确，且索引有效
+        valid = (up | down) & (indices[:-1] < count) & (indices[1:] < count)
         
-        # 检查中间K线是否有明显反向突破
-        min_idx = min(start_idx, end_idx)
-        max_idx = max(start_idx, end_idx)
+        # 价格变化阈值检查：价格变化太小的无效
+        price_change_ratio = np.abs(prices[1:] - prices[:-1]) / prices[:-1]
+        valid &= ~(price_change_ratio < 0.001)
         
-        if direction == StrokeDirection.UP:
-            # 上升笔：检查是否有明显下破起点
-            start_low = start_fenxing.low
-            for i in range(min_idx + 1, max_idx):
-                if kline_data[i].low < start_low * 0.995:  # 下破超过0.5%
-                    return False
+        # 检查中间K线是否有明显反向突破：任一K线突破等价于区间最值突破
+        if columns is not None:
+            highs, lows = columns.high, columns.low
         else:
-            # 下降笔：检查是否有明显上破起点
-            start_high = start_fenxing.high
-            for i in range(min_idx + 1, max_idx):
-                if kline_data[i].high > start_high * 1.005:  # 上破超过0.5%
-                    return False
-        
-        return True
+            highs = np.fromiter((k.high for k in kline_data), dtype=np.float64, count=count)
+            lows = np.fromiter((k.low for k in kline_data), dtype=np.float64, count=count)
+        interior_high, interior_low = _interior_extremes(highs, lows, indices)
+        start_highs = np.fromiter((f.high for f in fenxing_points[:-1]), dtype=np.float64, count=fenxing_count - 1)
+        start_lows = np.fromiter((f.low for f in fenxing_points[:-1]), dtype=np.float64, count=fenxing_count - 1)
+        # 上升笔：下破起点超过0.5%；下降笔：上破起点超过0.5%
+        valid &= ~(up & (interior_low < start_lows * 0.995))
+        valid &= ~(down & (interior_high > start_highs * 1.005))
+        
+        return valid
     
     def _optimize_strokes(
         self,
@@ -179,24 +271,25 @@ class StrokeBuilder:
             return strokes
         
         optimized = []
-        i = 0
+        # 待定笔：尚未确定是否与下一笔合并；合并后的笔直接输出，不再参与合并
+        pending = None
         
-        while i < len(strokes):
-            current_stroke = strokes[i]
-            
-            # 检查是否需要与下一笔合并
-            if i < len(strokes) - 1:
-                next_stroke = strokes[i + 1]
-                merged_stroke = self._try_merge_strokes(
-                    current_stroke, next_stroke, kline_data
-                )
-                if merged_stroke:
-                    optimized.append(merged_stroke)
-                    i += 2  # 跳过下一笔
-                    continue
+        for stroke in strokes:
+            if pending is None:
+                pending = stroke
+                continue
             
-            optimized.append(current_stroke)
-            i += 1
+            # 检查待定笔是否需要与当前笔合并
+            merged_stroke = self._try_merge_strokes(pending, stroke, kline_data)
+            if merged_stroke:
+                optimized.append(merged_stroke)
+                pending = None
+            else:
+                optimized.append(pending)
+                pending = stroke
+        
+        if pending is not None:
+            optimized.append(pending)
         
         return optimized
     
@@ -226,6 +319,11 @@ class StrokeBuilder:
         if stroke1.end_fenxing.index != stroke2.start_fenxing.index:
             return None
         
+        # 检查方向是否一致（只合并同向的弱笔）。相邻笔通常方向相反，
+        # 先做这一判断可跳过多数情况下的强弱计算
+        if stroke1.direction != stroke2.direction:
+            return None
+        
         # 检查是否需要合并（笔太短）
         min_kline_count = 5
         min_price_ratio = 0.01
@@ -244,21 +342,17 @@ class StrokeBuilder:
         if not stroke1_weak and not stroke2_weak:
             return None
         
-        # 检查方向是否一致（允许合并同向的弱笔）
-        if stroke1.direction == stroke2.direction:
-            # 创建合并后的笔
-            merged_stroke = Stroke(
-                start_fenxing=stroke1.start_fenxing,
-                end_fenxing=stroke2.end_fenxing,
-                direction=stroke1.direction,
-                price_range=abs(stroke2.end_fenxing.price - stroke1.start_fenxing.price),
-                kline_count=stroke1.kline_count + stroke2.kline_count - 1,
-                start_time=stroke1.start_time,
-                end_time=stroke2.end_time
-            )
-            return merged_stroke
-        
-        return None
+        # 创建合并后的笔
+        merged_stroke = Stroke(
+            start_fenxing=stroke1.start_fenxing,
+            end_fenxing=stroke2.end_fenxing,
+            direction=stroke1.direction,
+            price_range=abs(stroke2.end_fenxing.price - stroke1.start_fenxing.price),
+            kline_count=stroke1.kline_count + stroke2.kline_count - 1,
+            start_time=stroke1.start_time,
+            end_time=stroke2.end_time
+        )
+        return merged_stroke
     
     def build_segments(
         self,
@@ -286,19 +380,25 @@ class StrokeBuilder:
         segments = []
         current_segment_strokes = []
         current_direction = None
+        # 当前线段各笔起点价格的最高、最低值，随笔加入增量更新
+        start_high = start_low = 0.0
         
         for i, stroke in enumerate(strokes):
+            start_price = stroke.start_fenxing.price
             if current_direction is None:
                 # 第一笔，设定方向
                 current_direction = stroke.direction
                 current_segment_strokes = [stroke]
+                start_high = start_low = start_price
             elif stroke.direction == current_direction:
                 # 同向笔，加入当前线段
                 current_segment_strokes.append(stroke)
+                start_high = max(start_high, start_price)
+                start_low = min(start_low, start_price)
             else:
                 # 反向笔，检查是否线段突破
                 if self._check_segment_break(
-                    current_segment_strokes, stroke, kline_data
+                    current_direction, start_high, start_low, stroke
                 ):
                     # 确认线段突破，结束当前线段
                     if len(current_segment_strokes) >= 1:
@@ -309,9 +409,12 @@ class StrokeBuilder:
                     # 开始新线段
                     current_direction = stroke.direction
                     current_segment_strokes = [stroke]
+                    start_high = start_low = start_price
                 else:
                     # 未突破，可能是回调，等待进一步确认
                     current_segment_strokes.append(stroke)
+                    start_high = max(start_high, start_price)
+                    start_low = min(start_low, start_price)
         
         # 处理最后一个线段
         if len(current_segment_strokes) >= 1:
@@ -323,9 +426,10 @@ class StrokeBuilder:
     
     def _check_segment_break(
         self,
-        segment_strokes: List[Stroke],
-        new_stroke: Stroke,
-        kline_data: List[KlineData]
+        direction: StrokeDirection,
+        start_high: float,
+        start_low: float,
+        new_stroke: Stroke
     ) -> bool:
         """
         检查是否发生线段突破
@@ -336,32 +440,21 @@ class StrokeBuilder:
         3. 时间持续确认
         
         Args:
-            segment_strokes: 当前线段的笔列表
+            direction: 当前线段首笔的方向
+            start_high: 当前线段各笔起点价格的最高值（下降线段的关键阻力）
+            start_low: 当前线段各笔起点价格的最低值（上升线段的关键支撑）
             new_stroke: 新的反向笔
-            kline_data: K线数据
             
         Returns:
             是否突破
         """
-        if not segment_strokes:
-            return True
-        
-        # 获取线段的关键价位
-        if segment_strokes[0].direction == StrokeDirection.UP:
+        if direction == StrokeDirection.UP:
             # 上升线段，检查是否下破关键支撑
-            segment_high = max(stroke.end_fenxing.price for stroke in segment_strokes)
-            segment_low = min(stroke.start_fenxing.price for stroke in segment_strokes)
-            
-            # 下破幅度检查
-            break_ratio = (segment_low - new_stroke.end_fenxing.price) / segment_low
+            break_ratio = (start_low - new_stroke.end_fenxing.price) / start_low
             return break_ratio > 0.02  # 下破超过2%
         else:
             # 下降线段，检查是否上破关键阻力
-            segment_high = max(stroke.start_fenxing.price for stroke in segment_strokes)
-            segment_low = min(stroke.end_fenxing.price for stroke in segment_strokes)
-            
-            # 上破幅度检查
-            break_ratio = (new_stroke.end_fenxing.price - segment_high) / segment_high
+            break_ratio = (new_stroke.end_fenxing.price - start_high) / start_high
             return break_ratio > 0.02  # 上破超过2%
     
     def _create_segment(self, strokes: List[Stroke]) -> Optional[Segment]:
@@ -377,14 +470,15 @@ class StrokeBuilder:
         if not strokes:
             return None
         
-        # 确定线段方向（以主要方向为准）
-        up_count = sum(1 for s in strokes if s.direction == StrokeDirection.UP)
+        # 确定线段方向（以主要方向为准）；上升笔的终点价格一次收集，个数即上升笔数
+        up_end_prices = [s.end_fenxing.price for s in strokes if s.direction == StrokeDirection.UP]
+        up_count = len(up_end_prices)
         down_count = len(strokes) - up_count
         
         if up_count > down_count:
             direction = StrokeDirection.UP
             start_price = strokes[0].start_fenxing.price
-            end_price = max(s.end_fenxing.price for s in strokes if s.direction == StrokeDirection.UP)
+            end_price = max(up_end_prices)
         else:
             direction = StrokeDirection.DOWN
             start_price = strokes[0].start_fenxing.price
@@ -417,38 +511,30 @@ class StrokeBuilder:
         if not strokes:
             return {}
         
+        count = len(strokes)
+        price_ranges = np.fromiter((s.price_range for s in strokes), dtype=np.float64, count=count)
+        durations = np.fromiter((s.kline_count for s in strokes), dtype=np.int64, count=count)
+        up_strokes = int(np.count_nonzero(np.fromiter(
+            (s.direction == StrokeDirection.UP for s in strokes), dtype=np.bool_, count=count
+        )))
+        
+        # 价格幅度按笔的顺序逐个相加，与原逐笔累加逐位一致（ndarray.sum为分块求和，末位可能不同）
+        total_price_range = sum(price_ranges.tolist())
+        total_duration = int(durations.sum())
+        
         features = {
-            "total_strokes": len(strokes),
-            "up_strokes": 0,
-            "down_strokes": 0,
-            "avg_price_range": 0,
-            "avg_duration": 0,
-            "max_price_range": 0,
-            "min_price_range": float('inf'),
+            "total_strokes": count,
+            "up_strokes": up_strokes,
+            "down_strokes": count - up_strokes,
+            "avg_price_range": total_price_range / count,
+            "avg_duration": total_duration / count,
+            "max_price_range": float(price_ranges.max()),
+            "min_price_range": float(price_ranges.min()),
             "stroke_efficiency": 0  # 笔的效率（价格变化/时间）
         }
         
-        total_price_range = 0
-        total_duration = 0
-        
-        for stroke in strokes:
-            if stroke.direction == StrokeDirection.UP:
-                features["up_strokes"] += 1
-            else:
-                features["down_strokes"] += 1
-            
-            total_price_range += stroke.price_range
-            total_duration += stroke.kline_count
-            
-            features["max_price_range"] = max(features["max_price_range"], stroke.price_range)
-            features["min_price_range"] = min(features["min_price_range"], stroke.price_range)
-        
-        if len(strokes) > 0:
-            features["avg_price_range"] = total_price_range / len(strokes)
-            features["avg_duration"] = total_duration / len(strokes)
-            
-            if total_duration > 0:
-                features["stroke_efficiency"] = total_price_range / total_duration
+        if total_duration > 0:
+            features["stroke_efficiency"] = total_price_range / total_duration
         
         return features
 
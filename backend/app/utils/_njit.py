@@ -0,0 +1,36 @@
+# numba可选依赖：未安装时退化为原样返回的装饰器，核心函数以纯Python执行
+from typing import Any
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - 取决于运行环境
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """numba不可用时的占位装饰器，支持 @njit 与 @njit(cache=True) 两种写法"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+
+def kernel_input(values: np.ndarray) -> Any:
+    """
+    准备传入核心函数的数组
+
+    纯Python执行时逐元素索引NumPy数组会产生标量对象，开销大于列表，
+    因此numba不可用时转换为列表。
+
+    Args:
+        values: 一维NumPy数组
+
+    Returns:
+        numba可用时原样返回，否则返回列表
+    """
+    return values if NUMBA_AVAILABLE else values.tolist()
@@ -0,0 +1,36 @@
+# K线的按列（SoA）表示：分析流水线入口构建一次，各检测步骤共享，避免逐步重复提取属性
+from typing import List, NamedTuple
+
+import numpy as np
+
+from models.analysis import KlineData
+from utils.timestamps import datetimes_to_us
+
+
+class KlineColumns(NamedTuple):
+    """K线数值列（只含分析步骤读取的列），各列长度与K线列表一致、下标一一对应"""
+    timestamp_us: np.ndarray  # 时间（int64 微秒）
+    high: np.ndarray          # 最高价
+    low: np.ndarray           # 最低价
+    close: np.ndarray         # 收盘价
+    volume: np.ndarray        # 成交量（int64）
+
+
+def kline_columns(kline_data: List[KlineData]) -> KlineColumns:
+    """
+    将K线列表转换为数值列
+
+    Args:
+        kline_data: K线数据
+
+    Returns:
+        K线数值列
+    """
+    count = len(kline_data)
+    return KlineColumns(
+        timestamp_us=datetimes_to_us((k.timestamp for k in kline_data), count),
+        high=np.fromiter((k.high for k in kline_data), dtype=np.float64, count=count),
+        low=np.fromiter((k.low for k in kline_data), dtype=np.float64, count=count),
+        close=np.fromiter((k.close for k in kline_data), dtype=np.float64, count=count),
+        volume=np.fromiter((k.volume for k in kline_data), dtype=np.int64, count=count)
+    )
@@ -0,0 +1,190 @@
+# 序列化工具
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from fastapi.responses import Response, StreamingResponse
+
+from models.analysis import KlineData
+from models.requests import APIResponseDict
+
+try:
+    # C扩展解析ISO时间戳，原生支持结尾的Z
+    from ciso8601 import parse_datetime
+except ImportError:  # pragma: no cover - 取决于运行环境
+    parse_datetime = datetime.fromisoformat
+
+# K线行的固定字段顺序，所有行共用同一组键对象
+_KLINE_KEYS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def serialize_kline_rows(kline_data: List[KlineData]) -> List[Dict[str, Any]]:
+    """
+    将K线数据转换为字典列表
+    
+    Args:
+        kline_data: K线数据列表
+        
+    Returns:
+        按固定字段顺序构建的字典列表
+    """
+    keys = _KLINE_KEYS
+    return [
+        dict(zip(keys, (kline.timestamp, kline.open, kline.high, kline.low, kline.close, kline.volume)))
+        for kline in kline_data
+    ]
+
+
+# 流式响应中K线数组的占位符，放在data里K线数组所在的位置
+KLINE_STREAM_PLACEHOLDER = "__kline_data_stream__"
+_PLACEHOLDER_BYTES = orjson.dumps(KLINE_STREAM_PLACEHOLDER)
+
+# 每次编码并写出的K线行数
+_STREAM_CHUNK_ROWS = 256
+
+# 流式写出已编码响应时每块的字节数
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _iter_kline_chunks(kline_data: List[KlineData], chunk_rows: int) -> Iterator[bytes]:
+    """
+    按块编码K线数组
+    
+    Args:
+        kline_data: K线数据列表
+        chunk_rows: 每块的行数
+        
+    Returns:
+        JSON数组各块的字节串（不含外层方括号）
+    """
+    for start in range(0, len(kline_data), chunk_rows):
+        chunk = orjson.dumps(serialize_kline_rows(kline_data[start:start + chunk_rows]))[1:-1]
+        yield chunk if start == 0 else b"," + chunk
+
+
+def api_response(message: str, data: Optional[Dict[str, Any]] = None) -> APIResponseDict:
+    """
+    构建成功响应字典
+    
+    Args:
+        message: 响应消息
+        data: 响应数据
+        
+    Returns:
+        与APIResponse结构一致的字典
+    """
+    return {
+        "success": True,
+        "message": message,
+        "data": data,
+        "timestamp": datetime.now()
+    }
+
+
+def encode_api_response(message: str, data: Dict[str, Any]) -> bytes:
+    """
+    将成功响应编码为JSON字节串
+    
+    Args:
+        message: 响应消息
+        data: 响应数据
+        
+    Returns:
+        与APIResponse结构一致的JSON字节串
+    """
+    return orjson.dumps(api_response(message, data), option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def stream_kline_response(
+    message: str,
+    data: Dict[str, Any],
+    kline_data: List[KlineData],
+    chunk_rows: int = _STREAM_CHUNK_ROWS
+) -> StreamingResponse:
+    """
+    以流式JSON返回包含K线数组的API响应
+    
+    响应结构与APIResponse一致，data中值为KLINE_STREAM_PLACEHOLDER的位置
+    会被替换为按块编码的K线数组，避免一次性构建全部行字典。
+    
+    Args:
+        message: 响应消息
+        data: 响应数据，需包含且仅包含一个占位符
+        kline_data: K线数据列表
+        chunk_rows: 每块的行数
+        
+    Returns:
+        流式响应
+    """
+    # 信封部分先完整编码，出错时仍能在路由内转换为HTTP错误
+    envelope = encode_api_response(message, data)
+    head, tail = envelope.split(_PLACEHOLDER_BYTES, 1)
+    
+    def generate() -> Iterator[bytes]:
+        yield head + b"["
+        yield from _iter_kline_chunks(kline_data, chunk_rows)
+        yield b"]" + tail
+    
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+def stream_encoded_response(content: bytes, chunk_size: int = _STREAM_CHUNK_BYTES) -> StreamingResponse:
+    """
+    以流式响应分块写出已编码的JSON
+    
+    用于在其他进程中整体编码完成的响应：内容已在内存中，分块发送使大响应
+    不必一次写出，事件循环可在各块之间处理其他请求。
+    
+    Args:
+        content: JSON字节串
+        chunk_size: 每块的字节数
+        
+    Returns:
+        流式响应
+    """
+    async def generate() -> AsyncIterator[bytes]:
+        # 异步生成器由事件循环直接迭代，不经过线程池
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+    
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+# 预编码响应中时间戳的占位符
+_TIMESTAMP_PLACEHOLDER = "__response_timestamp__"
+_TIMESTAMP_PLACEHOLDER_BYTES = orjson.dumps(_TIMESTAMP_PLACEHOLDER)
+
+
+def prebuild_api_response(message: str, data: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    """
+    预编码内容固定的API响应
+    
+    Args:
+        message: 响应消息
+        data: 响应数据
+        
+    Returns:
+        以时间戳位置切分的前后两段字节串
+    """
+    envelope = orjson.dumps({
+        "success": True,
+        "message": message,
+        "data": data,
+        "timestamp": _TIMESTAMP_PLACEHOLDER
+    })
+    head, tail = envelope.split(_TIMESTAMP_PLACEHOLDER_BYTES, 1)
+    return head, tail
+
+
+def prebuilt_response(template: Tuple[bytes, bytes]) -> Response:
+    """
+    以当前时间填充预编码的API响应
+    
+    Args:
+        template: prebuild_api_response返回的模板
+        
+    Returns:
+        JSON响应
+    """
+    head, tail = template
+    return Response(head + orjson.dumps(datetime.now()) + tail, media_type="application/json")
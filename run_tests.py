@@ -6,32 +6,46 @@
 
 import os
 import sys
+import shutil
 import subprocess
 import argparse
+import importlib.util
 from pathlib import Path
 
 
 def run_command(cmd, description=""):
-    """执行命令并处理结果"""
+    """执行命令并处理结果，cmd为参数列表，直接启动进程而不经过shell"""
     print(f"\n{'='*60}")
-    print(f"执行: {description or cmd}")
+    print(f"执行: {description or ' '.join(cmd)}")
     print(f"{'='*60}")
     
     try:
         result = subprocess.run(
             cmd,
-            shell=True,
             check=True,
             capture_output=False,
             text=True
         )
         print(f"✅ {description or '命令'} 执行成功")
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"❌ {description or '命令'} 执行失败: {e}")
         return False
 
 
+def pytest_command(*args):
+    """
+    以当前解释器运行pytest的参数列表
+    
+    安装了pytest-xdist时按CPU核数并行执行；按模块/类分配到worker，
+    同一模块的测试在同一进程中运行，模块级fixture只创建一次。
+    """
+    cmd = [sys.executable, "-m", "pytest", *args]
+    if importlib.util.find_spec("xdist") is not None:
+        cmd += ["-n", "auto", "--dist", "loadscope"]
+    return cmd
+
+
 def install_dependencies():
     """安装测试依赖"""
     print("安装测试依赖...")
@@ -39,47 +53,51 @@ def install_dependencies():
         "pytest>=7.0.0",
         "pytest-asyncio>=0.21.0",
         "pytest-cov>=4.0.0",
+        "pytest-xdist>=3.0.0",
         "httpx>=0.24.0",
         "coverage>=7.0.0"
     ]
     
-    cmd = f"pip install {' '.join(dependencies)}"
+    cmd = [sys.executable, "-m", "pip", "install", *dependencies]
     return run_command(cmd, "安装测试依赖")
 
 
 def run_unit_tests():
     """运行单元测试"""
-    cmd = "pytest tests/unit/ -v --tb=short --durations=10"
+    cmd = pytest_command("tests/unit/", "-v", "--tb=short", "--durations=10")
     return run_command(cmd, "单元测试")
 
 
 def run_integration_tests():
     """运行集成测试"""
-    cmd = "pytest tests/integration/ -v --tb=short --durations=10"
+    cmd = pytest_command("tests/integration/", "-v", "--tb=short", "--durations=10")
     return run_command(cmd, "集成测试")
 
 
 def run_all_tests():
     """运行所有测试"""
-    cmd = "pytest tests/ -v --tb=short --durations=10"
+    cmd = pytest_command("tests/", "-v", "--tb=short", "--durations=10")
     return run_command(cmd, "全部测试")
 
 
 def run_tests_with_coverage():
     """运行测试并生成覆盖率报告"""
-    cmd = "pytest tests/ --cov=backend/app --cov-report=html --cov-report=term-missing --cov-fail-under=60"
+    cmd = pytest_command(
+        "tests/", "--cov=backend/app", "--cov-report=html",
+        "--cov-report=term-missing", "--cov-fail-under=60"
+    )
     return run_command(cmd, "测试覆盖率分析")
 
 
 def run_performance_tests():
     """运行性能测试"""
-    cmd = "pytest tests/ -m slow -v --tb=short"
+    cmd = pytest_command("tests/", "-m", "slow", "-v", "--tb=short")
     return run_command(cmd, "性能测试")
 
 
 def run_quick_tests():
     """运行快速测试（跳过慢速测试）"""
-    cmd = "pytest tests/ -m 'not slow' -v --tb=short"
+    cmd = pytest_command("tests/", "-m", "not slow", "-v", "--tb=short")
     return run_command(cmd, "快速测试")
 
 
@@ -88,12 +106,12 @@ def lint_code():
     print("进行代码质量检查...")
     
     # 检查Python语法
-    cmd = "python -m py_compile backend/app/main.py"
+    cmd = [sys.executable, "-m", "py_compile", "backend/app/main.py"]
     if not run_command(cmd, "Python语法检查"):
         return False
     
     # 检查导入
-    cmd = "python -c 'import backend.app.main'"
+    cmd = [sys.executable, "-c", "import backend.app.main"]
     if not run_command(cmd, "导入检查"):
         return False
     
@@ -123,7 +141,10 @@ def generate_test_report():
     os.makedirs("test_reports", exist_ok=True)
     
     # 生成HTML覆盖率报告
-    cmd = "pytest tests/ --cov=backend/app --cov-report=html:test_reports/coverage --html=test_reports/report.html --self-contained-html"
+    cmd = pytest_command(
+        "tests/", "--cov=backend/app", "--cov-report=html:test_reports/coverage",
+        "--html=test_reports/report.html", "--self-contained-html"
+    )
     return run_command(cmd, "生成测试报告")
 
 
@@ -131,31 +152,29 @@ def clean_test_artifacts():
     """清理测试产生的文件"""
     print("清理测试文件...")
     
-    import shutil
-    
-    artifacts = [
+    # 项目根目录下的测试产物；__pycache__ 在各级目录中都删除
+    artifacts = {
         ".pytest_cache",
         ".coverage",
         "htmlcov",
         "test_reports",
         "__pycache__"
-    ]
-    
-    for artifact in artifacts:
-        if os.path.exists(artifact):
-            if os.path.isdir(artifact):
-                shutil.rmtree(artifact)
-            else:
-                os.remove(artifact)
-            print(f"删除: {artifact}")
+    }
     
-    # 递归删除__pycache__
+    # 一次遍历完成清理，已删除的目录从 dirs 中移除，不再进入
     for root, dirs, files in os.walk("."):
-        for dir_name in dirs:
-            if dir_name == "__pycache__":
-                pycache_path = os.path.join(root, dir_name)
-                shutil.rmtree(pycache_path)
-                print(f"删除: {pycache_path}")
+        at_top = root == "."
+        for dir_name in list(dirs):
+            if dir_name == "__pycache__" or (at_top and dir_name in artifacts):
+                dir_path = os.path.join(root, dir_name)
+                shutil.rmtree(dir_path)
+                dirs.remove(dir_name)
+                print(f"删除: {dir_path}")
+        if at_top:
+            for file_name in files:
+                if file_name in artifacts:
+                    os.remove(file_name)
+                    print(f"删除: {file_name}")
     
     print("✅ 清理完成")
 
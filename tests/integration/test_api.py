@@ -1,7 +1,10 @@
 import pytest
+import pytest_asyncio
 import asyncio
-from httpx import AsyncClient
-from datetime import datetime
+import hashlib
+import orjson
+from httpx import ASGITransport, AsyncClient
+from datetime import datetime, timedelta
 
 # 导入FastAPI应用
 import sys
@@ -10,27 +13,90 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
 
 from app.main import app
 
+# uvloop可选：已安装时测试使用其事件循环（不支持Windows），否则使用默认事件循环
+try:
+    import uvloop
+    new_event_loop = uvloop.new_event_loop
+except ImportError:
+    new_event_loop = asyncio.new_event_loop
+
+# 模块内的测试均为协程，统一标记，无需逐个声明
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    """模块内共用的事件循环，供模块级客户端使用"""
+    loop = new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest_asyncio.fixture(scope="module")
+async def client():
+    """创建测试客户端，模块内所有测试共用"""
+    transport = ASGITransport(app=app)
+    # 进程内直接调用ASGI应用，不读取代理等环境配置
+    async with AsyncClient(
+        transport=transport, base_url="http://test", timeout=10.0, trust_env=False
+    ) as ac:
+        yield ac
+
+
+# 100根K线的完整分析参数，多个测试共用同一次请求的响应；指定种子使结果可复现
+COMPLETE_100_PARAMS = {
+    "count": 100,
+    "start_price": 100.0,
+    "time_interval": "1m",
+    "volatility": 0.02,
+    "trend_bias": 0.0,
+    "analysis_type": "complete",
+    "seed": 42
+}
+
+# 随请求时刻变化的字段，比较结果时排除
+_TIME_KEYS = {"timestamp", "start_time", "end_time", "time_range", "analysis_time"}
+
+
+def _strip_times(value):
+    """递归去掉时间字段"""
+    if isinstance(value, dict):
+        return {k: _strip_times(v) for k, v in value.items() if k not in _TIME_KEYS}
+    if isinstance(value, list):
+        return [_strip_times(v) for v in value]
+    return value
+
+
+def _analysis_digest(response_json: dict) -> bytes:
+    """完整分析响应中除时间外全部内容的摘要"""
+    content = orjson.dumps(_strip_times(response_json["data"]), option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(content).digest()
+
+
+@pytest_asyncio.fixture(scope="module", autouse=True)
+async def warmup(client):
+    """预热分析进程池与路由（进程启动、导入、numba编译），避免一次性开销计入首个测试"""
+    await client.post("/api/analysis/complete", json=COMPLETE_100_PARAMS)
+
+
+@pytest_asyncio.fixture(scope="module")
+async def complete_100(client):
+    """完整分析接口的响应，模块内只请求一次"""
+    return await client.post("/api/analysis/complete", json=COMPLETE_100_PARAMS)
+
 
 class TestAPIEndpoints:
     """API端点测试"""
     
-    @pytest.fixture
-    async def client(self):
-        """创建测试客户端"""
-        async with AsyncClient(app=app, base_url="http://test") as ac:
-            yield ac
-    
-    @pytest.mark.asyncio
     async def test_health_check(self, client):
         """测试健康检查接口"""
         response = await client.get("/health")
         assert response.status_code == 200
         
-        data = response.json()
+        data = orjson.loads(response.content)
         assert data["status"] == "ok"
         assert "version" in data
     
-    @pytest.mark.asyncio
     async def test_generate_kline_data(self, client):
         """测试K线数据生成接口"""
         request_data = {
@@ -44,7 +110,7 @@ class TestAPIEndpoints:
         response = await client.post("/api/kline/generate", json=request_data)
         assert response.status_code == 200
         
-        data = response.json()
+        data = orjson.loads(response.content)
         assert data["success"] is True
         assert "data" in data
         assert "kline_data" in data["data"]
@@ -56,56 +122,54 @@ class TestAPIEndpoints:
         for field in required_fields:
             assert field in kline
     
-    @pytest.mark.asyncio
     async def test_generate_pattern_data(self, client):
         """测试模式数据生成接口"""
         patterns = ["double_top", "double_bottom", "head_shoulders"]
         
-        for pattern in patterns:
-            response = await client.get(
+        # 各模式的请求相互独立，并发发送
+        responses = await asyncio.gather(*(
+            client.get(
                 f"/api/kline/patterns/{pattern}",
                 params={"count": 100, "start_price": 100.0}
             )
+            for pattern in patterns
+        ))
+        
+        for pattern, response in zip(patterns, responses):
             assert response.status_code == 200
             
-            data = response.json()
+            data = orjson.loads(response.content)
             assert data["success"] is True
             assert data["data"]["pattern_type"] == pattern
             assert len(data["data"]["kline_data"]) == 100
     
-    @pytest.mark.asyncio
     async def test_generate_trending_data(self, client):
         """测试趋势数据生成接口"""
         trends = ["up", "down", "sideways"]
         
-        for trend in trends:
-            response = await client.get(
+        # 各趋势的请求相互独立，并发发送
+        responses = await asyncio.gather(*(
+            client.get(
                 f"/api/kline/trending/{trend}",
                 params={"count": 80, "start_price": 100.0}
             )
+            for trend in trends
+        ))
+        
+        for trend, response in zip(trends, responses):
             assert response.status_code == 200
             
-            data = response.json()
+            data = orjson.loads(response.content)
             assert data["success"] is True
             assert data["data"]["trend_direction"] == trend
             assert len(data["data"]["kline_data"]) == 80
     
-    @pytest.mark.asyncio
-    async def test_complete_analysis(self, client):
+    async def test_complete_analysis(self, complete_100):
         """测试完整缠论分析接口"""
-        request_data = {
-            "count": 100,
-            "start_price": 100.0,
-            "time_interval": "1m",
-            "volatility": 0.02,
-            "trend_bias": 0.0,
-            "analysis_type": "complete"
-        }
-        
-        response = await client.post("/api/analysis/complete", json=request_data)
+        response = complete_100
         assert response.status_code == 200
         
-        data = response.json()
+        data = orjson.loads(response.content)
         assert data["success"] is True
         assert "data" in data
         
@@ -122,7 +186,6 @@ class TestAPIEndpoints:
         assert "summary" in data["data"]
         assert "quality" in data["data"]
     
-    @pytest.mark.asyncio
     async def test_fenxing_analysis(self, client):
         """测试分型分析接口"""
         # 首先生成K线数据
@@ -131,7 +194,7 @@ class TestAPIEndpoints:
             "start_price": 100.0,
             "volatility": 0.03
         })
-        kline_data = kline_response.json()["data"]["kline_data"]
+        kline_data = orjson.loads(kline_response.content)["data"]["kline_data"]
         
         # 进行分型分析
         request_data = {
@@ -143,36 +206,105 @@ class TestAPIEndpoints:
         response = await client.post("/api/analysis/fenxing", json=request_data)
         assert response.status_code == 200
         
-        data = response.json()
+        data = orjson.loads(response.content)
         assert data["success"] is True
         assert "fenxing_points" in data["data"]
     
-    @pytest.mark.asyncio
+    async def test_fenxing_analysis_utc_timestamps(self, client):
+        """测试带时区（Z结尾）时间戳的分型分析，结果与无时区时间戳一致"""
+        kline_response = await client.post("/api/kline/generate", json={
+            "count": 50,
+            "start_price": 100.0,
+            "volatility": 0.03
+        })
+        kline_data = orjson.loads(kline_response.content)["data"]["kline_data"]
+        utc_kline_data = [{**kline, "timestamp": kline["timestamp"] + "Z"} for kline in kline_data]
+        
+        responses = await asyncio.gather(*(
+            client.post("/api/analysis/fenxing", json={
+                "kline_data": rows,
+                "min_strength": 0.5,
+                "analysis_type": "fenxing"
+            })
+            for rows in (kline_data, utc_kline_data)
+        ))
+        for response in responses:
+            assert response.status_code == 200
+        
+        naive_points, utc_points = (
+            orjson.loads(response.content)["data"]["fenxing_points"] for response in responses
+        )
+        assert [p["index"] for p in utc_points] == [p["index"] for p in naive_points]
+
+    async def test_analysis_mixed_offset_timestamps(self, client):
+        """测试各行时区偏移不同（如跨越夏令时切换）的时间戳，分型与笔分析结果与无时区时间戳一致"""
+        kline_response = await client.post("/api/kline/generate", json={
+            "count": 50,
+            "start_price": 100.0,
+            "volatility": 0.03
+        })
+        kline_data = orjson.loads(kline_response.content)["data"]["kline_data"]
+        
+        # 前半段为+01:00、后半段为+02:00，表示的时刻与原时间按UTC解释相同
+        half = len(kline_data) // 2
+        mixed_kline_data = []
+        for i, kline in enumerate(kline_data):
+            hours, suffix = (1, "+01:00") if i < half else (2, "+02:00")
+            local = datetime.fromisoformat(kline["timestamp"]) + timedelta(hours=hours)
+            mixed_kline_data.append({**kline, "timestamp": local.isoformat() + suffix})
+        
+        fenxing_responses = await asyncio.gather(*(
+            client.post("/api/analysis/fenxing", json={
+                "kline_data": rows,
+                "analysis_type": "fenxing"
+            })
+            for rows in (kline_data, mixed_kline_data)
+        ))
+        for response in fenxing_responses:
+            assert response.status_code == 200
+        naive_points, mixed_points = (
+            orjson.loads(response.content)["data"]["fenxing_points"] for response in fenxing_responses
+        )
+        assert [p["index"] for p in mixed_points] == [p["index"] for p in naive_points]
+        
+        # 分型结果中的时间戳同样保留各行偏移，再作为笔分析的输入
+        stroke_responses = await asyncio.gather(*(
+            client.post("/api/analysis/stroke", json={
+                "kline_data": rows,
+                "fenxing_points": points,
+                "analysis_type": "stroke"
+            })
+            for rows, points in ((kline_data, naive_points), (mixed_kline_data, mixed_points))
+        ))
+        for response in stroke_responses:
+            assert response.status_code == 200
+        naive_strokes, mixed_strokes = (
+            orjson.loads(response.content)["data"]["strokes"] for response in stroke_responses
+        )
+        assert len(mixed_strokes) == len(naive_strokes)
+    
     async def test_analysis_info(self, client):
         """测试分析功能信息接口"""
         response = await client.get("/api/analysis/summary")
         assert response.status_code == 200
         
-        data = response.json()
+        data = orjson.loads(response.content)
         assert data["success"] is True
         assert "features" in data["data"]
         assert "algorithms" in data["data"]
         assert "supported_patterns" in data["data"]
         assert "supported_trends" in data["data"]
     
-    @pytest.mark.asyncio
     async def test_invalid_pattern_type(self, client):
         """测试无效模式类型"""
         response = await client.get("/api/kline/patterns/invalid_pattern")
         assert response.status_code == 400
     
-    @pytest.mark.asyncio
     async def test_invalid_trend_direction(self, client):
         """测试无效趋势方向"""
         response = await client.get("/api/kline/trending/invalid_trend")
         assert response.status_code == 400
     
-    @pytest.mark.asyncio
     async def test_parameter_validation(self, client):
         """测试参数验证"""
         # 测试负数数量
@@ -195,19 +327,18 @@ class TestAPIEndpoints:
             "start_price": 100.0
         })
         assert response.status_code == 422  # Validation error
+        
+        # 测试模式/趋势接口的数量与种子范围
+        for path in ("/api/kline/patterns/double_top", "/api/kline/trending/up"):
+            for query in ("count=2000", "seed=-1", f"seed={2 ** 32}"):
+                response = await client.get(f"{path}?{query}")
+                assert response.status_code == 422  # Validation error
 
 
 class TestAPIIntegration:
     """API集成测试"""
     
-    @pytest.fixture
-    async def client(self):
-        """创建测试客户端"""
-        async with AsyncClient(app=app, base_url="http://test") as ac:
-            yield ac
-    
-    @pytest.mark.asyncio
-    async def test_analysis_workflow(self, client):
+    async def test_analysis_workflow(self, client, complete_100):
         """测试完整的分析工作流"""
         # 1. 生成K线数据
         kline_response = await client.post("/api/kline/generate", json={
@@ -217,7 +348,7 @@ class TestAPIIntegration:
             "trend_bias": 0.005
         })
         assert kline_response.status_code == 200
-        kline_data = kline_response.json()["data"]["kline_data"]
+        kline_data = orjson.loads(kline_response.content)["data"]["kline_data"]
         
         # 2. 进行分型分析
         fenxing_response = await client.post("/api/analysis/fenxing", json={
@@ -227,23 +358,17 @@ class TestAPIIntegration:
         })
         assert fenxing_response.status_code == 200
         
-        # 3. 完整分析
-        complete_response = await client.post("/api/analysis/complete", json={
-            "count": 100,
-            "start_price": 100.0,
-            "volatility": 0.025,
-            "analysis_type": "complete"
-        })
+        # 3. 完整分析（复用模块内已请求的结果）
+        complete_response = complete_100
         assert complete_response.status_code == 200
         
-        complete_data = complete_response.json()["data"]
+        complete_data = orjson.loads(complete_response.content)["data"]
         
         # 验证分析质量
         quality = complete_data["quality"]
         assert 0 <= quality["overall_score"] <= 1
         assert 0 <= quality["data_quality"] <= 1
     
-    @pytest.mark.asyncio
     async def test_different_market_scenarios(self, client):
         """测试不同市场场景的API响应"""
         scenarios = [
@@ -253,91 +378,80 @@ class TestAPIIntegration:
             {"name": "stable_market", "trend_bias": 0.0, "volatility": 0.01}
         ]
         
-        for scenario in scenarios:
-            response = await client.post("/api/analysis/complete", json={
+        # 各场景的分析相互独立，并发发送（服务端在进程池中并行分析）
+        responses = await asyncio.gather(*(
+            client.post("/api/analysis/complete", json={
                 "count": 150,
                 "start_price": 100.0,
                 "trend_bias": scenario["trend_bias"],
                 "volatility": scenario["volatility"],
                 "analysis_type": "complete"
             })
-            
+            for scenario in scenarios
+        ))
+        
+        for response in responses:
             assert response.status_code == 200
-            data = response.json()
+            data = orjson.loads(response.content)
             assert data["success"] is True
             
             # 验证每种场景都能生成有效的分析结果
             analysis_result = data["data"]["analysis_result"]
             assert len(analysis_result["kline_data"]) == 150
     
-    @pytest.mark.asyncio
+    @pytest.mark.slow
     async def test_performance_under_load(self, client):
         """测试负载下的性能"""
+        import statistics
         import time
         
-        # 并发发送多个分析请求
+        # 共用客户端上以有界并发发送多个分析请求，记录每个请求的耗时
+        semaphore = asyncio.Semaphore(16)
+        durations = []
+        
         async def single_analysis():
-            response = await client.post("/api/analysis/complete", json={
-                "count": 200,
-                "start_price": 100.0,
-                "analysis_type": "complete"
-            })
-            return response.status_code == 200
+            async with semaphore:
+                request_start = time.perf_counter()
+                response = await client.post("/api/analysis/complete", json={
+                    "count": 200,
+                    "start_price": 100.0,
+                    "analysis_type": "complete"
+                })
+                durations.append(time.perf_counter() - request_start)
+                return response.status_code == 200
         
-        # 并发执行5个分析任务
-        start_time = time.time()
-        tasks = [single_analysis() for _ in range(5)]
-        results = await asyncio.gather(*tasks)
-        end_time = time.time()
+        # 并发执行32个分析任务，同时最多16个在途
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*(single_analysis() for _ in range(32)))
+        total_time = time.perf_counter() - start_time
         
         # 所有任务都应该成功
         assert all(results)
         
-        # 总时间应该在合理范围内
-        total_time = end_time - start_time
-        assert total_time < 30.0  # 30秒内完成5个并发分析
+        # 总时间应该在合理范围内；单个请求的耗时分布随机器差异较大，只输出不断言
+        assert total_time < 30.0  # 30秒内完成32个并发分析
+        p50 = statistics.median(durations)
+        p95 = statistics.quantiles(durations, n=20)[18]
         
-        print(f"5个并发分析任务总耗时: {total_time:.2f}秒")
+        print(f"32个并发分析任务总耗时: {total_time:.2f}秒, p50: {p50:.3f}秒, p95: {p95:.3f}秒")
     
-    @pytest.mark.asyncio
-    async def test_data_consistency(self, client):
+    async def test_data_consistency(self, client, complete_100):
         """测试数据一致性"""
-        # 使用相同参数多次调用，检查结果一致性
-        params = {
-            "count": 100,
-            "start_price": 100.0,
-            "time_interval": "1m",
-            "volatility": 0.02,
-            "trend_bias": 0.0
-        }
-        
-        responses = []
-        for _ in range(3):
-            response = await client.post("/api/analysis/complete", json=params)
-            assert response.status_code == 200
-            responses.append(response.json())
+        # 相同参数与种子再调用一次，与模块内已请求的结果逐项一致（时间除外）
+        response = await client.post("/api/analysis/complete", json=COMPLETE_100_PARAMS)
+        assert complete_100.status_code == 200
+        assert response.status_code == 200
         
-        # 验证基本结构一致性
-        for response in responses:
-            assert response["success"] is True
-            analysis = response["data"]["analysis_result"]
-            assert len(analysis["kline_data"]) == 100
-            
-            # 基本统计应该相似（由于随机性，不要求完全相同）
-            summary = response["data"]["summary"]
-            assert summary["basic_info"]["kline_count"] == 100
+        first, second = orjson.loads(complete_100.content), orjson.loads(response.content)
+        assert first["success"] is True
+        assert len(first["data"]["analysis_result"]["kline_data"]) == 100
+        assert first["data"]["summary"]["basic_info"]["kline_count"] == 100
+        assert _analysis_digest(first) == _analysis_digest(second)
 
 
 class TestErrorHandling:
     """错误处理测试"""
     
-    @pytest.fixture
-    async def client(self):
-        """创建测试客户端"""
-        async with AsyncClient(app=app, base_url="http://test") as ac:
-            yield ac
-    
-    @pytest.mark.asyncio
     async def test_malformed_json(self, client):
         """测试格式错误的JSON"""
         response = await client.post(
@@ -347,7 +461,6 @@ class TestErrorHandling:
         )
         assert response.status_code == 422
     
-    @pytest.mark.asyncio
     async def test_missing_required_fields(self, client):
         """测试缺少必要字段"""
         response = await client.post("/api/analysis/fenxing", json={
@@ -356,7 +469,6 @@ class TestErrorHandling:
         })
         assert response.status_code == 422
     
-    @pytest.mark.asyncio
     async def test_invalid_data_types(self, client):
         """测试无效数据类型"""
         response = await client.post("/api/kline/generate", json={
@@ -365,7 +477,6 @@ class TestErrorHandling:
         })
         assert response.status_code == 422
     
-    @pytest.mark.asyncio
     async def test_boundary_values(self, client):
         """测试边界值"""
         # 最小有效值
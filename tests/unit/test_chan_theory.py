@@ -1,6 +1,8 @@
 import pytest
 import asyncio
-from datetime import datetime, timedelta
+import warnings
+import numpy as np
+from datetime import datetime, timedelta, timezone
 from typing import List
 
 # 导入待测试的模块
@@ -12,9 +14,17 @@ from app.services.kline_simulator import KlineSimulator
 from app.services.fenxing_detector import FenxingDetector
 from app.services.stroke_builder import StrokeBuilder
 from app.services.center_detector import CenterDetector
-from app.services.divergence_detector import DivergenceDetector
+from app.services.divergence_detector import (
+    DivergenceDetector, _trend_divergence_kernel, _trend_divergence_pairs
+)
 from app.services.chan_theory_engine import ChanTheoryEngine
-from app.models.analysis import KlineData, FenxingType, StrokeDirection
+from app.models.analysis import KlineData, FenxingType, StrokeDirection, Center, CenterType
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warmup():
+    """预热分析流水线（导入、numba编译），避免一次性开销计入首个测试；指定种子不影响共享模拟器"""
+    ChanTheoryEngine().complete_analysis(count=100, seed=42)
 
 
 class TestKlineSimulator:
@@ -147,6 +157,24 @@ class TestFenxingDetector:
         # 验证后的分型应该是顶底交替的
         for i in range(1, len(validated)):
             assert validated[i].type != validated[i-1].type
+    
+    def test_fenxing_raw_matches_points(self):
+        """测试数值列形式的分型结果与分型点对象逐项一致"""
+        kline_data = KlineSimulator(seed=42).generate_kline_data(200, volatility=0.03)
+        
+        raw = self.detector.find_fenxing_points_raw(kline_data)
+        fenxing_points = self.detector.find_fenxing_points(kline_data)
+        
+        assert raw.index.tolist() == [f.index for f in fenxing_points]
+        assert raw.is_top.tolist() == [f.type == FenxingType.TOP for f in fenxing_points]
+        assert raw.confidence.tolist() == [f.confidence for f in fenxing_points]
+        # 识别结果已顶底交替，序列验证不再删除分型
+        assert self.detector.validate_fenxing_sequence(fenxing_points) == fenxing_points
+        
+        # 同类型的连续分型只保留强度最高者（强度相同保留先出现的）
+        same_type_run = fenxing_points[::2]
+        assert self.detector.validate_fenxing_sequence(same_type_run) == \
+            [max(same_type_run, key=lambda f: f.confidence)]
 
 
 class TestStrokeBuilder:
@@ -254,6 +282,30 @@ class TestCenterDetector:
         assert 'down_centers' in features
         assert 'consolidation_centers' in features
         assert features['total_centers'] == len(centers)
+    
+    def test_center_features_utc_times(self):
+        """测试带时区时间的中枢特征分析，持续时间与无时区时间一致且不产生警告"""
+        def make_centers(tz):
+            start = datetime(2024, 1, 1, tzinfo=tz)
+            # 特征统计只读取数值与时间字段，跳过构成线段的校验
+            return [
+                Center.model_construct(
+                    segments=[], center_type=CenterType.CONSOLIDATION,
+                    high_price=101.0, low_price=99.0, center_range=2.0,
+                    start_time=start + timedelta(hours=i * 10),
+                    end_time=start + timedelta(hours=i * 10 + hours),
+                    strength=0.5
+                )
+                for i, hours in enumerate((2, 4.5))
+            ]
+        
+        naive_features = self.detector.analyze_center_features(make_centers(None))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            utc_features = self.detector.analyze_center_features(make_centers(timezone.utc))
+        
+        assert utc_features == naive_features
+        assert utc_features['avg_duration_hours'] == pytest.approx(3.25)
 
 
 class TestDivergenceDetector:
@@ -282,6 +334,25 @@ class TestDivergenceDetector:
         """测试空数据的背驰检测"""
         divergences = self.detector.detect_divergences([], [], [])
         assert len(divergences) == 0
+    
+    def test_trend_divergence_kernel_matches_numpy(self):
+        """测试趋势背驰的编译核心与整列计算结果逐位一致"""
+        rng = np.random.default_rng(42)
+        count = 500
+        prices = 100.0 + np.cumsum(rng.normal(0.0, 1.0, count))
+        difs = rng.normal(0.0, 1.0, count)
+        histograms = rng.normal(0.0, 1.0, count)
+        # 前值为0时回落（抬升）比例记为0
+        difs[::17] = 0.0
+        histograms[::13] = 0.0
+        
+        for is_top in (True, False):
+            kernel_pairs, kernel_strengths = _trend_divergence_kernel(prices, difs, histograms, is_top)
+            numpy_pairs, numpy_strengths = _trend_divergence_pairs(prices, difs, histograms, is_top)
+            
+            assert len(numpy_pairs) > 0
+            assert kernel_pairs.tolist() == numpy_pairs.tolist()
+            assert kernel_strengths.tolist() == numpy_strengths.tolist()
 
 
 class TestChanTheoryEngine:
@@ -323,6 +394,22 @@ class TestChanTheoryEngine:
         assert len(result.kline_data) == 50
         assert result.kline_data == kline_data
     
+    def test_analysis_with_utc_timestamps(self):
+        """测试带时区时间戳的K线分析，结构与无时区时间戳一致"""
+        naive_start = datetime(2024, 1, 1)
+        results = [
+            self.engine.analyze_with_existing_data(
+                KlineSimulator(seed=42).generate_kline_data(count=100, start_time=start_time)
+            )
+            for start_time in (naive_start, naive_start.replace(tzinfo=timezone.utc))
+        ]
+        
+        naive_result, utc_result = results
+        assert [f.index for f in utc_result.fenxing_points] == [f.index for f in naive_result.fenxing_points]
+        assert len(utc_result.strokes) == len(naive_result.strokes)
+        assert len(utc_result.centers) == len(naive_result.centers)
+        assert len(utc_result.divergence_signals) == len(naive_result.divergence_signals)
+    
     def test_individual_analysis_methods(self):
         """测试单独的分析方法"""
         kline_data = self.engine.generate_kline_only(80)
@@ -429,6 +516,7 @@ class TestIntegration:
             assert isinstance(result.macd_data, list)
             assert isinstance(result.divergence_signals, list)
     
+    @pytest.mark.slow
     def test_performance_benchmark(self):
         """测试性能基准"""
         import time